@@ -0,0 +1,229 @@
+# Headless batch generation of foliage clump libraries.
+#
+# Reads a JSON or CSV manifest of clump specs, splits it across a pool of background Blender processes,
+# and writes one .blend or .fbx file per clump:
+#
+#   blender -b --factory-startup --python FoliagePlacementBatch.py -- manifest.json --output-dir clumps --workers 8
+#   python FoliagePlacementBatch.py manifest.json --output-dir clumps --workers 8 --blender /path/to/blender
+#
+# Each spec is a JSON object (or CSV row) with a "name", optional "source_file"/"source_objects" (a .blend file and
+# the mesh objects to copy, the base grass mesh is used otherwise), optional "format" ("blend" or "fbx", or "csv",
+# "json" or "bin" to write only the placements for Unreal, see ExportPlacements in FoliagePlacementTool_280/FoliagePlacementCore.py), and any
+# Foliage Placement tool property, e.g. foliage_count, max_distance, max_rotation, max_scale, seed, placement_mode.
+
+import os
+import sys
+import csv
+import json
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try :
+    import bpy
+except ImportError :
+    bpy = None
+
+scriptPath = os.path.abspath(__file__)
+scriptDir = os.path.dirname(scriptPath)
+if scriptDir not in sys.path :
+    sys.path.append(scriptDir)
+
+# manifest "format" values that write the placements only, and their placement export formats
+placementExportFormats = {"csv" : 'CSV', "json" : 'JSON', "bin" : 'BINARY'}
+
+# reads clump specs from a JSON (list, or {"clumps": [...]}) or CSV manifest, CSV values stay strings until BuildClump types them
+def ReadManifest(manifestPath) :
+    if manifestPath.lower().endswith(".csv") :
+        specs = []
+        with open(manifestPath, newline="") as manifestFile :
+            for row in csv.DictReader(manifestFile) :
+                spec = {}
+                for key, value in row.items() :
+                    if value is None or value == "" :
+                        continue
+                    if key == "source_objects" :
+                        value = [name.strip() for name in value.split(";") if name.strip()]
+                    spec[key] = value
+                specs.append(spec)
+    else :
+        with open(manifestPath) as manifestFile :
+            specs = json.load(manifestFile)
+        if isinstance(specs, dict) :
+            specs = specs["clumps"]
+
+    for i, spec in enumerate(specs) :
+        spec.setdefault("name", "Clump_" + str(i))
+
+    return specs
+
+# splits the specs into chunks for the worker processes, a few per worker to even out the load
+def SplitSpecs(specs, workerCount) :
+    chunkCount = max(1, min(len(specs), workerCount * 4))
+
+    return [specs[i::chunkCount] for i in range(chunkCount)]
+
+# runs one background Blender process on a chunk of specs, returns (chunk index, return code, output)
+def RunWorker(blenderPath, chunkIndex, chunkPath, outputDir) :
+    command = [blenderPath, "-b", "--factory-startup", "--python", scriptPath, "--", "--worker", chunkPath, "--output-dir", outputDir]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+    return chunkIndex, process.returncode, process.stdout
+
+# parent process: writes the spec chunks to a temp folder and runs them on a pool of background Blender processes
+def RunBatch(args) :
+    blenderPath = args.blender or (bpy.app.binary_path if bpy else None)
+    if not blenderPath :
+        print("Foliage Placement batch: pass --blender when running outside of Blender.")
+        return 1
+
+    specs = ReadManifest(args.manifest)
+    os.makedirs(args.output_dir, exist_ok=True)
+    chunks = SplitSpecs(specs, args.workers)
+    print("Foliage Placement batch: " + str(len(specs)) + " clumps on " + str(args.workers) + " workers.")
+
+    failedCount = 0
+    with tempfile.TemporaryDirectory(prefix="foliage_batch_") as chunkDir :
+        chunkPaths = []
+        for i, chunk in enumerate(chunks) :
+            chunkPath = os.path.join(chunkDir, "chunk_" + str(i) + ".json")
+            with open(chunkPath, "w") as chunkFile :
+                json.dump(chunk, chunkFile)
+            chunkPaths.append(chunkPath)
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool :
+            futures = [pool.submit(RunWorker, blenderPath, i, chunkPath, os.path.abspath(args.output_dir)) for i, chunkPath in enumerate(chunkPaths)]
+            for future in futures :
+                chunkIndex, returnCode, output = future.result()
+                for line in output.splitlines() :
+                    if line.startswith("FPBATCH ") :
+                        result = json.loads(line[len("FPBATCH "):])
+                        print(("  ok     " if result["ok"] else "  FAILED ") + result["name"] + " " + result.get("message", ""))
+                        if not result["ok"] :
+                            failedCount += 1
+                if returnCode != 0 :
+                    failedCount += 1
+                    print("Foliage Placement batch: worker " + str(chunkIndex) + " exited with code " + str(returnCode) + ":")
+                    print(output)
+
+    print("Foliage Placement batch: done, " + str(failedCount) + " failures.")
+
+    return 1 if failedCount else 0
+
+# loads the foliage source objects of a spec into the scene, or creates the base grass mesh
+def LoadSourceObjects(FPTool, scene, spec) :
+    sourceFile = spec.get("source_file")
+    if not sourceFile :
+        sourceObj = FPTool.NewBaseMesh()
+        scene.collection.objects.link(sourceObj)
+        return [sourceObj]
+
+    with bpy.data.libraries.load(bpy.path.abspath(sourceFile), link=False) as (dataFrom, dataTo) :
+        objectNames = spec.get("source_objects") or dataFrom.objects
+        dataTo.objects = [name for name in objectNames if name in dataFrom.objects]
+
+    sourceObjects = []
+    for sourceObj in dataTo.objects :
+        if sourceObj is not None and sourceObj.type == 'MESH' :
+            scene.collection.objects.link(sourceObj)
+            sourceObjects.append(sourceObj)
+
+    return sourceObjects
+
+# builds one clump in a fresh scene and writes it to the output folder
+# converts a manifest value to the type of the tool property it sets, CSV manifests give every value as a string
+def PropertyValue(propertyType, value) :
+    if not isinstance(value, str) :
+        return value
+    if propertyType == 'INT' :
+        return int(value)
+    if propertyType == 'FLOAT' :
+        return float(value)
+    if propertyType == 'BOOLEAN' :
+        if value.strip().lower() in ("true", "1", "yes") :
+            return True
+        if value.strip().lower() in ("false", "0", "no") :
+            return False
+        raise ValueError("invalid boolean '" + value + "'")
+
+    return value
+
+# sets the spec values that name a tool property, typed by the property's RNA type (INT, FLOAT, BOOLEAN, ENUM, ...)
+def SetToolProperties(props, spec) :
+    properties = props.bl_rna.properties
+    for key, value in spec.items() :
+        if key in properties.keys() :
+            setattr(props, key, PropertyValue(properties[key].type, value))
+
+def BuildClump(FPTool, spec, outputDir) :
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    scene.unit_settings.system = 'METRIC'
+    scene.unit_settings.scale_length = 0.01
+    scene.unit_settings.length_unit = 'METERS'
+
+    SetToolProperties(scene.foliage_placement_properties, spec)
+
+    sourceObjects = LoadSourceObjects(FPTool, scene, spec)
+    if not sourceObjects :
+        raise RuntimeError("no mesh objects found in '" + str(spec.get("source_file")) + "'")
+
+    warnings = []
+    placementCount = FPTool.SpawnClump(scene, sourceObjects, report=lambda level, message : warnings.append(message))
+
+    outputFormat = spec.get("format", "blend").lower()
+    outputPath = os.path.join(outputDir, spec["name"] + "." + outputFormat)
+    if outputFormat == "fbx" :
+        # export the foliage copies, the Points backend's instancers (their instances are exported), or the merged clump, only
+        for o in scene.objects :
+            o.select_set(bool((o.get("fp_slot") is not None and o.get("fp_source")) or o.get("fp_instancer") or o.get("fp_merged")))
+        bpy.ops.export_scene.fbx(filepath=outputPath, use_selection=True, object_types={'MESH'})
+    elif outputFormat in placementExportFormats :
+        transforms = FPTool.ReadPlacements(bpy.data.collections.get("FoliagePlaceholders"))[1]
+        FPTool.FPCore.ExportPlacements(outputPath, placementExportFormats[outputFormat], [(spec["name"], transforms)])
+    else :
+        bpy.ops.wm.save_as_mainfile(filepath=outputPath, check_existing=False, copy=True)
+
+    return str(placementCount) + " placements -> " + outputPath + "".join(" (" + w + ")" for w in warnings)
+
+# worker process: builds every clump of a spec chunk, reporting one FPBATCH result line per clump
+def RunWorkerChunk(args) :
+    import FoliagePlacementTool_280 as FPTool
+    FPTool.register()
+
+    with open(args.worker) as chunkFile :
+        specs = json.load(chunkFile)
+
+    for spec in specs :
+        try :
+            message = BuildClump(FPTool, spec, args.output_dir)
+            result = {"name" : spec["name"], "ok" : True, "message" : message}
+        except Exception as error :
+            result = {"name" : spec["name"], "ok" : False, "message" : repr(error)}
+        print("FPBATCH " + json.dumps(result), flush=True)
+
+    return 0
+
+def ParseArguments(argv) :
+    parser = argparse.ArgumentParser(description="Generate foliage clump libraries in parallel background Blender processes.")
+    parser.add_argument("manifest", nargs="?", help="JSON or CSV manifest of clump specs")
+    parser.add_argument("--output-dir", default="clumps", help="folder for the generated .blend/.fbx files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of background Blender processes")
+    parser.add_argument("--blender", default=None, help="Blender executable, defaults to the running Blender")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    # Blender passes script arguments after "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    args = ParseArguments(argv)
+    if args.worker :
+        exitCode = RunWorkerChunk(args)
+    elif args.manifest :
+        exitCode = RunBatch(args)
+    else :
+        print("Foliage Placement batch: no manifest given.")
+        exitCode = 1
+    sys.exit(exitCode)
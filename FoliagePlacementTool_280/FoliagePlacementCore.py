@@ -0,0 +1,1073 @@
+# bpy-free math used by the Foliage Placement Tool. Only depends on NumPy (bundled with Blender),
+# so it can be imported, unit-tested and benchmarked outside of a running Blender session.
+
+import os
+import csv
+import json
+import time
+import struct
+import hashlib
+import zipfile
+import tempfile
+import numpy as np
+
+# returns the X/Y quadrant signs for a set of placeholder indices (the per-index grid layout of the original tool's random transforms).
+def QuadrantSigns(indices):
+    indices = np.asarray(indices, dtype=np.int64)
+    signX = np.where((indices % 4) < 2, -1.0, 1.0)
+    signY = np.where((indices % 2) == 0, 1.0, -1.0)
+
+    return signX, signY
+
+# builds a batch of foliage transforms from placement positions and per-placement scales.
+# blades face away from the origin and are pitched by maxRot scaled with their distance ratio.
+def TransformsFromPositions(positions, maxRot, maxDistance, scales):
+    positions = np.asarray(positions, dtype=np.float64)
+    count = len(positions)
+
+    planar = positions[:, :2]
+    distance = np.sqrt(np.einsum('ij,ij->i', planar, planar))
+    maxLength = np.sqrt(2.0) * maxDistance
+    distanceRatio = distance / maxLength if maxLength > 0 else np.zeros(count)
+    pitch = np.radians(maxRot * distanceRatio)
+
+    # facing direction in the XY plane, placements at the origin keep facing +X
+    safeDistance = np.where(distance > 0, distance, 1.0)
+    dirX = np.where(distance > 0, planar[:, 0] / safeDistance, 1.0)
+    dirY = np.where(distance > 0, planar[:, 1] / safeDistance, 0.0)
+
+    return ComposeTransforms(positions, dirX, dirY, pitch, scales)
+
+# composes (N,4,4) transforms: Translation @ Scale @ (Orientation(facing) @ RotationY(pitch)).
+def ComposeTransforms(positions, dirX, dirY, pitch, scales):
+    count = len(positions)
+    cosP = np.cos(pitch)
+    sinP = np.sin(pitch)
+    scales = np.broadcast_to(np.asarray(scales, dtype=np.float64), (count,))
+
+    # orientation columns are x = facing, y = z cross x, z = up; pitch rotates around the local Y axis
+    transforms = np.zeros((count, 4, 4), dtype=np.float32)
+    transforms[:, 0, 0] = dirX * cosP * scales
+    transforms[:, 0, 1] = -dirY * scales
+    transforms[:, 0, 2] = dirX * sinP * scales
+    transforms[:, 1, 0] = dirY * cosP * scales
+    transforms[:, 1, 1] = dirX * scales
+    transforms[:, 1, 2] = dirY * sinP * scales
+    transforms[:, 2, 0] = -sinP * scales
+    transforms[:, 2, 2] = cosP * scales
+    transforms[:, :3, 3] = positions
+    transforms[:, 3, 3] = 1.0
+
+    return transforms
+
+# returns a new random seed for callers that don't pass one.
+def NewSeed():
+    return int(np.random.SeedSequence().entropy % 2147483647)
+
+# SplitMix64 finalizer, applied element-wise to a uint64 array.
+def MixBits(values):
+    values = np.asarray(values, dtype=np.uint64)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return values ^ (values >> np.uint64(31))
+
+# counter-based random bits for placeholder slots. The value only depends on (seed, slot, variant, stream),
+# so any slot can be regenerated on its own and a whole clump is reproducible from its seed.
+# variant counts how often a single slot was respawned, stream separates the values drawn for one slot.
+def SlotRandomBits(seed, slots, variants=None, stream=0):
+    slots = np.asarray(slots, dtype=np.int64).astype(np.uint64)
+    variants = np.zeros(len(slots), dtype=np.uint64) if variants is None else np.asarray(variants, dtype=np.int64).astype(np.uint64)
+    golden = np.uint64(0x9E3779B97F4A7C15)
+
+    # uint64 arithmetic is meant to wrap around
+    with np.errstate(over='ignore') :
+        bits = MixBits(np.full(len(slots), seed, dtype=np.uint64) + golden)
+        bits = MixBits(bits + slots * golden)
+        bits = MixBits(bits + variants * golden)
+
+        return MixBits(bits + np.uint64(stream) * golden)
+
+# random integers in [low, high) per placeholder slot, see SlotRandomBits.
+def SlotIntegers(seed, slots, variants, stream, low, high):
+    bits = SlotRandomBits(seed, slots, variants, stream)
+
+    return (bits % np.uint64(high - low)).astype(np.int64) + low
+
+# NumPy generator for sampling that isn't per slot (Poisson disk, surface scatter), derived from the seed,
+# a stream number and optionally the slots and variants being respawned.
+def SeededGenerator(seed, stream, slots=None, variants=None):
+    entropy = [int(seed), int(stream)]
+    if slots is not None :
+        entropy += np.asarray(slots, dtype=np.int64).tolist()
+    if variants is not None :
+        entropy += np.asarray(variants, dtype=np.int64).tolist()
+
+    return np.random.default_rng(entropy)
+
+# random foliage transforms from the user transform parameters. Returns an (N,4,4) float32 array of placeholder transforms
+# for the given placeholder indices (or range(foliageCount) when no indices are passed).
+# each placement is drawn from the per-slot stream of (seed, index, variant).
+def GetRandomTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, indices=None, seed=None, variants=None):
+    if indices is None :
+        indices = np.arange(foliageCount)
+    indices = np.asarray(indices, dtype=np.int64)
+    count = len(indices)
+    if seed is None :
+        seed = NewSeed()
+
+    # random grid location from index, in 1% steps like the original randint(0,100) offsets
+    signX, signY = QuadrantSigns(indices)
+    positions = np.zeros((count, 3))
+    positions[:, 0] = maxDistance * SlotIntegers(seed, indices, variants, 0, 0, 101) / 100.0 * signX
+    positions[:, 1] = maxDistance * SlotIntegers(seed, indices, variants, 1, 0, 101) / 100.0 * signY
+
+    scaleMin = min(100, (100 + maxScaleOffset))
+    scaleMax = max(100, (100 + maxScaleOffset))
+    scales = SlotIntegers(seed, indices, variants, 2, scaleMin, scaleMax + 1) / 100.0
+
+    return TransformsFromPositions(positions, maxRot, maxDistance, scales)
+
+# random uniform scales between 100% and 100% + maxScaleOffset, in 1% steps.
+def RandomScales(count, maxScaleOffset, rng):
+    scaleMin = min(100, (100 + maxScaleOffset))
+    scaleMax = max(100, (100 + maxScaleOffset))
+
+    return rng.integers(scaleMin, scaleMax + 1, size=count) / 100.0
+
+# uniform random points inside a disc of the given radius, as an (N,2) array.
+def RandomDiscPoints(count, radius, rng):
+    angles = rng.uniform(0.0, 2.0 * np.pi, count)
+    radii = radius * np.sqrt(rng.uniform(0.0, 1.0, count))
+
+    return np.stack((radii * np.cos(angles), radii * np.sin(angles)), axis=1)
+
+# background grid spatial hash for Poisson-disk sampling. Each cell (size minSpacing / sqrt 2) holds at most one point,
+# so checking a candidate only needs the 5x5 block of cells around it.
+class PoissonGrid:
+    def __init__(self, minSpacing):
+        self.minSpacing = minSpacing
+        self.minSpacingSquared = minSpacing * minSpacing
+        self.cellSize = minSpacing / np.sqrt(2.0)
+        self.cells = {}
+
+    def CellCoords(self, x, y):
+        return (int(np.floor(x / self.cellSize)), int(np.floor(y / self.cellSize)))
+
+    # checks that a point keeps minSpacing to every point already in the grid
+    def IsFree(self, x, y):
+        cellX, cellY = self.CellCoords(x, y)
+        for i in range(cellX - 2, cellX + 3) :
+            for j in range(cellY - 2, cellY + 3) :
+                point = self.cells.get((i, j))
+                if point is not None and (point[0] - x) ** 2 + (point[1] - y) ** 2 < self.minSpacingSquared :
+                    return False
+
+        return True
+
+    def Add(self, x, y):
+        self.cells[self.CellCoords(x, y)] = (x, y)
+
+# Poisson-disk sampling inside a disc: random darts are tested against the grid hash and kept when they are at least
+# minSpacing away from every accepted point (and from existingPoints). Each test is constant time, so the run stays
+# near-linear in count. Stops after count points or `attempts` darts per requested point, whichever comes first.
+def PoissonDiskPoints(count, radius, minSpacing, rng, existingPoints=None, attempts=30):
+    grid = PoissonGrid(minSpacing)
+    if existingPoints is not None :
+        for x, y in np.asarray(existingPoints, dtype=np.float64).reshape(-1, 2).tolist() :
+            grid.Add(x, y)
+
+    points = []
+    dartsLeft = attempts * count
+    while len(points) < count and dartsLeft > 0 :
+        batchSize = min(dartsLeft, max(1024, 2 * (count - len(points))))
+        dartsLeft -= batchSize
+        for x, y in RandomDiscPoints(batchSize, radius, rng).tolist() :
+            if grid.IsFree(x, y) :
+                grid.Add(x, y)
+                points.append((x, y))
+                if len(points) == count :
+                    break
+
+    return np.array(points, dtype=np.float64).reshape(-1, 2)
+
+# Poisson-disk variant of GetRandomTransforms: foliageCount placements inside the maxDistance radius with at least
+# minSpacing between them (and to existingPositions, when respawning single placements), fed through the same rotation
+# and scale pipeline. When the disc can't fit foliageCount spaced points, the remainder is filled with random points.
+# Returns the transforms and the number of spaced points.
+def GetPoissonTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, minSpacing, rng=None, existingPositions=None):
+    if rng is None :
+        rng = np.random.default_rng()
+    existingPoints = None if existingPositions is None else np.asarray(existingPositions).reshape(-1, 3)[:, :2]
+
+    planar = PoissonDiskPoints(foliageCount, maxDistance, max(minSpacing, 1e-6), rng, existingPoints)
+    spacedCount = len(planar)
+    if spacedCount < foliageCount :
+        planar = np.concatenate((planar, RandomDiscPoints(foliageCount - spacedCount, maxDistance, rng)))
+
+    positions = np.zeros((foliageCount, 3))
+    positions[:, :2] = planar
+    scales = RandomScales(foliageCount, maxScaleOffset, rng)
+
+    return TransformsFromPositions(positions, maxRot, maxDistance, scales), spacedCount
+
+# pairs (i, j) of overlapping 2D boxes, from a uniform grid sized to the median box: every box is entered in each
+# cell it covers, boxes are paired with the boxes in their cells, and a pair is kept once, in the cell of the lower
+# corner of the overlap. With a queryMask, only pairs with at least one queried box are returned, the queried box
+# first. Returns two index arrays.
+def BoxOverlapPairs(boxMins, boxMaxs, queryMask=None):
+    boxMins = np.asarray(boxMins, dtype=np.float64).reshape(-1, 2)
+    boxMaxs = np.asarray(boxMaxs, dtype=np.float64).reshape(-1, 2)
+    count = len(boxMins)
+    if count < 2 :
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    cellSize = max(float(np.median(np.max(boxMaxs - boxMins, axis=1))), 1e-9)
+    origin = boxMins.min(axis=0)
+    cellMins = np.floor((boxMins - origin) / cellSize).astype(np.int64)
+    cellMaxs = np.floor((boxMaxs - origin) / cellSize).astype(np.int64)
+    rowLength = cellMaxs[:, 1].max() + 1
+    spans = cellMaxs - cellMins + 1
+    cellCounts = spans[:, 0] * spans[:, 1]
+    boxes = np.repeat(np.arange(count), cellCounts)
+    local = np.arange(len(boxes)) - np.repeat(np.cumsum(cellCounts) - cellCounts, cellCounts)
+    keys = (cellMins[boxes, 0] + local // spans[boxes, 1]) * rowLength + cellMins[boxes, 1] + local % spans[boxes, 1]
+    order = np.argsort(keys, kind='stable')
+    keys, boxes = keys[order], boxes[order]
+    cellEnds = np.searchsorted(keys, keys, side='right')
+
+    if queryMask is None :
+        entries = np.arange(len(boxes))
+        firsts = entries + 1
+    else :
+        queryMask = np.asarray(queryMask, dtype=bool)
+        entries = np.nonzero(queryMask[boxes])[0]
+        firsts = np.searchsorted(keys, keys[entries], side='left')
+    counts = cellEnds[entries] - firsts
+    total = counts.sum()
+    if total == 0 :
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # expand every [first, cell end) range of the sorted entries
+    pairEntries = np.repeat(entries, counts)
+    i = boxes[pairEntries]
+    j = boxes[np.arange(total) + np.repeat(firsts - np.cumsum(counts) + counts, counts)]
+    keep = np.ones(total, dtype=bool) if queryMask is None else (i != j) & ~(queryMask[j] & (j < i))
+    cellMinX, cellMinY = cellMins[:, 0], cellMins[:, 1]
+    keep &= np.maximum(cellMinX[i], cellMinX[j]) * rowLength + np.maximum(cellMinY[i], cellMinY[j]) == keys[pairEntries]
+    i, j = i[keep], j[keep]
+    minX, minY, maxX, maxY = boxMins[:, 0], boxMins[:, 1], boxMaxs[:, 0], boxMaxs[:, 1]
+    keep = (np.maximum(minX[i], minX[j]) <= np.minimum(maxX[i], maxX[j])) & (np.maximum(minY[i], minY[j]) <= np.minimum(maxY[i], maxY[j]))
+
+    return i[keep], j[keep]
+
+# parameters (s, t) of the closest points of segment pairs p1 + s * d1 and p2 + t * d2, both in [0, 1].
+# all segments must have a non-zero length.
+def SegmentClosestParameters(p1, d1, p2, d2):
+    r = p1 - p2
+    a = np.einsum('ij,ij->i', d1, d1)
+    e = np.einsum('ij,ij->i', d2, d2)
+    b = np.einsum('ij,ij->i', d1, d2)
+    c = np.einsum('ij,ij->i', d1, r)
+    f = np.einsum('ij,ij->i', d2, r)
+
+    # parallel segments take s = 0
+    denominator = a * e - b * b
+    safeDenominator = np.where(denominator > 1e-12 * a * e, denominator, 1.0)
+    s = np.where(denominator > 1e-12 * a * e, np.clip((b * f - c * e) / safeDenominator, 0.0, 1.0), 0.0)
+    t = (b * s + f) / e
+    s = np.where(t < 0.0, np.clip(-c / a, 0.0, 1.0), np.where(t > 1.0, np.clip((b - c) / a, 0.0, 1.0), s))
+
+    return s, np.clip(t, 0.0, 1.0)
+
+# pairs (i, j) of segments from bases to tips that are closer than reach. Their horizontal boxes, grown by half the
+# reach, are paired by BoxOverlapPairs, and the pairs are then checked exactly. queryMask works as in BoxOverlapPairs.
+def SegmentNeighbourPairs(bases, tips, reach, queryMask=None):
+    boxMins = np.minimum(bases[:, :2], tips[:, :2]) - 0.5 * reach
+    boxMaxs = np.maximum(bases[:, :2], tips[:, :2]) + 0.5 * reach
+    pairsI, pairsJ = BoxOverlapPairs(boxMins, boxMaxs, queryMask)
+    directionsI = tips[pairsI] - bases[pairsI]
+    directionsJ = tips[pairsJ] - bases[pairsJ]
+    s, t = SegmentClosestParameters(bases[pairsI], directionsI, bases[pairsJ], directionsJ)
+    separations = (bases[pairsI] + directionsI * s[:, None]) - (bases[pairsJ] + directionsJ * t[:, None])
+    keep = np.einsum('ij,ij->i', separations, separations) < reach * reach
+
+    return pairsI[keep], pairsJ[keep]
+
+# collision-aware tilt. Blades are segments from the placement position along the placeholder Z axis, bladeLength
+# long (times their scale), and collide when they come closer than bladeWidth. Each iteration finds the colliding
+# pairs in a neighbour list, and pushes the closest points of every pair apart: the push is shared between the base
+# and the tip of each blade by where the contact is, bases only move horizontally, and tips keep the blade length.
+# The blades are then rotated onto their new direction, keeping their facing as far as possible.
+# The neighbour list holds the pairs closer than bladeWidth plus a margin. Only blades whose ends moved further than
+# the margin since they were last looked up are looked up again, and only pairs with a pushed blade are checked.
+# Blades where movable is False stay in place (their partners take the whole push).
+# Returns the relaxed (N,4,4) transforms and the number of colliding pairs left after the last iteration.
+def RelaxBladeCollisions(transforms, bladeLength, bladeWidth, iterations=8, movable=None):
+    transforms = np.array(transforms, dtype=np.float64).reshape(-1, 4, 4)
+    count = len(transforms)
+    if count < 2 or bladeLength <= 0 or bladeWidth <= 0 or iterations <= 0 :
+        return transforms.astype(np.float32), 0
+
+    movable = np.ones(count, dtype=bool) if movable is None else np.asarray(movable, dtype=bool)
+    axes = transforms[:, :3, 2]
+    scales = np.sqrt(np.einsum('ij,ij->i', axes, axes))
+    lengths = bladeLength * scales
+    bases = transforms[:, :3, 3].copy()
+    tips = bases + axes * bladeLength
+
+    # a blade looked up again is checked against blades that may have moved up to twice the margin since their own
+    # lookup, hence the larger reach
+    margin = 0.5 * bladeWidth
+    neighboursI, neighboursJ = SegmentNeighbourPairs(bases, tips, bladeWidth + 2.0 * margin)
+    lookupBases, lookupTips = bases.copy(), tips.copy()
+    pushed = np.ones(count, dtype=bool)
+    remaining = 0
+    for iteration in range(iterations + 1) :
+        stale = np.maximum(np.abs(bases - lookupBases).max(axis=1), np.abs(tips - lookupTips).max(axis=1)) > margin
+        if np.any(stale) :
+            keep = ~(stale[neighboursI] | stale[neighboursJ])
+            staleI, staleJ = SegmentNeighbourPairs(bases, tips, bladeWidth + 3.0 * margin, stale)
+            neighboursI = np.concatenate((neighboursI[keep], staleI))
+            neighboursJ = np.concatenate((neighboursJ[keep], staleJ))
+            lookupBases[stale], lookupTips[stale] = bases[stale], tips[stale]
+        # only blades that were pushed can collide anew
+        keep = (pushed[neighboursI] | pushed[neighboursJ]) & (movable[neighboursI] | movable[neighboursJ])
+        pairsI, pairsJ = neighboursI[keep], neighboursJ[keep]
+        directionsI = tips[pairsI] - bases[pairsI]
+        directionsJ = tips[pairsJ] - bases[pairsJ]
+        s, t = SegmentClosestParameters(bases[pairsI], directionsI, bases[pairsJ], directionsJ)
+        separations = (bases[pairsI] + directionsI * s[:, None]) - (bases[pairsJ] + directionsJ * t[:, None])
+        distances = np.sqrt(np.einsum('ij,ij->i', separations, separations))
+        colliding = distances < bladeWidth
+        remaining = int(colliding.sum())
+        if remaining == 0 or iteration == iterations :
+            break
+
+        pairsI, pairsJ, s, t = pairsI[colliding], pairsJ[colliding], s[colliding], t[colliding]
+        separations, distances = separations[colliding], distances[colliding]
+        # blades that touch at a single point are pushed apart along X
+        touching = distances < 1e-9
+        normals = np.where(touching[:, None], np.array([1.0, 0.0, 0.0]), separations / np.where(touching, 1.0, distances)[:, None])
+        # a fixed partner leaves the whole push to the movable blade
+        shareI = np.where(movable[pairsJ], 0.5, 1.0) * movable[pairsI]
+        shareJ = np.where(movable[pairsI], 0.5, 1.0) * movable[pairsJ]
+        depths = 1.1 * bladeWidth - distances
+
+        # distribute each push over the two ends of a blade, so that the contact point moves by the push
+        baseMoves = np.zeros((count, 3))
+        tipMoves = np.zeros((count, 3))
+        contacts = np.zeros(count)
+        for blades, parameters, share, sign in ((pairsI, s, shareI, 1.0), (pairsJ, t, shareJ, -1.0)) :
+            pushes = normals * (sign * share * depths / (parameters * parameters + (1.0 - parameters) ** 2))[:, None]
+            for axis in range(3) :
+                baseMoves[:, axis] += np.bincount(blades, pushes[:, axis] * (1.0 - parameters), count)
+                tipMoves[:, axis] += np.bincount(blades, pushes[:, axis] * parameters, count)
+            contacts += np.bincount(blades, share > 0, count)
+
+        # blades with several contacts take the sum of their pushes. Moving the base moves the whole blade
+        pushed = contacts > 0
+        baseMoves[:, 2] = 0.0
+        directions = tips - bases + tipMoves
+        bases += baseMoves
+        # blades stay above the ground
+        directions[:, 2] = np.maximum(directions[:, 2], 0.05 * np.sqrt(np.einsum('ij,ij->i', directions, directions)))
+        directions /= np.sqrt(np.einsum('ij,ij->i', directions, directions))[:, None]
+        tips = bases + directions * lengths[:, None]
+
+    # rotate every blade frame by the smallest rotation from its old Z axis to its new direction
+    oldAxes = axes / scales[:, None]
+    newAxes = (tips - bases) / lengths[:, None]
+    crosses = np.cross(oldAxes, newAxes)
+    cosines = np.einsum('ij,ij->i', oldAxes, newAxes)
+    skews = np.zeros((count, 3, 3))
+    skews[:, 0, 1], skews[:, 0, 2], skews[:, 1, 2] = -crosses[:, 2], crosses[:, 1], -crosses[:, 0]
+    skews -= skews.transpose(0, 2, 1)
+    rotations = np.eye(3) + skews + np.matmul(skews, skews) / (1.0 + cosines)[:, None, None]
+    transforms[:, :3, :3] = np.matmul(rotations, transforms[:, :3, :3])
+    transforms[:, :3, 3] = bases
+
+    return transforms.astype(np.float32), remaining
+
+# scales between 100% and 100% + maxScaleOffset driven by map values in [0, 1], in 1% steps.
+def MapScales(values, maxScaleOffset):
+    return np.round(100.0 + maxScaleOffset * np.clip(values, 0.0, 1.0)) / 100.0
+
+# importance sampling of a grayscale density map: pixels are drawn with a probability proportional to their value,
+# through the cumulative distribution of the pixel values. A map without any density samples all pixels alike.
+class DensityMap:
+    def __init__(self, values, width, height):
+        self.width = width
+        self.height = height
+        self.values = np.clip(np.asarray(values, dtype=np.float64).reshape(-1), 0.0, 1.0)
+        cumulative = np.cumsum(self.values)
+        self.cdf = cumulative / cumulative[-1] if len(cumulative) > 0 and cumulative[-1] > 0 else None
+        self.hash = hashlib.sha1(np.asarray(self.values, dtype=np.float32).tobytes()).hexdigest()
+
+    # builds the map from Blender's flat RGBA (or single channel) float pixels, using the luminance of RGB
+    @staticmethod
+    def FromPixels(pixels, width, height, channels=4):
+        pixels = np.asarray(pixels, dtype=np.float32).reshape(-1, channels)
+        values = pixels[:, :3] @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32) if channels >= 3 else pixels[:, 0]
+
+        return DensityMap(values, width, height)
+
+    # draws count points, returning their (N,2) UV coordinates in [0, 1] (jittered inside their pixel) and the
+    # map values at them. Pixel rows run bottom to top, like Blender image pixels.
+    def Sample(self, count, rng):
+        if self.cdf is None :
+            pixels = rng.integers(0, len(self.values), size=count)
+        else :
+            pixels = np.minimum(np.searchsorted(self.cdf, rng.uniform(0.0, 1.0, count), side='right'), len(self.values) - 1)
+        jitter = rng.uniform(0.0, 1.0, (count, 2))
+        uvs = np.stack(((pixels % self.width + jitter[:, 0]) / self.width, (pixels // self.width + jitter[:, 1]) / self.height), axis=1)
+
+        return uvs, self.values[pixels]
+
+# density map variant of GetRandomTransforms: the map covers the square of maxDistance around the origin, and
+# placements are drawn in one pass with the density of the map. With mapScale, scales follow the map values
+# (see MapScales) instead of being random.
+def DensityMapTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, densityMap, rng=None, mapScale=False):
+    if rng is None :
+        rng = np.random.default_rng()
+    uvs, values = densityMap.Sample(foliageCount, rng)
+    positions = np.zeros((foliageCount, 3))
+    positions[:, :2] = (uvs * 2.0 - 1.0) * maxDistance
+    scales = MapScales(values, maxScaleOffset) if mapScale else RandomScales(foliageCount, maxScaleOffset, rng)
+
+    return TransformsFromPositions(positions, maxRot, maxDistance, scales)
+
+# converts XYZ euler angles (N,3) to (N,3,3) rotation matrices, using Blender's R = Rz @ Ry @ Rx convention.
+def EulersToMatrices(eulers):
+    eulers = np.asarray(eulers, dtype=np.float64)
+    cosX, cosY, cosZ = np.cos(eulers).T
+    sinX, sinY, sinZ = np.sin(eulers).T
+
+    matrices = np.empty((len(eulers), 3, 3))
+    matrices[:, 0, 0] = cosZ * cosY
+    matrices[:, 0, 1] = cosZ * sinY * sinX - sinZ * cosX
+    matrices[:, 0, 2] = cosZ * sinY * cosX + sinZ * sinX
+    matrices[:, 1, 0] = sinZ * cosY
+    matrices[:, 1, 1] = sinZ * sinY * sinX + cosZ * cosX
+    matrices[:, 1, 2] = sinZ * sinY * cosX - cosZ * sinX
+    matrices[:, 2, 0] = -sinY
+    matrices[:, 2, 1] = cosY * sinX
+    matrices[:, 2, 2] = cosY * cosX
+
+    return matrices
+
+# converts (N,3,3) rotation matrices to XYZ euler angles (N,3), the inverse of EulersToMatrices.
+def MatricesToEulers(matrices):
+    matrices = np.asarray(matrices, dtype=np.float64)
+    cosY = np.hypot(matrices[:, 0, 0], matrices[:, 1, 0])
+    locked = cosY < 1e-6
+
+    eulers = np.empty((len(matrices), 3))
+    eulers[:, 0] = np.where(locked, 0.0, np.arctan2(matrices[:, 2, 1], matrices[:, 2, 2]))
+    eulers[:, 1] = np.arctan2(-matrices[:, 2, 0], cosY)
+    eulers[:, 2] = np.where(locked, np.arctan2(-matrices[:, 0, 1], matrices[:, 1, 1]), np.arctan2(matrices[:, 1, 0], matrices[:, 0, 0]))
+
+    return eulers
+
+# splits (N,4,4) uniformly scaled transforms into positions (N,3), XYZ eulers (N,3) and scales (N,).
+def DecomposeTransforms(transforms):
+    transforms = np.asarray(transforms, dtype=np.float64)
+    positions = transforms[:, :3, 3].copy()
+    scales = np.linalg.norm(transforms[:, :3, 0], axis=1)
+    safeScales = np.where(scales > 0, scales, 1.0)
+    eulers = MatricesToEulers(transforms[:, :3, :3] / safeScales[:, None, None])
+
+    return positions, eulers, scales
+
+# builds (N,4,4) transforms from positions, XYZ eulers and uniform scales, the inverse of DecomposeTransforms.
+def ComposeEulerTransforms(positions, eulers, scales):
+    count = len(positions)
+    scales = np.broadcast_to(np.asarray(scales, dtype=np.float64), (count,))
+
+    transforms = np.zeros((count, 4, 4), dtype=np.float32)
+    transforms[:, :3, :3] = EulersToMatrices(eulers) * scales[:, None, None]
+    transforms[:, :3, 3] = positions
+    transforms[:, 3, 3] = 1.0
+
+    return transforms
+
+# converts (N,3,3) rotation matrices to unit quaternions (N,4) in Blender's (w, x, y, z) order.
+# each row uses the largest of w, x, y, z as its pivot, which keeps the conversion stable for every rotation.
+def MatricesToQuaternions(matrices):
+    matrices = np.asarray(matrices, dtype=np.float64)
+    m = matrices
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    # 4 * (w^2, x^2, y^2, z^2)
+    squares = np.stack((1.0 + trace,
+                        1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2],
+                        1.0 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2],
+                        1.0 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2]), axis=1)
+    pivot = np.argmax(squares, axis=1)
+
+    sumsYZ = (m[:, 2, 1] - m[:, 1, 2], m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0])
+    sumsXZ = (m[:, 0, 2] - m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1])
+    differenceXY = m[:, 1, 0] - m[:, 0, 1]
+    # rows of 4 * q * q[pivot] for each pivot, the pivot entry is then divided out
+    candidates = np.stack((np.stack((squares[:, 0], sumsYZ[0], sumsXZ[0], differenceXY), axis=1),
+                           np.stack((sumsYZ[0], squares[:, 1], sumsYZ[1], sumsYZ[2]), axis=1),
+                           np.stack((sumsXZ[0], sumsYZ[1], squares[:, 2], sumsXZ[1]), axis=1),
+                           np.stack((differenceXY, sumsYZ[2], sumsXZ[1], squares[:, 3]), axis=1)), axis=1)
+    rows = np.arange(len(matrices))
+    quaternions = candidates[rows, pivot] / (2.0 * np.sqrt(np.maximum(squares[rows, pivot], 1e-300)))[:, None]
+    # keep w positive, q and -q are the same rotation
+    quaternions *= np.where(quaternions[:, 0] < 0, -1.0, 1.0)[:, None]
+
+    return quaternions
+
+# converts unit quaternions (N,4) in (w, x, y, z) order to (N,3,3) rotation matrices, the inverse of MatricesToQuaternions.
+def QuaternionsToMatrices(quaternions):
+    quaternions = np.asarray(quaternions, dtype=np.float64)
+    quaternions = quaternions / np.maximum(np.linalg.norm(quaternions, axis=1), 1e-12)[:, None]
+    w, x, y, z = quaternions.T
+
+    matrices = np.empty((len(quaternions), 3, 3))
+    matrices[:, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[:, 0, 1] = 2.0 * (x * y - w * z)
+    matrices[:, 0, 2] = 2.0 * (x * z + w * y)
+    matrices[:, 1, 0] = 2.0 * (x * y + w * z)
+    matrices[:, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[:, 1, 2] = 2.0 * (y * z - w * x)
+    matrices[:, 2, 0] = 2.0 * (x * z - w * y)
+    matrices[:, 2, 1] = 2.0 * (y * z + w * x)
+    matrices[:, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+
+    return matrices
+
+# number of float32 values per placement in a packed placement buffer: position (3), quaternion (4), uniform scale (1)
+PLACEMENT_STRIDE = 8
+
+# packs (N,4,4) uniformly scaled placement transforms into a flat float32 buffer of PLACEMENT_STRIDE values each.
+def PackPlacements(transforms):
+    transforms = np.asarray(transforms, dtype=np.float64).reshape(-1, 4, 4)
+    scales = np.linalg.norm(transforms[:, :3, 0], axis=1)
+    safeScales = np.where(scales > 0, scales, 1.0)
+
+    packed = np.empty((len(transforms), PLACEMENT_STRIDE), dtype=np.float32)
+    packed[:, :3] = transforms[:, :3, 3]
+    packed[:, 3:7] = MatricesToQuaternions(transforms[:, :3, :3] / safeScales[:, None, None])
+    packed[:, 7] = scales
+
+    return packed.ravel()
+
+# unpacks a buffer written by PackPlacements into (N,4,4) float32 transforms.
+def UnpackPlacements(packed):
+    packed = np.asarray(packed, dtype=np.float64).reshape(-1, PLACEMENT_STRIDE)
+
+    transforms = np.zeros((len(packed), 4, 4), dtype=np.float32)
+    transforms[:, :3, :3] = QuaternionsToMatrices(packed[:, 3:7]) * packed[:, 7, None, None]
+    transforms[:, :3, 3] = packed[:, :3]
+    transforms[:, 3, 3] = 1.0
+
+    return transforms
+
+# foliage meshes are modelled along X, copies rotate them -90 degrees around Y so X points up the placeholder Z axis.
+COPY_OFFSET_MATRIX = np.array([[0.0, 0.0, -1.0, 0.0],
+                               [0.0, 1.0, 0.0, 0.0],
+                               [1.0, 0.0, 0.0, 0.0],
+                               [0.0, 0.0, 0.0, 1.0]])
+
+# returns the foliage copy transforms for a batch of placeholder transforms.
+def CopyTransforms(placeholderTransforms):
+    return np.matmul(np.asarray(placeholderTransforms, dtype=np.float64), COPY_OFFSET_MATRIX).astype(np.float32)
+
+# returns the placeholder transforms for a batch of foliage copy transforms, the inverse of CopyTransforms.
+def PlaceholderTransforms(copyTransforms):
+    return np.matmul(np.asarray(copyTransforms, dtype=np.float64).reshape(-1, 4, 4), COPY_OFFSET_MATRIX.T).astype(np.float32)
+
+# deterministic LOD thinning: every slot gets a priority from the clump seed, and LOD k keeps the
+# ceil(N * keepRatio^k) placements of highest priority, so each LOD is a subset of the one above and a
+# respawned placement keeps its priority. Returns the sorted rows of every LOD, LOD0 first.
+def LodRows(seed, slots, lodCount, keepRatio):
+    slots = np.asarray(slots, dtype=np.int64)
+    order = np.argsort(SlotRandomBits(seed, slots, stream=4), kind='stable')
+    lodRows = []
+    for lod in range(lodCount) :
+        keepCount = min(len(slots), max(1, int(np.ceil(len(slots) * keepRatio ** lod))))
+        lodRows.append(np.sort(order[:keepCount]))
+
+    return lodRows
+
+# flags the placeholders whose slot is missing from a snapshot, or whose transform differs from the snapshot one.
+def ChangedSlots(slots, transforms, snapshotSlots, snapshotTransforms, tolerance=1e-5):
+    slots = np.asarray(slots, dtype=np.int64)
+    snapshotSlots = np.asarray(snapshotSlots, dtype=np.int64)
+    if len(snapshotSlots) == 0 :
+        return np.ones(len(slots), dtype=bool)
+
+    order = np.argsort(snapshotSlots)
+    sortedSlots = snapshotSlots[order]
+    rows = np.minimum(np.searchsorted(sortedSlots, slots), len(sortedSlots) - 1)
+    found = sortedSlots[rows] == slots
+    previous = np.asarray(snapshotTransforms).reshape(-1, 16)[order[rows]]
+    current = np.asarray(transforms).reshape(-1, 16)
+    moved = np.any(np.abs(current - previous) > tolerance, axis=1)
+
+    return ~found | moved
+
+# matches a set of slots against the slots of a placement. Returns the placement row of each query slot, or -1 if it has none.
+def MatchSlots(querySlots, slots):
+    querySlots = np.asarray(querySlots, dtype=np.int64)
+    slots = np.asarray(slots, dtype=np.int64)
+    if len(slots) == 0 :
+        return np.full(len(querySlots), -1, dtype=np.int64)
+
+    order = np.argsort(slots, kind="stable")
+    sortedSlots = slots[order]
+    rows = np.minimum(np.searchsorted(sortedSlots, querySlots), len(sortedSlots) - 1)
+
+    return np.where(sortedSlots[rows] == querySlots, order[rows], -1)
+
+# plans an incremental update of a set of foliage copies against the current placeholders.
+# returns the placeholder rows whose copy needs a new transform, the rows that need a new copy,
+# and the copy slots that no longer have a placeholder.
+def PlanCopyUpdates(slots, transforms, copySlots, snapshotSlots, snapshotTransforms):
+    slots = np.asarray(slots, dtype=np.int64)
+    copySlots = np.asarray(copySlots, dtype=np.int64)
+    hasCopy = np.isin(slots, copySlots)
+    changed = ChangedSlots(slots, transforms, snapshotSlots, snapshotTransforms)
+
+    updateRows = np.flatnonzero(hasCopy & changed)
+    createRows = np.flatnonzero(~hasCopy)
+    removeSlots = np.setdiff1d(copySlots, slots)
+
+    return updateRows, createRows, removeSlots
+
+# builds the cumulative area table used to pick triangles proportional to their area.
+# vertices is (V,3), triangles is (T,3) vertex indices. Returns the normalized cumulative areas (T,) and the total area.
+def BuildAreaTable(vertices, triangles, triangleWeights=None):
+    corners = np.asarray(vertices, dtype=np.float64)[np.asarray(triangles, dtype=np.int64)]
+    crosses = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = 0.5 * np.linalg.norm(crosses, axis=1)
+    if triangleWeights is not None :
+        weightedAreas = areas * np.clip(triangleWeights, 0.0, None)
+        # all-zero weights fall back to the plain area table, like an all-black density map samples uniformly
+        if weightedAreas.sum() > 0 :
+            areas = weightedAreas
+    cumulativeAreas = np.cumsum(areas)
+    totalArea = cumulativeAreas[-1] if len(cumulativeAreas) > 0 else 0.0
+    if totalArea > 0 :
+        cumulativeAreas /= totalArea
+
+    return cumulativeAreas, totalArea
+
+# samples count uniformly distributed points on a triangle mesh, using its area table.
+# returns the positions (N,3) and the unit face normals (N,3) at the sampled points, and the per-vertex values
+# interpolated at them (None without vertexValues).
+def SampleSurfacePoints(vertices, triangles, cumulativeAreas, count, rng, vertexValues=None):
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    picks = np.minimum(np.searchsorted(cumulativeAreas, rng.uniform(0.0, 1.0, count), side='right'), len(triangles) - 1)
+    corners = vertices[triangles[picks]]
+
+    # uniform barycentric coordinates, folding the samples that land outside the triangle back inside
+    u = rng.uniform(0.0, 1.0, count)
+    v = rng.uniform(0.0, 1.0, count)
+    outside = (u + v) > 1.0
+    u = np.where(outside, 1.0 - u, u)
+    v = np.where(outside, 1.0 - v, v)
+    edgeA = corners[:, 1] - corners[:, 0]
+    edgeB = corners[:, 2] - corners[:, 0]
+    positions = corners[:, 0] + u[:, None] * edgeA + v[:, None] * edgeB
+
+    normals = np.cross(edgeA, edgeB)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+
+    values = None
+    if vertexValues is not None :
+        cornerValues = np.asarray(vertexValues, dtype=np.float64)[triangles[picks]]
+        values = (1.0 - u - v) * cornerValues[:, 0] + u * cornerValues[:, 1] + v * cornerValues[:, 2]
+
+    return positions, normals, values
+
+# rotation matrices (N,3,3) that turn the +Z axis onto a set of unit normals (N,3).
+def NormalAlignMatrices(normals):
+    normals = np.asarray(normals, dtype=np.float64)
+    count = len(normals)
+    # Rodrigues' formula for the rotation from Z to n: I + [v]x + [v]x^2 / (1 + cos), with v = Z x n
+    axisX = -normals[:, 1]
+    axisY = normals[:, 0]
+    cosine = normals[:, 2]
+    flipped = cosine < -1.0 + 1e-9
+    factor = 1.0 / np.where(flipped, 1.0, 1.0 + cosine)
+
+    matrices = np.zeros((count, 3, 3))
+    matrices[:, 0, 0] = 1.0 - axisY * axisY * factor
+    matrices[:, 0, 1] = axisX * axisY * factor
+    matrices[:, 0, 2] = axisY
+    matrices[:, 1, 0] = axisX * axisY * factor
+    matrices[:, 1, 1] = 1.0 - axisX * axisX * factor
+    matrices[:, 1, 2] = -axisX
+    matrices[:, 2, 0] = -axisY
+    matrices[:, 2, 1] = axisX
+    matrices[:, 2, 2] = cosine
+    # normals pointing straight down rotate 180 degrees around X
+    matrices[flipped] = np.diag((1.0, -1.0, -1.0))
+
+    return matrices
+
+# builds placeholder transforms for points scattered on a surface. Facing and pitch come from the planar offset to the
+# scatter center (as in TransformsFromPositions, with maxDistance = radius), then the blade's Z axis is aligned to the normal.
+# scales are random unless passed in.
+def SurfaceTransforms(positions, normals, center, radius, maxRot, maxScaleOffset, rng=None, scales=None):
+    if rng is None :
+        rng = np.random.default_rng()
+    positions = np.asarray(positions, dtype=np.float64)
+    offsets = positions - np.asarray(center, dtype=np.float64)
+    offsets[:, 2] = 0.0
+
+    if scales is None :
+        scales = RandomScales(len(positions), maxScaleOffset, rng)
+    transforms = TransformsFromPositions(offsets, maxRot, radius, scales)
+    transforms[:, :3, :3] = np.matmul(NormalAlignMatrices(normals), transforms[:, :3, :3])
+    transforms[:, :3, 3] = positions
+
+    return transforms
+
+# loop indices of a mesh in polygon order, from its polygon loop starts and loop totals.
+def PolygonLoopOrder(loopStarts, loopTotals):
+    loopStarts = np.asarray(loopStarts, dtype=np.int64)
+    loopTotals = np.asarray(loopTotals, dtype=np.int64)
+    packedStarts = np.cumsum(loopTotals) - loopTotals
+
+    return np.repeat(loopStarts - packedStarts, loopTotals) + np.arange(loopTotals.sum())
+
+# merges copies of one source mesh placed by (N,4,4) transforms into single buffers, in one batch.
+# vertices is (V,3), loopTotals (P,) the loops of each polygon, loopVertices (L,) the vertex of each loop in polygon
+# order, and loopArrays optional per-loop arrays (e.g. UVs (L,2)) repeated for every copy.
+# returns the merged vertices (N*V,3), loop totals (N*P,), loop vertices (N*L,) and loop arrays
+def MergeMeshCopies(vertices, loopTotals, loopVertices, transforms, loopArrays=()):
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    transforms = np.asarray(transforms, dtype=np.float64).reshape(-1, 4, 4)
+    loopVertices = np.asarray(loopVertices, dtype=np.int64)
+    count = len(transforms)
+
+    mergedVertices = np.einsum('nij,vj->nvi', transforms[:, :3, :3], vertices) + transforms[:, None, :3, 3]
+    vertexOffsets = np.arange(count, dtype=np.int64) * len(vertices)
+    mergedLoopVertices = (loopVertices[None, :] + vertexOffsets[:, None]).ravel()
+    mergedLoopTotals = np.tile(np.asarray(loopTotals, dtype=np.int64), count)
+    mergedLoopArrays = [np.tile(np.asarray(values), (count,) + (1,) * (np.ndim(values) - 1)) for values in loopArrays]
+
+    return mergedVertices.reshape(-1, 3).astype(np.float32), mergedLoopTotals, mergedLoopVertices, mergedLoopArrays
+
+# largest X extent Pivot Painter 2 stores in 8 bits ("X Extent Divided by 2048 - 2048 Max")
+PIVOT_PAINTER_MAX_EXTENT = 2048.0
+
+# Pivot Painter 2 data of a merged clump, one element per foliage copy. copyTransforms is (N,4,4) and extents (N,) the
+# local X length of each copy's source mesh, since foliage meshes are modelled along X (see COPY_OFFSET_MATRIX).
+# returns the per-element pivot positions (N,3) and X vectors with X extents (N,4), in Unreal's space (Y flipped).
+def PivotPainterElements(copyTransforms, extents):
+    copyTransforms = np.asarray(copyTransforms, dtype=np.float64).reshape(-1, 4, 4)
+    axisX = copyTransforms[:, :3, 0]
+    scales = np.linalg.norm(axisX, axis=1)
+    safeScales = np.where(scales > 0, scales, 1.0)
+
+    pivots = copyTransforms[:, :3, 3].copy()
+    pivots[:, 1] *= -1.0
+    xVectors = np.empty((len(copyTransforms), 4))
+    xVectors[:, :3] = axisX / safeScales[:, None]
+    xVectors[:, 1] *= -1.0
+    xVectors[:, 3] = np.asarray(extents, dtype=np.float64) * scales
+
+    return pivots, xVectors
+
+# per-loop Pivot Painter 2 layers for a merged mesh, from the element data of PivotPainterElements and the number of
+# loops of each element. Returns the UV layers {"PivotPosition_XY", "PivotPosition_Z"} (L,2), the second one holding
+# the element index in V, and the "XVector" corner colors (L,4): the X vector remapped to 0-1 in RGB and the
+# X extent divided by 2048 in alpha.
+def PivotPainterLayers(pivots, xVectors, elementLoopCounts):
+    elementLoopCounts = np.asarray(elementLoopCounts, dtype=np.int64)
+    loopPivots = np.repeat(pivots, elementLoopCounts, axis=0)
+    loopElements = np.repeat(np.arange(len(pivots), dtype=np.float64), elementLoopCounts)
+
+    colors = np.empty((len(xVectors), 4))
+    colors[:, :3] = xVectors[:, :3] * 0.5 + 0.5
+    colors[:, 3] = np.clip(xVectors[:, 3] / PIVOT_PAINTER_MAX_EXTENT, 0.0, 1.0)
+
+    uvLayers = {"PivotPosition_XY" : loopPivots[:, :2],
+                "PivotPosition_Z" : np.stack((loopPivots[:, 2], loopElements), axis=1)}
+
+    return uvLayers, np.repeat(colors, elementLoopCounts, axis=0)
+
+# sRGB transfer functions for 0-1 color values: scene linear to sRGB encoded, and back
+def LinearToSrgb(values):
+    values = np.asarray(values, dtype=np.float64)
+
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * np.power(np.maximum(values, 0.0031308), 1.0 / 2.4) - 0.055)
+
+def SrgbToLinear(values):
+    values = np.asarray(values, dtype=np.float64)
+
+    return np.where(values <= 0.04045, values / 12.92, np.power((np.maximum(values, 0.04045) + 0.055) / 1.055, 2.4))
+
+# converts foliage copy transforms to Unreal's left-handed space by mirroring Y, like the FBX import of the meshes
+# (units stay centimeters with the Unreal Units scale). Returns the locations (N,3), the rotation quaternions in
+# FQuat order X, Y, Z, W (N,4), the rotations as FRotator pitch, yaw, roll in degrees (N,3) and the scales (N,3).
+def UnrealInstanceTransforms(copyTransforms):
+    copyTransforms = np.asarray(copyTransforms, dtype=np.float64).reshape(-1, 4, 4)
+    mirror = np.diag((1.0, -1.0, 1.0))
+    scales = np.linalg.norm(copyTransforms[:, :3, :3], axis=1)
+    rotations = mirror @ (copyTransforms[:, :3, :3] / np.where(scales > 0, scales, 1.0)[:, None, :]) @ mirror
+    locations = copyTransforms[:, :3, 3] @ mirror
+
+    quaternions = MatricesToQuaternions(rotations)[:, [1, 2, 3, 0]]
+    # FMatrix::Rotator(): pitch and yaw from the X axis, roll from the Z and Y axes against the unrolled Y axis
+    axisX, axisY, axisZ = rotations[:, :, 0], rotations[:, :, 1], rotations[:, :, 2]
+    pitch = np.arctan2(axisX[:, 2], np.sqrt(axisX[:, 0] ** 2 + axisX[:, 1] ** 2))
+    yaw = np.arctan2(axisX[:, 1], axisX[:, 0])
+    unrolledY = np.stack((-np.sin(yaw), np.cos(yaw), np.zeros(len(yaw))), axis=1)
+    roll = np.arctan2(np.einsum('ij,ij->i', axisZ, unrolledY), np.einsum('ij,ij->i', axisY, unrolledY))
+
+    return locations, quaternions, np.degrees(np.stack((pitch, yaw, roll), axis=1)), scales
+
+# streaming writer of placement exports for Unreal, fed one chunk of copy transforms at a time:
+#   'CSV'    DataTable CSV, one row per instance: ---, Clump (name), Location (FVector), Rotation (FRotator), Scale (FVector)
+#   'JSON'   DataTable JSON with the same fields
+#   'BINARY' little-endian: a 16 byte header ("FPIN", uint32 version, uint32 instance count, uint32 instance size),
+#            then per instance 10 float32: translation XYZ, rotation quaternion XYZW, scale XYZ (the FTransform parts)
+# rows are formatted and written per chunk, so an export never holds more than one chunk as Python objects
+class PlacementExportWriter:
+    BINARY_MAGIC = b"FPIN"
+    BINARY_VERSION = 1
+    BINARY_INSTANCE = np.dtype([("translation", "<f4", 3), ("rotation", "<f4", 4), ("scale", "<f4", 3)])
+
+    def __init__(self, path, fileFormat):
+        self.fileFormat = fileFormat
+        self.instanceCount = 0
+        self.rowCounts = {}
+        if fileFormat == 'BINARY' :
+            self.file = open(path, "wb")
+            self.file.write(self.BinaryHeader())
+        elif fileFormat in ('CSV', 'JSON') :
+            self.file = open(path, "w", newline="", encoding="utf-8")
+            if fileFormat == 'CSV' :
+                self.csvWriter = csv.writer(self.file)
+                self.csvWriter.writerow(("---", "Clump", "Location", "Rotation", "Scale"))
+            else :
+                self.file.write("[")
+        else :
+            raise ValueError("unknown placement export format '" + str(fileFormat) + "'")
+
+    def BinaryHeader(self):
+        return self.BINARY_MAGIC + struct.pack("<III", self.BINARY_VERSION, self.instanceCount, self.BINARY_INSTANCE.itemsize)
+
+    # writes the instances of one chunk of copy transforms (N,4,4) of a clump, rows are named <clump>_<index>
+    def Write(self, clumpName, copyTransforms):
+        locations, quaternions, rotators, scales = UnrealInstanceTransforms(copyTransforms)
+        if self.fileFormat == 'BINARY' :
+            instances = np.empty(len(locations), dtype=self.BINARY_INSTANCE)
+            instances["translation"] = locations
+            instances["rotation"] = quaternions
+            instances["scale"] = scales
+            self.file.write(instances.tobytes())
+        else :
+            firstRow = self.rowCounts.get(clumpName, 0)
+            rows = zip(range(firstRow, firstRow + len(locations)), locations.tolist(), rotators.tolist(), scales.tolist())
+            if self.fileFormat == 'CSV' :
+                self.csvWriter.writerows((clumpName + "_" + str(row), clumpName, "(X=%.4f,Y=%.4f,Z=%.4f)" % tuple(location),
+                                          "(Pitch=%.4f,Yaw=%.4f,Roll=%.4f)" % tuple(rotator), "(X=%.4f,Y=%.4f,Z=%.4f)" % tuple(scale))
+                                         for row, location, rotator, scale in rows)
+            else :
+                for row, location, rotator, scale in rows :
+                    self.file.write(("\n" if self.instanceCount == 0 and row == firstRow else ",\n") + json.dumps(
+                        {"Name" : clumpName + "_" + str(row), "Clump" : clumpName,
+                         "Location" : dict(zip("XYZ", location)),
+                         "Rotation" : dict(zip(("Pitch", "Yaw", "Roll"), rotator)),
+                         "Scale" : dict(zip("XYZ", scale))}))
+            self.rowCounts[clumpName] = firstRow + len(locations)
+        self.instanceCount += len(locations)
+
+    # finishes the file: closes the JSON list, or writes the instance count into the binary header
+    def Close(self):
+        if self.fileFormat == 'BINARY' :
+            self.file.seek(0)
+            self.file.write(self.BinaryHeader())
+        elif self.fileFormat == 'JSON' :
+            self.file.write("\n]\n")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.Close()
+
+# file extension of each placement export format
+PLACEMENT_EXPORT_EXTENSIONS = {'CSV' : ".csv", 'JSON' : ".json", 'BINARY' : ".bin"}
+
+# exports the placements of a sequence of (clump name, placeholder transforms (N,4,4)) clumps, converting and writing
+# chunkSize rows at a time. clumps can be a generator, so only one clump's arrays are loaded at once.
+# returns the number of instances written
+def ExportPlacements(path, fileFormat, clumps, chunkSize=65536):
+    with PlacementExportWriter(path, fileFormat) as writer :
+        for clumpName, placeholderTransforms in clumps :
+            for start in range(0, len(placeholderTransforms), chunkSize) :
+                writer.Write(clumpName, CopyTransforms(placeholderTransforms[start:start + chunkSize]))
+
+    return writer.instanceCount
+
+# hash of a mesh's geometry, from its vertex positions and face vertex indices.
+def GeometryHash(vertices, polygonVertices):
+    geometryHash = hashlib.sha1()
+    geometryHash.update(np.ascontiguousarray(vertices, dtype=np.float32).tobytes())
+    geometryHash.update(np.ascontiguousarray(polygonVertices, dtype=np.int32).tobytes())
+
+    return geometryHash.hexdigest()
+
+# on-disk cache of generated clumps. Entries are compressed .npz files of named arrays (the placeholder transforms
+# and spaced placement count), keyed by a hash of the clump parameters and source geometry hashes.
+# the total size is kept under maxBytes by evicting the least recently used entries (file modification time).
+class ClumpCache:
+    # temporary files of writes that were interrupted are removed by Evict once they are this old
+    ORPHAN_SECONDS = 3600
+
+    def __init__(self, cacheDirectory, maxBytes):
+        self.cacheDirectory = cacheDirectory
+        self.maxBytes = maxBytes
+
+    # cache key for a dict of JSON-serializable clump parameters and a list of geometry hashes
+    @staticmethod
+    def Key(params, geometryHashes=()):
+        keySource = json.dumps({"params" : params, "geometry" : list(geometryHashes)}, sort_keys=True)
+
+        return hashlib.sha1(keySource.encode("utf-8")).hexdigest()
+
+    def EntryPath(self, key):
+        return os.path.join(self.cacheDirectory, key + ".npz")
+
+    # returns the cached {name: array} dict for a key, or None on a miss. unreadable entries count as a miss and are removed
+    def Load(self, key):
+        entryPath = self.EntryPath(key)
+        try :
+            with np.load(entryPath) as entry :
+                arrays = {name : entry[name] for name in entry.files}
+        except FileNotFoundError :
+            return None
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile, KeyError) :
+            try :
+                os.remove(entryPath)
+            except OSError :
+                pass
+            return None
+
+        # mark the entry as recently used
+        try :
+            os.utime(entryPath, None)
+        except OSError :
+            pass
+
+        return arrays
+
+    # writes a {name: array} dict under a key, then evicts old entries over the size limit
+    def Store(self, key, arrays):
+        os.makedirs(self.cacheDirectory, exist_ok=True)
+        # write to a uniquely named temporary file first, so readers never see a partial entry
+        # and parallel writers of the same key don't share a file
+        temporaryHandle, temporaryPath = tempfile.mkstemp(suffix=".tmp", prefix=key + ".", dir=self.cacheDirectory)
+        try :
+            with os.fdopen(temporaryHandle, "wb") as entryFile :
+                np.savez_compressed(entryFile, **arrays)
+            os.replace(temporaryPath, self.EntryPath(key))
+        except BaseException :
+            try :
+                os.remove(temporaryPath)
+            except OSError :
+                pass
+            raise
+        self.Evict()
+
+    # deletes orphaned temporary files, then the least recently used entries until the cache fits its size limit
+    def Evict(self):
+        entries = []
+        orphanTime = time.time() - self.ORPHAN_SECONDS
+        for entryName in os.listdir(self.cacheDirectory) :
+            if entryName.endswith(".npz") or entryName.endswith(".tmp") :
+                entryPath = os.path.join(self.cacheDirectory, entryName)
+                try :
+                    entryStat = os.stat(entryPath)
+                    if entryName.endswith(".tmp") :
+                        if entryStat.st_mtime < orphanTime :
+                            os.remove(entryPath)
+                        continue
+                except OSError :
+                    continue
+                entries.append((entryStat.st_mtime, entryStat.st_size, entryPath))
+
+        totalBytes = sum(entry[1] for entry in entries)
+        for modifiedTime, entrySize, entryPath in sorted(entries) :
+            if totalBytes <= self.maxBytes :
+                break
+            try :
+                os.remove(entryPath)
+            except OSError :
+                continue
+            totalBytes -= entrySize
+
+# stage timings and object counters of one tool run. Stages nest, and are written as complete ("X") events of a
+# Chrome trace, which chrome://tracing and ui.perfetto.dev can open. Counters are written as counter ("C") events.
+class StageProfiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+
+    # times a block as a named stage: with profiler.Stage("spawn copies") : ...
+    def Stage(self, name):
+        return ProfilerStage(self, name)
+
+    def AddEvent(self, name, start, seconds):
+        self.events.append((name, start - self.origin, seconds))
+
+    def Count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # {stage name: (total seconds, calls)}, in order of the first call
+    def StageTotals(self):
+        totals = {}
+        for name, start, seconds in self.events :
+            total, calls = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, calls + 1)
+
+        return totals
+
+    # a multi-line table of the stage totals, slowest first, followed by the counters
+    def Summary(self):
+        lines = ["%-28s %10s %6s" % ("stage", "time (ms)", "calls")]
+        for name, (seconds, calls) in sorted(self.StageTotals().items(), key=lambda item : -item[1][0]) :
+            lines.append("%-28s %10.2f %6d" % (name, seconds * 1000, calls))
+        for name, value in self.counters.items() :
+            lines.append("%-28s %10d" % (name, value))
+
+        return "\n".join(lines)
+
+    # trace events in the Chrome trace event format, timestamps in microseconds
+    def TraceEvents(self, processName="Foliage Placement"):
+        traceEvents = [{"name" : "process_name", "ph" : "M", "pid" : 1, "tid" : 1, "args" : {"name" : processName}}]
+        for name, start, seconds in self.events :
+            traceEvents.append({"name" : name, "ph" : "X", "pid" : 1, "tid" : 1, "ts" : start * 1e6, "dur" : seconds * 1e6})
+        end = max((start + seconds for name, start, seconds in self.events), default=0.0)
+        for name, value in self.counters.items() :
+            traceEvents.append({"name" : name, "ph" : "C", "pid" : 1, "tid" : 1, "ts" : end * 1e6, "args" : {name : value}})
+
+        return traceEvents
+
+    def WriteTrace(self, tracePath, processName="Foliage Placement"):
+        with open(tracePath, "w") as traceFile :
+            json.dump({"traceEvents" : self.TraceEvents(processName), "displayTimeUnit" : "ms"}, traceFile)
+
+# context manager returned by StageProfiler.Stage
+class ProfilerStage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.profiler.AddEvent(self.name, self.start, time.perf_counter() - self.start)
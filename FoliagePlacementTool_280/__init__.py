@@ -0,0 +1,2356 @@
+bl_info = {
+    "name": "Foliage Placement",
+    "author": "Matt Wallace",
+    "version": (1, 0),
+    "blender": (2, 80, 0),
+    "location": "View3D > Tool Shelf > Foliage Placement Tool",
+    "description": "A tool to speed up foliage mesh clump creation suited for UE4-PivotPainter2 workflow.",
+    "warning": "",
+    "wiki_url": "",
+    "category": "Unreal Tools",
+    }
+
+import bpy
+import os
+import tempfile
+import contextlib
+import time
+import mathutils
+import numpy as np
+from bpy.types import Operator, Panel, PropertyGroup
+from bpy.app.handlers import persistent
+from bpy.props import IntProperty, FloatProperty, BoolProperty, EnumProperty, StringProperty, PointerProperty
+from mathutils import Matrix, Vector
+
+from . import FoliagePlacementCore as FPCore
+
+# create new base mesh object.
+def NewBaseMesh():
+    verts = [Vector((0,2,0)),
+             Vector((0,-2,0)),
+             Vector((25,-1,0)),
+             Vector((25,1,0)),
+             Vector((50,0,0))]
+    edges = []
+    faces = [[0,1,2,3],[4,3,2]]
+
+    newMesh = bpy.data.meshes.new("FoliageMesh")
+    newMesh.from_pydata(verts, edges, faces)
+    newMeshObj = bpy.data.objects.new("FoliageMesh", newMesh)
+
+    return newMeshObj
+
+# profiler of the running Spawn or Place operator, None unless the Profile option is on
+activeProfiler = None
+
+# times a block as a stage of the active profiler, does nothing when profiling is off
+def ProfileStage(name) :
+    return activeProfiler.Stage(name) if activeProfiler else contextlib.nullcontext()
+
+# adds to a counter of the active profiler, e.g. the number of objects created
+def ProfileCount(name, amount=1) :
+    if activeProfiler :
+        activeProfiler.Count(name, amount)
+
+# makes a profiler (or None) the active one for a block, e.g. one step of the modal Spawn
+@contextlib.contextmanager
+def UseProfiler(profiler) :
+    global activeProfiler
+    previousProfiler = activeProfiler
+    activeProfiler = profiler
+    try :
+        yield profiler
+    finally :
+        activeProfiler = previousProfiler
+
+# persistent {collection name: {slot: object}} lookup for placeholders and foliage copies.
+# placeholders and copies store their slot index in an "fp_slot" custom property, copies also store their
+# source object name in "fp_source". Tables are dropped by the depsgraph handler when their collection changes
+# and on file load, and rebuilt lazily when their size or a looked up entry no longer matches the collection.
+foliageIndex = {}
+
+def InvalidateFoliageIndex() :
+    foliageIndex.clear()
+
+# summary of the selected objects, split into the groups the operators work on. Blender calls the operators' poll
+# functions on every panel redraw, so the summary is cached and shared with main(), and only rebuilt after the
+# selection changed: the depsgraph handler invalidates it on scene updates (which include selection changes),
+# and it is keyed on the view layer and the number of objects in the file
+class SelectionSummary :
+    def __init__(self, key, selectedObjects, foliageNameSuffix="_FPTool") :
+        self.key = key
+        self.placeholders = []
+        self.copies = []
+        self.mergedObjects = []
+        self.meshObjects = []
+        self.linkedCopies = []
+        self.hasMesh = False
+        for o in selectedObjects :
+            if o.type == 'MESH' :
+                self.hasMesh = True
+            if o.get("fp_linked") :
+                self.linkedCopies.append(o)
+            if o.name.startswith("FoliageEmpty") :
+                self.placeholders.append(o)
+            elif o.get("fp_points") or o.get("fp_lod") is not None :
+                continue
+            elif o.get("fp_merged") :
+                self.mergedObjects.append(o)
+            elif foliageNameSuffix in o.name :
+                self.copies.append(o)
+            elif o.type == 'MESH' :
+                self.meshObjects.append(o)
+
+selectionSummary = None
+
+# returns the summary of the current selection, scanning the selected objects only when the cached one is stale
+def GetSelectionSummary(context) :
+    global selectionSummary
+    key = (context.scene.name, context.view_layer.name, len(bpy.data.objects))
+    if selectionSummary is None or selectionSummary.key != key :
+        selectionSummary = SelectionSummary(key, context.selected_objects)
+
+    return selectionSummary
+
+def InvalidateSelectionSummary() :
+    global selectionSummary
+    selectionSummary = None
+
+# checks whether a cached object reference still points to a live object
+def IsObjectValid(o) :
+    try :
+        o.name
+    except ReferenceError :
+        return False
+
+    return True
+
+# scans a placeholder or copy collection once, assigning free slots to objects without a (unique) slot
+def BuildSlotIndex(coll) :
+    slotIndex = {}
+    unassigned = []
+    for i, o in enumerate(coll.objects) :
+        if o.get("fp_points") :
+            continue
+        slot = o.get("fp_slot", i)
+        if slot in slotIndex :
+            unassigned.append(o)
+        else :
+            o["fp_slot"] = slot
+            slotIndex[slot] = o
+
+    nextSlot = max(slotIndex) + 1 if slotIndex else 0
+    for o in unassigned :
+        o["fp_slot"] = nextSlot
+        slotIndex[nextSlot] = o
+        nextSlot += 1
+
+    return slotIndex
+
+# returns the {slot: object} table for a placeholder or foliage copy collection
+def GetSlotIndex(coll) :
+    slotIndex = foliageIndex.get(coll.name)
+    if slotIndex is None or len(slotIndex) != len(coll.objects) :
+        slotIndex = BuildSlotIndex(coll)
+        foliageIndex[coll.name] = slotIndex
+
+    return slotIndex
+
+# checks whether an index entry still is a live object that carries its slot
+def IsSlotEntryValid(slot, o) :
+    return IsObjectValid(o) and o.get("fp_slot") == slot
+
+# returns the object stored in a slot of a placeholder or foliage copy collection
+def GetSlotObject(coll, slot) :
+    o = GetSlotIndex(coll).get(slot)
+    if o is not None and not IsSlotEntryValid(slot, o) :
+        foliageIndex.pop(coll.name, None)
+        o = GetSlotIndex(coll).get(slot)
+
+    return o
+
+# returns the objects stored in a list of slots, or None when one of the entries is stale, after dropping the
+# collection's index so the next lookup rebuilds it
+def GetSlotObjects(coll, slots) :
+    slotIndex = GetSlotIndex(coll)
+    slotObjects = [slotIndex.get(int(slot)) for slot in slots]
+    for slot, o in zip(slots, slotObjects) :
+        if o is None or not IsSlotEntryValid(int(slot), o) :
+            foliageIndex.pop(coll.name, None)
+
+            return None
+
+    return slotObjects
+
+# stores a freshly spawned set of slot objects as the index of their collection
+def RegisterSlotObjects(coll, slotObjects) :
+    if len(slotObjects) == len(coll.objects) :
+        foliageIndex[coll.name] = {o["fp_slot"] : o for o in slotObjects}
+    else :
+        foliageIndex.pop(coll.name, None)
+
+# copies a list of mesh objects and aligns them to the set of placeholder object
+# linked copies share the source mesh datablock instead of duplicating it (see RealizeFoliageCopies).
+# copies go to the collection named after their source object, or to the matching entry of foliageColls
+def SpawnFoliageCopies(foliageObjects, foliageEmpties, foliageNameSuffix, linkData=False, foliageColls=None):
+    slots, transforms, variants = ReadPlaceholderSlots(foliageEmpties)
+
+    return SpawnFoliageCopiesFromTransforms(foliageObjects, slots, transforms, variants, foliageNameSuffix, linkData, foliageColls)
+
+# copies a list of mesh objects and aligns them to an (N,4,4) array of placeholder transforms, giving the copies
+# the matching slots and variants. With sharedMeshes, the copies of each object are linked to the matching mesh
+# (e.g. a decimated LOD mesh) instead of the object's own
+def SpawnFoliageCopiesFromTransforms(foliageObjects, slots, transforms, variants, foliageNameSuffix, linkData=False, foliageColls=None, sharedMeshes=None):
+    foliageCopies = []
+    copyCount = len(transforms)
+
+    # the copy transforms of all placeholders are computed in one batch
+    with ProfileStage("copy transforms") :
+        objectTransforms = [Matrix(t) for t in FPCore.CopyTransforms(transforms).tolist()]
+        placeholderSlots = np.asarray(slots, dtype=np.int64).tolist()
+        placeholderVariants = [0] * copyCount if variants is None else np.asarray(variants, dtype=np.int64).tolist()
+
+    # mesh data, object creation and collection linking run as separate passes, so each can be timed on its own
+    for o, currentObj in enumerate(foliageObjects) :
+        sharedMesh = sharedMeshes[o] if sharedMeshes else (currentObj.data if linkData else None)
+        with ProfileStage("mesh data copy") :
+            objectDatas = [sharedMesh] * copyCount if sharedMesh else TagToolMeshes([currentObj.data.copy() for i in range(copyCount)])
+
+        with ProfileStage("object creation") :
+            objectName = currentObj.name + foliageNameSuffix
+            newObjects = []
+            for i in range(copyCount) :
+                newObject = bpy.data.objects.new(objectName, objectDatas[i])
+                newObject["fp_slot"] = placeholderSlots[i]
+                newObject["fp_variant"] = placeholderVariants[i]
+                newObject["fp_source"] = currentObj.name
+                if sharedMesh :
+                    newObject["fp_linked"] = True
+                newObject.matrix_world = objectTransforms[i]
+                newObjects.append(newObject)
+
+        with ProfileStage("collection linking") :
+            foliageColl = foliageColls[o] if foliageColls else bpy.data.collections.get(currentObj.name)
+            for newObject in newObjects :
+                foliageColl.objects.link(newObject)
+            RegisterSlotObjects(foliageColl, newObjects)
+
+        ProfileCount("objects created", copyCount)
+        if not sharedMesh :
+            ProfileCount("meshes created", copyCount)
+        foliageCopies.append(newObjects)
+
+    return foliageCopies
+
+# gives linked foliage copies their own mesh data, so they can be edited or exported (e.g. by Pivot Painter) on their own
+def RealizeFoliageCopies(foliageCopies):
+    realizedCount = 0
+    for o in foliageCopies :
+        if o.get("fp_linked") :
+            if o.data.users > 1 :
+                o.data = TagToolMeshes([o.data.copy()])[0]
+                realizedCount += 1
+            del o["fp_linked"]
+
+    return realizedCount
+
+# creates a set of empty placeholder objects from an (N,4,4) array of transforms
+def SpawnPlaceholdersFromTransforms(transforms, foliageEmptyColl, slots=None, variants=None) :
+    foliageEmpties = []
+    slots = range(len(transforms)) if slots is None else np.asarray(slots, dtype=np.int64).tolist()
+    variants = [0] * len(transforms) if variants is None else np.asarray(variants, dtype=np.int64).tolist()
+
+    with ProfileStage("placeholder creation") :
+        for slot, variant, transform in zip(slots, variants, transforms):
+            copy = bpy.data.objects.new("FoliageEmpty", None)
+            copy.empty_display_size = 20
+            copy.empty_display_type = 'SINGLE_ARROW'
+            copy.matrix_world = Matrix(transform.tolist())
+            copy["fp_slot"] = slot
+            if variant :
+                copy["fp_variant"] = variant
+            foliageEmptyColl.objects.link(copy)
+            foliageEmpties.append(copy)
+
+        RegisterSlotObjects(foliageEmptyColl, foliageEmpties)
+    ProfileCount("objects created", len(foliageEmpties))
+
+    return foliageEmpties
+
+# creates a set of empty placeholder objects with random location and rotation and values
+def SpawnFoliagePlaceholders(foliageCount, maxRot, maxDistance, maxScaleOffset, foliageEmptyColl, minSpacing=0, seed=None) :
+    transforms = GetPlacementTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, minSpacing, seed=seed)[0]
+
+    return SpawnPlaceholdersFromTransforms(transforms, foliageEmptyColl)
+
+# generates placeholder transforms with the quadrant layout, with Poisson-disk sampling when minSpacing is set, or
+# following a density map when one is passed (with mapScale, the map also drives the scales).
+# the same seed, slot indices and variants always give the same transforms.
+# returns the transforms and the number of placements that keep the minimum spacing
+def GetPlacementTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, minSpacing=0, indices=None, existingPositions=None, seed=None, variants=None, densityMap=None, mapScale=False) :
+    if seed is None :
+        seed = FPCore.NewSeed()
+    if densityMap is not None :
+        rng = FPCore.SeededGenerator(seed, 3, indices, variants) if indices is not None else FPCore.SeededGenerator(seed, 3)
+        return FPCore.DensityMapTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, densityMap, rng, mapScale), foliageCount
+    if minSpacing > 0 :
+        rng = FPCore.SeededGenerator(seed, 1, indices, variants) if existingPositions is not None else FPCore.SeededGenerator(seed, 1)
+        return FPCore.GetPoissonTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, minSpacing, rng, existingPositions)
+
+    return FPCore.GetRandomTransforms(foliageCount, maxRot, maxDistance, maxScaleOffset, indices=indices, seed=seed, variants=variants), foliageCount
+
+# {mesh name: geometry hash}, entries are dropped by the depsgraph handler when the mesh geometry changes
+meshGeometryHashes = {}
+
+# returns the geometry hash of a mesh, used in clump cache keys
+def GetMeshGeometryHash(mesh) :
+    geometryHash = meshGeometryHashes.get(mesh.name)
+    if geometryHash is None :
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", vertices)
+        loopVertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loopVertices)
+        loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loopTotals)
+        geometryHash = FPCore.GeometryHash(vertices, np.concatenate((loopTotals, loopVertices)))
+        meshGeometryHashes[mesh.name] = geometryHash
+
+    return geometryHash
+
+# returns the on-disk clump cache set up in the tool properties, or None when caching is off
+def GetClumpCache(props) :
+    if not props.use_cache :
+        return None
+    cacheDirectory = bpy.path.abspath(props.cache_directory) if props.cache_directory else os.path.join(tempfile.gettempdir(), "foliage_placement_cache")
+
+    return FPCore.ClumpCache(cacheDirectory, props.cache_size * 1024 * 1024)
+
+# clump cache key for the current tool properties and the foliage objects' geometry
+def GetClumpCacheKey(props, foliageObjects) :
+    params = {"version" : 2,
+              "foliage_count" : props.foliage_count,
+              "max_distance" : props.max_distance,
+              "max_rotation" : props.max_rotation,
+              "max_scale" : props.max_scale,
+              "seed" : props.seed,
+              "min_spacing" : round(GetMinSpacing(props), 6),
+              "relax_iterations" : props.relax_iterations if props.relax_collisions else 0}
+    densityMap = GetDensityMap(props)
+    if densityMap is not None :
+        params["density_map"] = densityMap.hash
+        params["map_scale"] = props.map_scale
+    geometryHashes = sorted(GetMeshGeometryHash(o.data) for o in foliageObjects)
+
+    return FPCore.ClumpCache.Key(params, geometryHashes)
+
+# placeholder transforms for a whole new clump, restored from the clump cache when it has them.
+# returns the transforms and the number of placements that keep the minimum spacing
+def GetClumpTransforms(props, foliageObjects, report=None) :
+    clumpCache = GetClumpCache(props)
+    if clumpCache :
+        cacheKey = GetClumpCacheKey(props, foliageObjects)
+        entry = clumpCache.Load(cacheKey)
+        if entry is not None and "transforms" in entry :
+            return entry["transforms"], int(entry["spaced_count"])
+
+    transforms, spacedCount = GetPlacementTransforms(props.foliage_count, props.max_rotation, props.max_distance, props.max_scale, GetMinSpacing(props), seed=props.seed, densityMap=GetDensityMap(props), mapScale=props.map_scale)
+    if props.relax_collisions :
+        bladeLength, bladeWidth = GetBladeSize(foliageObjects)
+        with ProfileStage("collision relaxation") :
+            transforms, collisionCount = FPCore.RelaxBladeCollisions(transforms, bladeLength, bladeWidth, props.relax_iterations)
+        ProfileCount("blade collisions left", collisionCount)
+    if clumpCache :
+        try :
+            clumpCache.Store(cacheKey, {"transforms" : transforms, "spaced_count" : np.array(spacedCount)})
+        except OSError as error :
+            if report :
+                report({'WARNING'}, "Could not write the clump cache entry: " + str(error))
+
+    return transforms, spacedCount
+
+# length (X extent) and width (Y extent) of the largest foliage mesh, the blade size used by the collision relaxation
+def GetBladeSize(foliageObjects) :
+    bladeLength = 0.0
+    bladeWidth = 0.0
+    for o in foliageObjects :
+        vertices = np.empty(len(o.data.vertices) * 3, dtype=np.float32)
+        o.data.vertices.foreach_get("co", vertices)
+        vertices = vertices.reshape(-1, 3)
+        if len(vertices) > 0 :
+            bladeLength = max(bladeLength, float(vertices[:, 0].max()))
+            bladeWidth = max(bladeWidth, float(vertices[:, 1].max() - vertices[:, 1].min()))
+
+    return bladeLength, bladeWidth
+
+# {image name: ((width, height), DensityMap)} used by the Density Map layout. Entries are dropped by the depsgraph
+# handler when the image changes, so painting the map only rebuilds its distribution once per change
+densityMaps = {}
+
+# returns the density map of the Density Map layout, or None in the other layouts or without a (loaded) image
+def GetDensityMap(props) :
+    image = props.density_image
+    if props.placement_mode != 'MAP' or image is None :
+        return None
+    width, height = image.size
+    if width == 0 or height == 0 :
+        return None
+
+    entry = densityMaps.get(image.name)
+    if entry is None or entry[0] != (width, height) :
+        pixels = np.empty(width * height * image.channels, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        entry = densityMaps[image.name] = ((width, height), FPCore.DensityMap.FromPixels(pixels, width, height, image.channels))
+
+    return entry[1]
+
+# returns the minimum blade spacing of the current placement mode, 0 for the quadrant layout
+def GetMinSpacing(props) :
+    return props.min_spacing if props.placement_mode == 'POISSON' else 0
+
+# warns when Poisson-disk sampling could not fit every placement at the minimum spacing
+def ReportSpacing(report, spacedCount, foliageCount) :
+    if report and spacedCount < foliageCount :
+        report({'WARNING'}, "Only " + str(spacedCount) + " of " + str(foliageCount) + " placements fit the minimum spacing, the rest were placed randomly.")
+
+# reads the world transforms of a set of placeholder objects into an (N,4,4) array
+def ReadPlaceholderTransforms(foliageEmpties) :
+    # bpy collections read all matrices in one call (stored column-major), plain lists fall back to a loop
+    if hasattr(foliageEmpties, "foreach_get") :
+        transforms = np.empty(len(foliageEmpties) * 16, dtype=np.float32)
+        foliageEmpties.foreach_get("matrix_world", transforms)
+
+        return transforms.reshape(-1, 4, 4).transpose(0, 2, 1).copy()
+
+    return np.array([o.matrix_world for o in foliageEmpties], dtype=np.float32).reshape(-1, 4, 4)
+
+# reads the slots (N,), world transforms (N,4,4) and variants (N,) of a set of placeholder objects.
+# the point mesh of the Points backend has no slot and is left out
+def ReadPlaceholderSlots(foliageEmpties) :
+    slotData = np.array([(p.get("fp_slot", i), p.get("fp_variant", 0), not p.get("fp_points")) for i, p in enumerate(foliageEmpties)], dtype=np.int64).reshape(-1, 3)
+    transforms = ReadPlaceholderTransforms(foliageEmpties)
+    if not np.all(slotData[:, 2]) :
+        transforms = transforms[slotData[:, 2] == 1]
+        slotData = slotData[slotData[:, 2] == 1]
+
+    return slotData[:, 0].copy(), transforms, slotData[:, 1].copy()
+
+# creates a set of empty placeholders aligned to a set of foliage copies
+def SpawnPlaceholdersToObjects(foliageObjects, foliageEmptyColl) :
+    foliageEmpties = []
+    foliageObjects = list(foliageObjects)
+    placeholderTransforms = FPCore.PlaceholderTransforms(ReadPlaceholderTransforms(foliageObjects)).tolist()
+
+    with ProfileStage("placeholder creation") :
+        for i, o in enumerate(foliageObjects) :
+            copy = bpy.data.objects.new("FoliageEmpty", None)
+            copy.empty_display_size = 20
+            copy.empty_display_type = 'SINGLE_ARROW'
+            copy.matrix_world = Matrix(placeholderTransforms[i])
+            copy["fp_slot"] = o.get("fp_slot", i)
+            copy["fp_variant"] = o.get("fp_variant", 0)
+            foliageEmptyColl.objects.link(copy)
+            foliageEmpties.append(copy)
+
+        RegisterSlotObjects(foliageEmptyColl, foliageEmpties)
+    ProfileCount("objects created", len(foliageEmpties))
+
+    return foliageEmpties
+
+# replaces the placeholders with ones aligned to a collection of foliage copies, which then belong to the copies' clump
+def RestorePlaceholdersFromCopies(placeholderColl, foliageColl) :
+    RemoveObjects(placeholderColl.objects)
+    ClearPlacementStore(placeholderColl)
+    placeholderObjects = SpawnPlaceholdersToObjects(GetSlotIndex(foliageColl).values(), placeholderColl)
+    AdoptClumpId(placeholderColl, foliageColl)
+
+    return placeholderObjects
+
+# returns the point mesh object that stores the placements of the Points backend, if there is one
+def GetPlacementPoints(foliageEmptyColl) :
+    if foliageEmptyColl :
+        for o in foliageEmptyColl.objects :
+            if o.get("fp_points") :
+                return o
+
+    return None
+
+# writes float point attribute values to a mesh, creating the attribute if needed
+def SetPointAttribute(mesh, attributeName, attributeType, values) :
+    attribute = mesh.attributes.get(attributeName)
+    if attribute is None :
+        attribute = mesh.attributes.new(attributeName, attributeType, 'POINT')
+    valueKey = "vector" if attributeType == 'FLOAT_VECTOR' else "value"
+    attribute.data.foreach_set(valueKey, np.ascontiguousarray(values, dtype=np.float32).ravel())
+
+# reads float point attribute values from a mesh, or returns the default value if the attribute is missing
+def GetPointAttribute(mesh, attributeName, attributeSize, defaultValue) :
+    count = len(mesh.vertices)
+    values = np.full(count * attributeSize, defaultValue, dtype=np.float32)
+    attribute = mesh.attributes.get(attributeName)
+    if attribute and attribute.domain == 'POINT' :
+        valueKey = "vector" if attributeSize == 3 else "value"
+        attribute.data.foreach_get(valueKey, values)
+
+    return values.reshape(count, attributeSize) if attributeSize > 1 else values
+
+# stores an (N,4,4) array of placeholder transforms as the vertices of a single point mesh.
+# placeholder rotation and scale go into float point attributes, plus the instance rotation used for the copies.
+def WritePlacementPoints(transforms, foliageEmptyColl, pointsObj=None) :
+    if pointsObj is None :
+        pointsMesh = TagToolMeshes([bpy.data.meshes.new("FoliagePoints")])[0]
+        pointsObj = bpy.data.objects.new("FoliagePoints", pointsMesh)
+        pointsObj["fp_points"] = True
+        foliageEmptyColl.objects.link(pointsObj)
+        ProfileCount("objects created")
+        ProfileCount("meshes created")
+
+    positions, eulers, scales = FPCore.DecomposeTransforms(transforms)
+    instanceEulers = FPCore.DecomposeTransforms(FPCore.CopyTransforms(transforms))[1]
+
+    pointsMesh = pointsObj.data
+    pointsMesh.clear_geometry()
+    pointsMesh.vertices.add(len(positions))
+    pointsMesh.vertices.foreach_set("co", positions.astype(np.float32).ravel())
+    SetPointAttribute(pointsMesh, "rotation", 'FLOAT_VECTOR', eulers)
+    SetPointAttribute(pointsMesh, "instance_rotation", 'FLOAT_VECTOR', instanceEulers)
+    SetPointAttribute(pointsMesh, "scale", 'FLOAT', scales)
+    pointsMesh.update()
+
+    return pointsObj
+
+# reads the placements of a point mesh object back into an (N,4,4) array of placeholder transforms
+def ReadPlacementPoints(pointsObj, useWorldSpace=True) :
+    pointsMesh = pointsObj.data
+    positions = np.empty(len(pointsMesh.vertices) * 3, dtype=np.float32)
+    pointsMesh.vertices.foreach_get("co", positions)
+    eulers = GetPointAttribute(pointsMesh, "rotation", 3, 0.0)
+    scales = GetPointAttribute(pointsMesh, "scale", 1, 1.0)
+    # points added in edit mode get zeroed attributes, keep them visible
+    scales = np.where(scales > 0, scales, 1.0)
+
+    transforms = FPCore.ComposeEulerTransforms(positions.reshape(-1, 3), eulers, scales)
+    if useWorldSpace :
+        transforms = np.matmul(np.array(pointsObj.matrix_world), transforms).astype(np.float32)
+
+    return transforms
+
+# returns the identifier of a node group input socket, used to set modifier input values
+def GetNodeGroupInputIdentifier(nodeGroup, socketName) :
+    if hasattr(nodeGroup, "interface") :
+        return nodeGroup.interface.items_tree[socketName].identifier
+
+    return nodeGroup.inputs[socketName].identifier
+
+# returns the named output socket of a node that is enabled for its current data type
+def GetEnabledOutput(node, socketName) :
+    for socket in node.outputs :
+        if socket.name == socketName and socket.enabled :
+            return socket
+
+    return node.outputs[socketName]
+
+# gets or creates the Geometry Nodes group that instances a foliage object on the vertices of a placement point mesh
+def GetFoliageInstancerNodeGroup() :
+    nodeGroup = bpy.data.node_groups.get("FoliageInstancer")
+    if nodeGroup :
+        return nodeGroup
+
+    nodeGroup = bpy.data.node_groups.new("FoliageInstancer", 'GeometryNodeTree')
+    if hasattr(nodeGroup, "interface") :
+        nodeGroup.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+        nodeGroup.interface.new_socket("Points", in_out='INPUT', socket_type='NodeSocketObject')
+        nodeGroup.interface.new_socket("Foliage", in_out='INPUT', socket_type='NodeSocketObject')
+        nodeGroup.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    else :
+        nodeGroup.inputs.new('NodeSocketGeometry', "Geometry")
+        nodeGroup.inputs.new('NodeSocketObject', "Points")
+        nodeGroup.inputs.new('NodeSocketObject', "Foliage")
+        nodeGroup.outputs.new('NodeSocketGeometry', "Geometry")
+    if hasattr(nodeGroup, "is_modifier") :
+        nodeGroup.is_modifier = True
+
+    nodes = nodeGroup.nodes
+    links = nodeGroup.links
+    groupInput = nodes.new('NodeGroupInput')
+    groupOutput = nodes.new('NodeGroupOutput')
+    pointsInfo = nodes.new('GeometryNodeObjectInfo')
+    pointsInfo.transform_space = 'RELATIVE'
+    foliageInfo = nodes.new('GeometryNodeObjectInfo')
+    foliageInfo.transform_space = 'ORIGINAL'
+    rotationAttribute = nodes.new('GeometryNodeInputNamedAttribute')
+    rotationAttribute.data_type = 'FLOAT_VECTOR'
+    rotationAttribute.inputs["Name"].default_value = "instance_rotation"
+    scaleAttribute = nodes.new('GeometryNodeInputNamedAttribute')
+    scaleAttribute.data_type = 'FLOAT'
+    scaleAttribute.inputs["Name"].default_value = "scale"
+    instanceOnPoints = nodes.new('GeometryNodeInstanceOnPoints')
+
+    links.new(groupInput.outputs["Points"], pointsInfo.inputs["Object"])
+    links.new(groupInput.outputs["Foliage"], foliageInfo.inputs["Object"])
+    links.new(pointsInfo.outputs["Geometry"], instanceOnPoints.inputs["Points"])
+    links.new(foliageInfo.outputs["Geometry"], instanceOnPoints.inputs["Instance"])
+    links.new(GetEnabledOutput(rotationAttribute, "Attribute"), instanceOnPoints.inputs["Rotation"])
+    links.new(GetEnabledOutput(scaleAttribute, "Attribute"), instanceOnPoints.inputs["Scale"])
+    links.new(instanceOnPoints.outputs["Instances"], groupOutput.inputs["Geometry"])
+
+    return nodeGroup
+
+# creates one instancer object per foliage mesh, which instances the mesh on every placement point
+def SpawnFoliageInstancers(foliageObjects, pointsObj, foliageNameSuffix) :
+    nodeGroup = GetFoliageInstancerNodeGroup()
+    pointsInput = GetNodeGroupInputIdentifier(nodeGroup, "Points")
+    foliageInput = GetNodeGroupInputIdentifier(nodeGroup, "Foliage")
+
+    foliageInstancers = []
+    for currentObj in foliageObjects :
+        objectName = currentObj.name + foliageNameSuffix
+        instancer = bpy.data.objects.new(objectName, TagToolMeshes([bpy.data.meshes.new(objectName)])[0])
+        instancer["fp_instancer"] = True
+        modifier = instancer.modifiers.new("FoliageInstances", 'NODES')
+        modifier.node_group = nodeGroup
+        modifier[pointsInput] = pointsObj
+        modifier[foliageInput] = currentObj
+        foliageColl = bpy.data.collections.get(currentObj.name)
+        foliageColl.objects.link(instancer)
+        foliageInstancers.append(instancer)
+    ProfileCount("objects created", len(foliageInstancers))
+    ProfileCount("meshes created", len(foliageInstancers))
+
+    return foliageInstancers
+
+# Points backend for the Spawn and Place operators. Placements live on a single point mesh in the placeholder
+# collection, and each foliage collection holds one instancer object instead of one copy per placement.
+def SpawnFoliagePoints(scene, toolFunction, foliageObjects, placeholderColl, foliageNameSuffix, report=None) :
+    props = scene.foliage_placement_properties
+
+    if not placeholderColl :
+        placeholderColl = bpy.data.collections.new("FoliagePlaceholders")
+        scene.collection.children.link(placeholderColl)
+
+    pointsObj = GetPlacementPoints(placeholderColl)
+    if toolFunction == 1 or pointsObj is None :
+        if toolFunction == 1 :
+            with ProfileStage("placement transforms") :
+                transforms, spacedCount = GetClumpTransforms(props, foliageObjects, report)
+            ReportSpacing(report, spacedCount, props.foliage_count)
+            NewClumpId(placeholderColl)
+        else :
+            # convert the current Empty placeholders
+            transforms = ReadPlaceholderTransforms([o for o in placeholderColl.objects if not o.get("fp_points")])
+        RemoveObjects(placeholderColl.objects)
+        with ProfileStage("write points") :
+            pointsObj = WritePlacementPoints(transforms, placeholderColl)
+    else :
+        # refresh the instance rotations of points that were edited since the last update
+        with ProfileStage("write points") :
+            WritePlacementPoints(ReadPlacementPoints(pointsObj, useWorldSpace=False), placeholderColl, pointsObj)
+
+    # clear current foliage copy collections or create new ones
+    for foliageRef in foliageObjects :
+        ClearFoliageCopies(scene, foliageRef)
+
+    return SpawnFoliageInstancers(foliageObjects, pointsObj, foliageNameSuffix)
+
+# Compact backend for the Spawn and Place operators. Placements only live in the placement store of the placeholder
+# collection, without placeholder objects; switching to the Empties backend turns them into Empties for editing.
+# Spawn respawns the placements of the selected copies, or a new clump when no copies are selected.
+def SpawnFoliageCompact(scene, toolFunction, foliageObjects, selectedCopies, placeholderColl, foliageNameSuffix, report=None) :
+    props = scene.foliage_placement_properties
+
+    if not placeholderColl :
+        placeholderColl = bpy.data.collections.new("FoliagePlaceholders")
+        scene.collection.children.link(placeholderColl)
+
+    # fold placeholder objects of the other backends into the store
+    pointsObj = GetPlacementPoints(placeholderColl)
+    if pointsObj :
+        transforms = ReadPlacementPoints(pointsObj)
+        WritePlacementStore(placeholderColl, np.arange(len(transforms)), transforms)
+        RemoveObjects(placeholderColl.objects)
+    elif len(placeholderColl.objects) > 0 :
+        GetSlotIndex(placeholderColl)
+        WritePlacementStore(placeholderColl, *ReadPlaceholderSlots(placeholderColl.objects))
+        RemoveObjects(placeholderColl.objects)
+
+    if toolFunction == 1 :
+        selectedSlots = [c["fp_slot"] for c in selectedCopies if c.get("fp_slot") is not None]
+        # copies of another clump replace the store with their own placements
+        for foliageRef in foliageObjects :
+            foliageColl = bpy.data.collections.get(foliageRef.name)
+            if len(selectedSlots) > 0 and foliageColl and len(foliageColl.objects) > 0 and not CopiesMatchPlaceholders(placeholderColl, foliageColl) :
+                slots, copyTransforms, variants = ReadPlaceholderSlots(list(GetSlotIndex(foliageColl).values()))
+                WritePlacementStore(placeholderColl, slots, FPCore.PlaceholderTransforms(copyTransforms), variants)
+                AdoptClumpId(placeholderColl, foliageColl)
+                break
+        if len(selectedSlots) > 0 and HasPlacementStore(placeholderColl) :
+            # respawn the placements of the selected copies, each one draws the next variant of its slot
+            slots, transforms, variants = ReadPlacementStore(placeholderColl)
+            rows = np.unique(FPCore.MatchSlots(selectedSlots, slots))
+            rows = rows[rows >= 0]
+            variants[rows] += 1
+            minSpacing = GetMinSpacing(props)
+            existingPositions = np.delete(transforms[:, :3, 3], rows, axis=0) if minSpacing > 0 else None
+            with ProfileStage("placement transforms") :
+                transforms[rows] = GetPlacementTransforms(len(rows), props.max_rotation, props.max_distance, props.max_scale, minSpacing, slots[rows], existingPositions, props.seed, variants[rows], GetDensityMap(props), props.map_scale)[0]
+            WritePlacementStore(placeholderColl, slots, transforms, variants)
+        else :
+            with ProfileStage("placement transforms") :
+                transforms, spacedCount = GetClumpTransforms(props, foliageObjects, report)
+            ReportSpacing(report, spacedCount, props.foliage_count)
+            WritePlacementStore(placeholderColl, np.arange(len(transforms)), transforms)
+            NewClumpId(placeholderColl)
+
+    # align the copies to the store, updating them in place when they belong to the same clump
+    placements = ReadPlacementStore(placeholderColl)
+    for foliageRef in foliageObjects :
+        foliageColl = bpy.data.collections.get(foliageRef.name)
+        if foliageColl and len(foliageColl.objects) > 0 and (toolFunction == 1 or props.incremental_place) and CopiesMatchPlaceholders(placeholderColl, foliageColl) and not foliageColl.objects[0].get("fp_instancer") :
+            with ProfileStage("incremental update") :
+                UpdateFoliageCopies(foliageRef, foliageColl, placeholderColl, foliageNameSuffix, props.link_mesh_data, placements)
+        else :
+            foliageColl = ClearFoliageCopies(scene, foliageRef)
+            SpawnFoliageCopiesFromTransforms([foliageRef], *placements, foliageNameSuffix, props.link_mesh_data)
+            StorePlacementSnapshot(foliageColl, placeholderColl, placements)
+
+    return placeholderColl
+
+# returns the collections, including the scenes' master collections, that hold a collection as a child
+def GetParentCollections(coll) :
+    parentColls = [c for c in bpy.data.collections if c.children.get(coll.name) is not None]
+    parentColls += [scene.collection for scene in bpy.data.scenes if scene.collection.children.get(coll.name) is not None]
+
+    return parentColls
+
+# removes all copies from the collection of a foliage object, or creates the collection
+def ClearFoliageCopies(scene, foliageRef) :
+    foliageColl = bpy.data.collections.get(foliageRef.name)
+    if foliageColl :
+        RemoveObjects(foliageColl.objects)
+    else :
+        foliageColl = bpy.data.collections.new(foliageRef.name)
+        scene.collection.children.link(foliageColl)
+
+    return foliageColl
+
+# marks mesh datablocks created by the tool (copy, point and instancer meshes) with an "fp_mesh" custom property.
+# only marked meshes are ever removed by the tool, orphan meshes of other tools are left alone
+def TagToolMeshes(meshes) :
+    for mesh in meshes :
+        mesh["fp_mesh"] = True
+
+    return meshes
+
+# removes a list of ID datablocks in one call, one by one on Blender versions without BlendData.batch_remove
+def BatchRemove(ids) :
+    if len(ids) == 0 :
+        return
+    if hasattr(bpy.data, "batch_remove") :
+        bpy.data.batch_remove(ids)
+        return
+
+    for block in ids :
+        if isinstance(block, bpy.types.Object) :
+            bpy.data.objects.remove(block, do_unlink=True)
+        else :
+            bpy.data.meshes.remove(block)
+
+# removes a set of objects in one batch, along with the tool meshes they leave without users.
+# linked copies share their source mesh, which keeps its users and is never removed
+def RemoveObjects(objects) :
+    objects = list(objects)
+    toolMeshes = {}
+    for o in objects :
+        if o.type == 'MESH' and o.data.get("fp_mesh") :
+            toolMeshes[o.data.name] = o.data
+
+    with ProfileStage("object removal") :
+        BatchRemove(objects)
+    with ProfileStage("mesh removal") :
+        orphanMeshes = [mesh for mesh in toolMeshes.values() if mesh.users == 0]
+        BatchRemove(orphanMeshes)
+
+    ProfileCount("objects removed", len(objects))
+    ProfileCount("meshes removed", len(orphanMeshes))
+
+# reads the buffers of a mesh used to merge its copies: vertex positions (V,3), polygon loop totals (P,),
+# loop vertex indices (L,) and active UVs (L,2) in polygon order, and polygon material indices (P,)
+def ReadMeshBuffers(mesh) :
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    materialIndices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", materialIndices)
+    loopVertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVertices)
+    uvs = np.zeros(len(mesh.loops) * 2, dtype=np.float32)
+    if mesh.uv_layers.active :
+        mesh.uv_layers.active.data.foreach_get("uv", uvs)
+
+    loopOrder = FPCore.PolygonLoopOrder(loopStarts, loopTotals)
+
+    return vertices.reshape(-1, 3), loopTotals, loopVertices[loopOrder], uvs.reshape(-1, 2)[loopOrder], materialIndices
+
+# writes per-corner colors to a new byte color layer, as a color attribute on Blender 3.2+. The colors are data
+# (Unreal reads the bytes as they are), so they are written to the stored sRGB values: through "color_srgb" where
+# Blender has it, otherwise through the scene linear "color" of color attributes, converted back to linear first
+def AddCornerColors(mesh, layerName, colors) :
+    colors = np.array(colors, dtype=np.float64).reshape(-1, 4)
+    if hasattr(mesh, "color_attributes") :
+        colorLayer = mesh.color_attributes.new(layerName, 'BYTE_COLOR', 'CORNER')
+        colorValueType = getattr(bpy.types, "ByteColorAttributeValue", None)
+        if colorValueType is not None and "color_srgb" in colorValueType.bl_rna.properties :
+            colorLayer.data.foreach_set("color_srgb", colors.astype(np.float32).ravel())
+
+            return
+        colors[:, :3] = FPCore.SrgbToLinear(colors[:, :3])
+    else :
+        # vertex colors before Blender 3.2 are read and written as stored
+        colorLayer = mesh.vertex_colors.new(name=layerName)
+    colorLayer.data.foreach_set("color", colors.astype(np.float32).ravel())
+
+# builds one mesh holding a copy of every foliage mesh on every placement, with the Pivot Painter 2 pivot position
+# and X vector of each copy baked into UV and color layers (see FPCore.PivotPainterLayers).
+# the source buffers are read once and all copies are transformed in one batch
+def BuildMergedFoliageMesh(meshName, foliageMeshes, placeholderTransforms) :
+    copyTransforms = FPCore.CopyTransforms(placeholderTransforms)
+    mergedMesh = TagToolMeshes([bpy.data.meshes.new(meshName)])[0]
+
+    vertexBuffers = []
+    loopTotalBuffers = []
+    loopVertexBuffers = []
+    uvBuffers = []
+    materialBuffers = []
+    elementLoopCounts = []
+    elementExtents = []
+    vertexCount = 0
+    with ProfileStage("merge mesh buffers") :
+        for foliageMesh in foliageMeshes :
+            vertices, loopTotals, loopVertices, uvs, materialIndices = ReadMeshBuffers(foliageMesh)
+            mergedVertices, mergedLoopTotals, mergedLoopVertices, mergedLoopArrays = FPCore.MergeMeshCopies(vertices, loopTotals, loopVertices, copyTransforms, (uvs, materialIndices))
+            vertexBuffers.append(mergedVertices)
+            loopTotalBuffers.append(mergedLoopTotals)
+            loopVertexBuffers.append(mergedLoopVertices + vertexCount)
+            uvBuffers.append(mergedLoopArrays[0])
+            vertexCount += len(mergedVertices)
+
+            # material slots of every source are appended, an empty slot keeps the indices of sources without materials
+            materialBuffers.append(mergedLoopArrays[1] + len(mergedMesh.materials))
+            for material in (foliageMesh.materials if len(foliageMesh.materials) > 0 else [None]) :
+                mergedMesh.materials.append(material)
+
+            elementLoopCounts.append(np.full(len(copyTransforms), len(loopVertices)))
+            elementExtents.append(np.full(len(copyTransforms), max(float(vertices[:, 0].max()), 0.0) if len(vertices) > 0 else 0.0))
+
+        vertices = np.concatenate(vertexBuffers)
+        loopTotals = np.concatenate(loopTotalBuffers)
+        loopVertices = np.concatenate(loopVertexBuffers)
+
+    with ProfileStage("write merged mesh") :
+        mergedMesh.vertices.add(len(vertices))
+        mergedMesh.vertices.foreach_set("co", vertices.ravel())
+        mergedMesh.loops.add(len(loopVertices))
+        mergedMesh.loops.foreach_set("vertex_index", loopVertices.astype(np.int32))
+        mergedMesh.polygons.add(len(loopTotals))
+        mergedMesh.polygons.foreach_set("loop_start", (np.cumsum(loopTotals) - loopTotals).astype(np.int32))
+        mergedMesh.polygons.foreach_set("loop_total", loopTotals.astype(np.int32))
+        mergedMesh.polygons.foreach_set("material_index", np.concatenate(materialBuffers).astype(np.int32))
+        mergedMesh.update(calc_edges=True)
+
+        uvLayer = mergedMesh.uv_layers.new(name="UVMap")
+        uvLayer.data.foreach_set("uv", np.concatenate(uvBuffers).astype(np.float32).ravel())
+
+        # copies are merged source by source, so the elements follow the same order
+        pivots, xVectors = FPCore.PivotPainterElements(np.tile(copyTransforms, (len(foliageMeshes), 1, 1)), np.concatenate(elementExtents))
+        pivotLayers, xVectorColors = FPCore.PivotPainterLayers(pivots, xVectors, np.concatenate(elementLoopCounts))
+        for layerName, layerUVs in pivotLayers.items() :
+            mergedMesh.uv_layers.new(name=layerName).data.foreach_set("uv", layerUVs.astype(np.float32).ravel())
+        AddCornerColors(mergedMesh, "XVector", xVectorColors)
+        mergedMesh.update()
+
+    ProfileCount("meshes created")
+
+    return mergedMesh
+
+# Merged output mode: replaces the foliage copies with a single "FoliageClump" object in the "FoliageMerged" collection,
+# built by BuildMergedFoliageMesh. Existing copies of the foliage objects are removed.
+def SpawnMergedFoliage(scene, foliageObjects, placeholderTransforms) :
+    for foliageObj in foliageObjects :
+        foliageColl = bpy.data.collections.get(foliageObj.name)
+        if foliageColl :
+            RemoveObjects(foliageColl.objects)
+
+    mergedColl = bpy.data.collections.get("FoliageMerged")
+    if not mergedColl :
+        mergedColl = bpy.data.collections.new("FoliageMerged")
+        scene.collection.children.link(mergedColl)
+    mergedObj = next((o for o in mergedColl.objects if o.get("fp_merged")), None)
+
+    mergedMesh = BuildMergedFoliageMesh("FoliageClump", [o.data for o in foliageObjects], placeholderTransforms)
+    if mergedObj :
+        oldMesh = mergedObj.data
+        mergedObj.data = mergedMesh
+        if oldMesh.users == 0 and oldMesh.get("fp_mesh") :
+            BatchRemove([oldMesh])
+    else :
+        mergedObj = bpy.data.objects.new("FoliageClump", mergedMesh)
+        mergedObj["fp_merged"] = True
+        mergedColl.objects.link(mergedObj)
+        ProfileCount("objects created")
+    # the foliage objects are looked up by name when the merged object is selected for Spawn or Place
+    mergedObj["fp_sources"] = ";".join(o.name for o in foliageObjects)
+
+    return mergedObj
+
+# the Merged output mode applies to Empty placeholders, the Points backend always instances the foliage objects
+def IsMergedOutput(props) :
+    return props.output_mode == 'MERGED' and props.placeholder_backend == 'EMPTIES'
+
+# returns the foliage objects a merged clump object was built from, and whether any of them is missing
+def GetMergedSources(mergedObj) :
+    sourceNames = [name for name in mergedObj.get("fp_sources", "").split(";") if name]
+    sources = [bpy.context.scene.objects.get(name) for name in sourceNames]
+
+    return [o for o in sources if o], None in sources
+
+# replaces the current placeholders with an (N,4,4) array of transforms, and spawns copies of the foliage objects on them
+# with the placeholder backend and copy options of the tool properties
+def SpawnClumpFromTransforms(scene, transforms, foliageObjects, foliageNameSuffix) :
+    props = scene.foliage_placement_properties
+
+    # clear current foliage placeholder collection, or create a new one
+    placeholderColl = bpy.data.collections.get("FoliagePlaceholders")
+    if placeholderColl :
+        RemoveObjects(placeholderColl.objects)
+        ClearPlacementStore(placeholderColl)
+    else :
+        placeholderColl = bpy.data.collections.new("FoliagePlaceholders")
+        scene.collection.children.link(placeholderColl)
+    NewClumpId(placeholderColl)
+
+    if IsMergedOutput(props) :
+        SpawnPlaceholdersFromTransforms(transforms, placeholderColl)
+        SpawnMergedFoliage(scene, foliageObjects, transforms)
+
+        return placeholderColl
+
+    for foliageRef in foliageObjects :
+        ClearFoliageCopies(scene, foliageRef)
+
+    if props.placeholder_backend == 'POINTS' :
+        pointsObj = WritePlacementPoints(transforms, placeholderColl)
+        SpawnFoliageInstancers(foliageObjects, pointsObj, foliageNameSuffix)
+    elif props.placeholder_backend == 'COMPACT' :
+        placements = (np.arange(len(transforms)), np.asarray(transforms, dtype=np.float32), np.zeros(len(transforms), dtype=np.int64))
+        WritePlacementStore(placeholderColl, *placements)
+        SpawnFoliageCopiesFromTransforms(foliageObjects, *placements, foliageNameSuffix, props.link_mesh_data)
+        for foliageRef in foliageObjects :
+            StorePlacementSnapshot(bpy.data.collections.get(foliageRef.name), placeholderColl, placements)
+    else :
+        placeholderObjects = SpawnPlaceholdersFromTransforms(transforms, placeholderColl)
+        SpawnFoliageCopies(foliageObjects, placeholderObjects, foliageNameSuffix, props.link_mesh_data)
+        for foliageRef in foliageObjects :
+            StorePlacementSnapshot(bpy.data.collections.get(foliageRef.name), placeholderColl)
+
+    return placeholderColl
+
+# spawns a new clump of the foliage objects from the scene's tool properties, without depending on the
+# selection or a UI context (used by the batch command line). Returns the number of placements.
+def SpawnClump(scene, foliageObjects, foliageNameSuffix="_FPTool", report=None) :
+    props = scene.foliage_placement_properties
+    transforms, spacedCount = GetClumpTransforms(props, foliageObjects, report)
+    ReportSpacing(report, spacedCount, props.foliage_count)
+    SpawnClumpFromTransforms(scene, transforms, foliageObjects, foliageNameSuffix)
+
+    return len(transforms)
+
+# returns one mesh per foliage object for a LOD: the objects' own meshes for LOD0, and for LOD k a mesh decimated
+# to decimateRatio^k of the faces, evaluated from a temporary Decimate modifier on the foliage object
+def GetLodMeshes(context, foliageObjects, lod, decimateRatio) :
+    ratio = decimateRatio ** lod if lod > 0 else 1.0
+    if ratio >= 1 and all(len(o.modifiers) == 0 for o in foliageObjects) :
+        return [o.data for o in foliageObjects]
+
+    # every LOD, LOD0 included, is baked from the evaluated objects, so their own modifiers apply to all LODs alike.
+    # the Decimate modifiers of all objects are added first, and the depsgraph is updated once per LOD
+    decimateModifiers = []
+    try :
+        if ratio < 1 :
+            for o in foliageObjects :
+                modifier = o.modifiers.new("FoliageLOD", 'DECIMATE')
+                modifier.ratio = ratio
+                decimateModifiers.append((o, modifier))
+        depsgraph = context.evaluated_depsgraph_get()
+        depsgraph.update()
+        lodMeshes = [bpy.data.meshes.new_from_object(o.evaluated_get(depsgraph)) for o in foliageObjects]
+    finally :
+        for o, modifier in decimateModifiers :
+            o.modifiers.remove(modifier)
+    for o, lodMesh in zip(foliageObjects, lodMeshes) :
+        lodMesh.name = o.name + "_LOD" + str(lod)
+    ProfileCount("meshes created", len(lodMeshes))
+
+    return TagToolMeshes(lodMeshes)
+
+# removes the LODs built before, or creates the "FoliageLODs" collection
+def ClearFoliageLods(scene) :
+    lodColl = bpy.data.collections.get("FoliageLODs")
+    if not lodColl :
+        lodColl = bpy.data.collections.new("FoliageLODs")
+        scene.collection.children.link(lodColl)
+
+        return lodColl
+
+    for childColl in list(lodColl.children) :
+        RemoveObjects(childColl.objects)
+        bpy.data.collections.remove(childColl)
+    RemoveObjects(lodColl.objects)
+
+    return lodColl
+
+# builds LOD0 to LOD(lod_count - 1) of the current clump in the "FoliageLODs" collection, with the Unreal LOD suffixes.
+# every LOD keeps a nested subset of the placements (see FPCore.LodRows) and links its copies to one decimated mesh
+# per foliage object, so all LODs together cost little more than LOD0. With the Merged output each LOD is one
+# merged "FoliageClump_LOD<k>" object, otherwise its copies go to a "FoliageClump_LOD<k>" collection.
+# returns the number of placements of every LOD
+def SpawnFoliageLods(context, foliageObjects, placeholderColl) :
+    scene = context.scene
+    props = scene.foliage_placement_properties
+    slots, transforms, variants = ReadPlacements(placeholderColl)
+    lodColl = ClearFoliageLods(scene)
+
+    lodCounts = []
+    for lod, rows in enumerate(FPCore.LodRows(props.seed, slots, props.lod_count, props.lod_keep_ratio)) :
+        lodName = "FoliageClump_LOD" + str(lod)
+        with ProfileStage("LOD meshes") :
+            lodMeshes = GetLodMeshes(context, foliageObjects, lod, props.lod_decimate_ratio)
+
+        if props.output_mode == 'MERGED' :
+            lodObj = bpy.data.objects.new(lodName, BuildMergedFoliageMesh(lodName, lodMeshes, transforms[rows]))
+            lodObj["fp_lod"] = lod
+            lodColl.objects.link(lodObj)
+            # the decimated meshes were only read into the merged mesh
+            BatchRemove([m for m in lodMeshes if m.get("fp_mesh") and m.users == 0])
+        else :
+            lodCopyColl = bpy.data.collections.new(lodName)
+            lodColl.children.link(lodCopyColl)
+            lodCopies = SpawnFoliageCopiesFromTransforms(foliageObjects, slots[rows], transforms[rows], variants[rows], "_LOD" + str(lod), foliageColls=[lodCopyColl] * len(foliageObjects), sharedMeshes=lodMeshes)
+            for copies in lodCopies :
+                for o in copies :
+                    o["fp_lod"] = lod
+        lodCounts.append(len(rows))
+
+    return lodCounts
+
+# spawns a new clump step by step, for the modal Spawn operator. Placeholders and copies are created in chunks of
+# placements inside staging collections, so the current clump stays untouched until Finish swaps the staged clump in,
+# and Cancel removes everything created so far.
+class ChunkedClumpSpawn :
+    def __init__(self, scene, transforms, foliageObjects, foliageNameSuffix, linkData=False) :
+        self.scene = scene
+        self.transforms = transforms
+        self.foliageObjects = list(foliageObjects)
+        self.foliageNameSuffix = foliageNameSuffix
+        self.linkData = linkData
+        self.nextRow = 0
+
+        self.placeholderColl = bpy.data.collections.new("FoliagePlaceholders_Spawning")
+        scene.collection.children.link(self.placeholderColl)
+        NewClumpId(self.placeholderColl)
+        self.foliageColls = []
+        for foliageRef in self.foliageObjects :
+            foliageColl = bpy.data.collections.new(foliageRef.name + "_Spawning")
+            scene.collection.children.link(foliageColl)
+            self.foliageColls.append(foliageColl)
+
+    # number of placements spawned so far, and in total
+    def Progress(self) :
+        return self.nextRow, len(self.transforms)
+
+    def IsDone(self) :
+        return self.nextRow >= len(self.transforms)
+
+    # spawns the placeholders and copies of the next chunkSize placements
+    def Step(self, chunkSize) :
+        rows = range(self.nextRow, min(self.nextRow + chunkSize, len(self.transforms)))
+        placeholders = SpawnPlaceholdersFromTransforms(self.transforms[rows.start:rows.stop], self.placeholderColl, rows)
+        SpawnFoliageCopies(self.foliageObjects, placeholders, self.foliageNameSuffix, self.linkData, self.foliageColls)
+        self.nextRow = rows.stop
+
+    # replaces the current clump with the staged one: the old placeholder and copy collections are removed,
+    # and the staging collections take their names and their place in the collection hierarchy
+    def Finish(self) :
+        for stagedColl, finalName in zip([self.placeholderColl] + self.foliageColls, ["FoliagePlaceholders"] + [o.name for o in self.foliageObjects]) :
+            oldColl = bpy.data.collections.get(finalName)
+            if oldColl :
+                # the staged collection is already linked to the scene root
+                parentColls = GetParentCollections(oldColl)
+                for parentColl in parentColls :
+                    if parentColl.children.get(stagedColl.name) is None :
+                        parentColl.children.link(stagedColl)
+                if len(parentColls) > 0 and self.scene.collection not in parentColls :
+                    self.scene.collection.children.unlink(stagedColl)
+                for childColl in list(oldColl.children) :
+                    stagedColl.children.link(childColl)
+                RemoveObjects(oldColl.objects)
+                bpy.data.collections.remove(oldColl)
+            foliageIndex.pop(finalName, None)
+            placementSnapshots.pop(finalName, None)
+            stagedColl.name = finalName
+            RegisterSlotObjects(stagedColl, list(stagedColl.objects))
+
+        for foliageColl in self.foliageColls :
+            StorePlacementSnapshot(foliageColl, self.placeholderColl)
+
+        return self.placeholderColl
+
+    # removes the staged objects, their mesh data and the staging collections
+    def Cancel(self) :
+        for stagedColl in [self.placeholderColl] + self.foliageColls :
+            RemoveObjects(stagedColl.objects)
+            foliageIndex.pop(stagedColl.name, None)
+            bpy.data.collections.remove(stagedColl)
+
+# {mesh name: ((vertex count, polygon count), vertices, triangles, cumulative areas)} used by Scatter.
+# entries are dropped by the depsgraph handler when the mesh geometry changes
+surfaceAreaTables = {}
+
+# returns the vertices, triangles and cumulative area table of a mesh, rebuilding them only when the mesh changed
+def GetSurfaceAreaTable(mesh) :
+    tableKey = (len(mesh.vertices), len(mesh.polygons))
+    entry = surfaceAreaTables.get(mesh.name)
+    if entry is not None and entry[0] == tableKey :
+        return entry[1:]
+
+    mesh.calc_loop_triangles()
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", triangles)
+    vertices = vertices.reshape(-1, 3)
+    triangles = triangles.reshape(-1, 3)
+    cumulativeAreas = FPCore.BuildAreaTable(vertices, triangles)[0]
+    surfaceAreaTables[mesh.name] = (tableKey, vertices, triangles, cumulativeAreas)
+
+    return vertices, triangles, cumulativeAreas
+
+# {(mesh name, weight layer name): weights} read by Scatter, dropped with the area table of the mesh
+vertexGroupWeights = {}
+
+# returns the float point attribute of a mesh with the given name, if it has one
+def GetWeightAttribute(mesh, attributeName) :
+    weightAttribute = mesh.attributes.get(attributeName) if hasattr(mesh, "attributes") else None
+    if weightAttribute is not None and weightAttribute.domain == 'POINT' and weightAttribute.data_type == 'FLOAT' :
+        return weightAttribute
+
+    return None
+
+# returns the (N,) vertex weights of a weight layer of a mesh object, 0 for vertices outside the group.
+# a float point attribute is read in one foreach_get. Vertex groups have no bulk accessor (their weights are not
+# mesh attributes), so their (vertex, group, weight) entries are gathered in one pass and picked out with NumPy
+def GetVertexGroupWeights(meshObj, groupName) :
+    mesh = meshObj.data
+    weights = vertexGroupWeights.get((mesh.name, groupName))
+    if weights is None or len(weights) != len(mesh.vertices) :
+        weightAttribute = GetWeightAttribute(mesh, groupName)
+        if weightAttribute is not None :
+            weights = np.empty(len(mesh.vertices), dtype=np.float32)
+            weightAttribute.data.foreach_get("value", weights)
+        else :
+            groupIndex = meshObj.vertex_groups[groupName].index
+            entries = np.array([(v.index, g.group, g.weight) for v in mesh.vertices for g in v.groups], dtype=np.float64).reshape(-1, 3)
+            entries = entries[entries[:, 1] == groupIndex]
+            weights = np.zeros(len(mesh.vertices), dtype=np.float32)
+            weights[entries[:, 0].astype(np.int64)] = entries[:, 2]
+        vertexGroupWeights[(mesh.name, groupName)] = weights
+
+    return weights
+
+# scatters foliageCount placeholder transforms over the surface of a mesh object, in world space.
+# with a vertex group, the density follows its weights, and with mapScale the scales do too
+def GetSurfaceTransforms(surfaceObj, foliageCount, maxRot, maxScaleOffset, seed=None, vertexGroup="", mapScale=False) :
+    vertices, triangles, cumulativeAreas = GetSurfaceAreaTable(surfaceObj.data)
+    weights = None
+    if vertexGroup and (vertexGroup in surfaceObj.vertex_groups or GetWeightAttribute(surfaceObj.data, vertexGroup) is not None) :
+        weights = GetVertexGroupWeights(surfaceObj, vertexGroup)
+        cumulativeAreas = FPCore.BuildAreaTable(vertices, triangles, weights[triangles].mean(axis=1))[0]
+    rng = FPCore.SeededGenerator(FPCore.NewSeed() if seed is None else seed, 2)
+    positions, normals, sampleWeights = FPCore.SampleSurfacePoints(vertices, triangles, cumulativeAreas, foliageCount, rng, weights)
+
+    # move samples into world space, normals use the inverse transpose of the object matrix
+    worldMatrix = np.array(surfaceObj.matrix_world, dtype=np.float64)
+    positions = positions @ worldMatrix[:3, :3].T + worldMatrix[:3, 3]
+    normals = normals @ np.linalg.inv(worldMatrix[:3, :3])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+
+    # blades face away from the center of the surface bounds, and tilt with the distance to it
+    corners = np.array([surfaceObj.matrix_world @ Vector(corner) for corner in surfaceObj.bound_box])
+    center = (corners.min(axis=0) + corners.max(axis=0)) / 2
+    radius = max((corners.max(axis=0) - corners.min(axis=0))[:2]) / 2
+
+    scales = FPCore.MapScales(sampleWeights, maxScaleOffset) if sampleWeights is not None and mapScale else None
+
+    return FPCore.SurfaceTransforms(positions, normals, center, radius, maxRot, maxScaleOffset, rng, scales)
+
+# compact placement store: the placements of a clump kept as ID properties of a collection. "fp_placements" holds the
+# packed float32 position, rotation and scale of every row (see FPCore.PackPlacements), "fp_slots" and "fp_variants"
+# their slots and respawn counts. The placeholder collection keeps the placements of the Compact backend in it,
+# and every foliage collection keeps the placements its copies were last aligned to.
+def WritePlacementStore(coll, slots, transforms, variants=None) :
+    if len(transforms) == 0 :
+        ClearPlacementStore(coll)
+        return
+    coll["fp_placements"] = FPCore.PackPlacements(transforms)
+    coll["fp_slots"] = np.asarray(slots, dtype=np.int32)
+    coll["fp_variants"] = np.zeros(len(transforms), dtype=np.int32) if variants is None else np.asarray(variants, dtype=np.int32)
+
+def HasPlacementStore(coll) :
+    return coll is not None and "fp_placements" in coll
+
+# reads the slots (N,), transforms (N,4,4) and variants (N,) of a placement store
+def ReadPlacementStore(coll) :
+    if not HasPlacementStore(coll) :
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    slots = np.asarray(coll["fp_slots"], dtype=np.int64)
+    variants = np.asarray(coll["fp_variants"], dtype=np.int64)
+
+    return slots, FPCore.UnpackPlacements(np.asarray(coll["fp_placements"], dtype=np.float32)), variants
+
+# reads the slots, transforms and variants of the current placements from whichever placeholder backend holds them
+def ReadPlacements(placeholderColl) :
+    pointsObj = GetPlacementPoints(placeholderColl)
+    if pointsObj :
+        transforms = ReadPlacementPoints(pointsObj)
+        return np.arange(len(transforms)), transforms, np.zeros(len(transforms), dtype=np.int64)
+    if placeholderColl is None or len(placeholderColl.objects) == 0 :
+        return ReadPlacementStore(placeholderColl)
+    GetSlotIndex(placeholderColl)
+
+    return ReadPlaceholderSlots(placeholderColl.objects)
+
+def ClearPlacementStore(coll) :
+    for key in ("fp_placements", "fp_slots", "fp_variants") :
+        if key in coll :
+            del coll[key]
+
+# every new clump gets a random id in the "fp_clump" property of its placeholder collection, foliage collections
+# record the clump their copies were aligned to
+def NewClumpId(placeholderColl) :
+    placeholderColl["fp_clump"] = FPCore.NewSeed()
+
+    return placeholderColl["fp_clump"]
+
+# gives placeholders that were rebuilt from a collection of foliage copies the clump id of the copies
+def AdoptClumpId(placeholderColl, foliageColl) :
+    if foliageColl.get("fp_clump") is not None :
+        placeholderColl["fp_clump"] = foliageColl["fp_clump"]
+    else :
+        NewClumpId(placeholderColl)
+
+# {foliage collection name: (slots, placeholder transforms)} the copies were last aligned to, used by incremental Place.
+# decoded from the foliage collection's placement store, which keeps them across file reloads
+placementSnapshots = {}
+
+# remembers the placements a collection of foliage copies is aligned to: (slots, transforms, variants) arrays,
+# or the current placeholder objects when placements is None
+def StorePlacementSnapshot(foliageColl, placeholderColl, placements=None) :
+    if placements is None :
+        GetSlotIndex(placeholderColl)
+        placements = ReadPlaceholderSlots(placeholderColl.objects)
+    slots, transforms, variants = placements
+    WritePlacementStore(foliageColl, slots, transforms, variants)
+    if placeholderColl.get("fp_clump") is not None :
+        foliageColl["fp_clump"] = placeholderColl["fp_clump"]
+    placementSnapshots[foliageColl.name] = (slots, transforms)
+
+# returns the (slots, transforms) a collection of foliage copies was last aligned to, or None if it has no snapshot
+def GetPlacementSnapshot(foliageColl) :
+    snapshot = placementSnapshots.get(foliageColl.name)
+    if snapshot is None and HasPlacementStore(foliageColl) :
+        slots, transforms = ReadPlacementStore(foliageColl)[:2]
+        snapshot = placementSnapshots[foliageColl.name] = (slots, transforms)
+
+    return snapshot
+
+# incremental Place: only writes the transforms of copies whose placeholder changed since the last update,
+# and only creates or removes copies for placeholders that were added or deleted.
+# placements are the (slots, transforms, variants) arrays of the placeholders, read from placeholderColl when None
+def UpdateFoliageCopies(foliageRef, foliageColl, placeholderColl, foliageNameSuffix, linkData=False, placements=None) :
+    if placements is None :
+        GetSlotIndex(placeholderColl)
+        placements = ReadPlaceholderSlots(placeholderColl.objects)
+    slots, transforms, variants = placements
+
+    # plan against the copy index, and plan once more on a rebuilt index if one of the copies it names is stale
+    for attempt in range(2) :
+        copyIndex = GetSlotIndex(foliageColl)
+        copySlots = np.array(list(copyIndex.keys()), dtype=np.int64)
+        snapshot = GetPlacementSnapshot(foliageColl)
+        if snapshot is None :
+            # no snapshot (copies of an older version of the tool), compare against the copies themselves
+            snapshot = (copySlots, FPCore.PlaceholderTransforms(ReadPlaceholderTransforms(list(copyIndex.values()))))
+
+        updateRows, createRows, removeSlots = FPCore.PlanCopyUpdates(slots, transforms, copySlots, snapshot[0], snapshot[1])
+        updateCopies = GetSlotObjects(foliageColl, slots[updateRows])
+        removeCopies = GetSlotObjects(foliageColl, removeSlots)
+        if updateCopies is not None and removeCopies is not None :
+            break
+
+    with ProfileStage("copy transform update") :
+        copyTransforms = FPCore.CopyTransforms(transforms[updateRows])
+        for copyObj, copyTransform in zip(updateCopies, copyTransforms) :
+            copyObj.matrix_world = Matrix(copyTransform.tolist())
+
+    RemoveObjects(removeCopies)
+
+    if len(createRows) > 0 :
+        SpawnFoliageCopiesFromTransforms([foliageRef], slots[createRows], transforms[createRows], variants[createRows], foliageNameSuffix, linkData)
+    elif len(removeSlots) > 0 :
+        foliageIndex.pop(foliageColl.name, None)
+
+    StorePlacementSnapshot(foliageColl, placeholderColl, placements)
+
+# checks whether any copy of a collection was moved away from the placements it was last aligned to
+def CopiesMoved(foliageColl, snapshot) :
+    copySlots, copyTransforms = ReadPlaceholderSlots(foliageColl.objects)[:2]
+
+    return bool(np.any(FPCore.ChangedSlots(copySlots, FPCore.PlaceholderTransforms(copyTransforms), snapshot[0], snapshot[1], tolerance=1e-3)))
+
+# checks whether a collection of foliage copies is still aligned to the current placeholders.
+# copies the user moved directly don't match, Place then rebuilds the placeholders from them
+def CopiesMatchPlaceholders(placeholderColl, foliageColl) :
+    foliageCopies = foliageColl.objects
+    # instancers follow the placeholders by construction
+    if len(foliageCopies) > 0 and foliageCopies[0].get("fp_instancer") :
+        return True
+    if not placeholderColl :
+        return False
+    # copies aligned by this version of the tool record the clump of their placeholders
+    clumpId = foliageColl.get("fp_clump")
+    if clumpId is not None and placeholderColl.get("fp_clump") is not None :
+        if clumpId != placeholderColl["fp_clump"] :
+            return False
+        snapshot = GetPlacementSnapshot(foliageColl)
+
+        return snapshot is None or not CopiesMoved(foliageColl, snapshot)
+    if len(placeholderColl.objects) != len(foliageCopies) :
+        return False
+
+    # make sure the copies carry slots, then compare the first copy with the placeholder in the same slot
+    GetSlotIndex(foliageColl)
+    firstCopy = foliageCopies[0]
+    placeholder = GetSlotObject(placeholderColl, firstCopy["fp_slot"])
+
+    return placeholder is not None and placeholder.location == firstCopy.location
+
+# sets a new random transform to a given set of objects.
+# every respawn bumps the "fp_variant" of the placeholder, so it draws the next values of its slot stream
+def RespawnSelectedPlaceholders(foliageEmpties, maxRot, maxDistance, maxScaleOffset, foliageEmptyColl, minSpacing=0, seed=None, densityMap=None, mapScale=False) :
+    allFoliageEmpties = foliageEmptyColl.objects
+
+    # look up the slot of every placeholder, then generate all new transforms in one batch
+    respawnEmpties = []
+    respawnIndices = []
+    slotIndex = GetSlotIndex(foliageEmptyColl)
+    indexRebuilt = False
+    for p in foliageEmpties:
+        if slotIndex.get(p.get("fp_slot")) != p and not indexRebuilt :
+            # stale index, rebuild it once
+            foliageIndex.pop(foliageEmptyColl.name, None)
+            slotIndex = GetSlotIndex(foliageEmptyColl)
+            indexRebuilt = True
+        if slotIndex.get(p.get("fp_slot")) == p :
+            p["fp_variant"] = p.get("fp_variant", 0) + 1
+            respawnEmpties.append(p)
+            respawnIndices.append(p["fp_slot"])
+    respawnVariants = [p["fp_variant"] for p in respawnEmpties]
+
+    # Poisson-disk placements keep their spacing to the placeholders that stay in place
+    existingPositions = None
+    if minSpacing > 0 :
+        respawnSlots = set(respawnIndices)
+        existingPositions = np.array([o.location for slot, o in slotIndex.items() if slot not in respawnSlots], dtype=np.float64).reshape(-1, 3)
+
+    transforms = GetPlacementTransforms(len(respawnIndices), maxRot, maxDistance, maxScaleOffset, minSpacing, respawnIndices, existingPositions, seed, respawnVariants, densityMap, mapScale)[0]
+    for p, transform in zip(respawnEmpties, transforms) :
+        p.matrix_world = Matrix(transform.tolist())
+
+    return allFoliageEmpties
+
+def GetFoliageCopyReference(foliageCopyName, foliageNameSuffix) :
+    namesplit = foliageCopyName.split(foliageNameSuffix)
+    objectName = namesplit[0]
+    objectRef = bpy.context.scene.objects.get(objectName)
+
+    return objectRef
+
+# returns the source object of a foliage copy, using its stored source name before falling back to the object name
+def GetFoliageSource(foliageCopy, foliageNameSuffix) :
+    sourceName = foliageCopy.get("fp_source")
+    if sourceName is not None :
+        objectRef = bpy.context.scene.objects.get(sourceName)
+        if objectRef :
+            return objectRef
+
+    return GetFoliageCopyReference(foliageCopy.name, foliageNameSuffix)
+
+# called by Spawn and Placement operators on UI panel
+def main(context, toolFunction, report=None):
+    scene = context.scene
+    data = bpy.data
+    layer = bpy.context.view_layer
+
+    # get cluster parameters from tool property group
+    foliageCount = scene.foliage_placement_properties.foliage_count
+    maxRotation = scene.foliage_placement_properties.max_rotation
+    maxDistance = scene.foliage_placement_properties.max_distance
+    maxScaleOffset = scene.foliage_placement_properties.max_scale
+    linkData = scene.foliage_placement_properties.link_mesh_data
+    incrementalPlace = scene.foliage_placement_properties.incremental_place
+    minSpacing = GetMinSpacing(scene.foliage_placement_properties)
+    seed = scene.foliage_placement_properties.seed
+    placeholderBackend = scene.foliage_placement_properties.placeholder_backend
+
+    # get placeholder object collection 
+    placeholderObjects = []
+    placeholderColl = data.collections.get("FoliagePlaceholders")
+    if placeholderColl :
+        placeholderObjects = placeholderColl.objects
+    
+    # object name suffix used to distinguish foliage copies
+    foliageNameSuffix = "_FPTool"
+    activeObjectName = context.active_object.name
+    # separate selected objects into placeholders, foliage copies, and foliage mesh objects
+    referenceMissing = False
+    selectedCopyNames = []
+    selectedCopies = []
+    foliageCopyRefs = []
+    foliageMeshObjects = []
+    with ProfileStage("selection") :
+        selection = GetSelectionSummary(context)
+        selectedPlaceholders = list(selection.placeholders)
+        foliageMeshObjects = list(selection.meshObjects)
+        for o in selection.mergedObjects :
+            # a selected merged clump stands for the foliage objects it was built from
+            mergedSources, sourceMissing = GetMergedSources(o)
+            if sourceMissing :
+                referenceMissing = True
+                if report :
+                    report({'ERROR'}, "Can't find all foliage objects of '" + o.name + "' (" + o.get("fp_sources", "") + ").")
+            foliageMeshObjects += [source for source in mergedSources if source not in foliageMeshObjects]
+        for o in selection.copies :
+            foliageObject = GetFoliageSource(o, foliageNameSuffix)
+            if not foliageObject :
+                referenceMissing = True
+            selectedCopyNames.append(o.name)
+            selectedCopies.append(o)
+            if not (foliageObject in foliageCopyRefs) :
+                foliageCopyRefs.append(foliageObject)
+
+    if not referenceMissing :
+        # switching back from the Points backend turns the placement points into Empty placeholders
+        pointsObj = GetPlacementPoints(placeholderColl)
+        if placeholderBackend == 'EMPTIES' and pointsObj :
+            transforms = ReadPlacementPoints(pointsObj)
+            RemoveObjects([pointsObj])
+            placeholderObjects = SpawnPlaceholdersFromTransforms(transforms, placeholderColl)
+        # and switching away from the Compact backend expands the placement store into Empty placeholders
+        if placeholderBackend != 'COMPACT' and placeholderColl and len(placeholderColl.objects) == 0 and HasPlacementStore(placeholderColl) :
+            slots, transforms, variants = ReadPlacementStore(placeholderColl)
+            ClearPlacementStore(placeholderColl)
+            placeholderObjects = SpawnPlaceholdersFromTransforms(transforms, placeholderColl, slots, variants)
+
+        if placeholderBackend == 'POINTS' :
+            SpawnFoliagePoints(scene, toolFunction, foliageCopyRefs or foliageMeshObjects, placeholderColl, foliageNameSuffix, report)
+        elif placeholderBackend == 'COMPACT' :
+            SpawnFoliageCompact(scene, toolFunction, foliageCopyRefs or foliageMeshObjects, selectedCopies, placeholderColl, foliageNameSuffix, report)
+        elif toolFunction == 1 :
+            if (len(selectedPlaceholders) > 0) or (len(foliageCopyRefs) > 0) :
+                # get placeholders for selected copies
+                if (len(foliageCopyRefs) > 0) :
+                    # check each copy collection once, not once per selected copy
+                    for foliageObject in foliageCopyRefs :
+                        foliageColl = data.collections.get(foliageObject.name)
+                        if not CopiesMatchPlaceholders(placeholderColl, foliageColl) :
+                            placeholderObjects = RestorePlaceholdersFromCopies(placeholderColl, foliageColl)
+                    selectedSlots = []
+                    for copyObj in selectedCopies :
+                        foliageColl = data.collections.get(GetFoliageSource(copyObj, foliageNameSuffix).name)
+                        # copies share the slot of their placeholder
+                        if GetSlotObject(foliageColl, copyObj.get("fp_slot")) == copyObj :
+                            selectedSlots.append(copyObj["fp_slot"])
+                    placeholderIndex = GetSlotIndex(placeholderColl)
+                    placeholderList = list(placeholderIndex.values())
+                    rows = FPCore.MatchSlots(selectedSlots, list(placeholderIndex.keys()))
+                    selectedPlaceholders = [placeholderList[row] for row in rows if row >= 0]
+                # respawn placeholder objects
+                with ProfileStage("placement transforms") :
+                    RespawnSelectedPlaceholders(selectedPlaceholders, maxRotation, maxDistance, maxScaleOffset, placeholderColl, minSpacing, seed, GetDensityMap(scene.foliage_placement_properties), scene.foliage_placement_properties.map_scale)
+            else :
+                # clear current foliage placeholder collection, or create a new one
+                if "FoliagePlaceholders" in data.collections :
+                    RemoveObjects(placeholderObjects)
+                else:
+                    placeholderColl = data.collections.new("FoliagePlaceholders")
+                    scene.collection.children.link(placeholderColl)
+                NewClumpId(placeholderColl)
+                
+                with ProfileStage("placement transforms") :
+                    transforms, spacedCount = GetClumpTransforms(scene.foliage_placement_properties, foliageCopyRefs or foliageMeshObjects, report)
+                ReportSpacing(report, spacedCount, foliageCount)
+                placeholderObjects = SpawnPlaceholdersFromTransforms(transforms, placeholderColl)
+
+        # pick selected mesh objects if there are no foliage copy references
+        if (len(foliageCopyRefs) == 0 and len(foliageMeshObjects) > 0) :        
+            foliageCopyRefs = foliageMeshObjects
+
+        # build the merged clump, or spawn foliage mesh copies
+        if (len(foliageCopyRefs) > 0) and IsMergedOutput(scene.foliage_placement_properties) :
+            SpawnMergedFoliage(scene, foliageCopyRefs, ReadPlaceholderTransforms(placeholderObjects))
+        elif (len(foliageCopyRefs) > 0) and placeholderBackend == 'EMPTIES' :
+            # clear current foliage copy collections or create new ones
+            spawnCopyRefs = []
+            for i in range(len(foliageCopyRefs)):
+                foliageRef = foliageCopyRefs[i]
+                foliageColl = data.collections.get(foliageRef.name)
+                if foliageColl : #and len(foliageColl.objects) > 0 :
+                    copiesMatch = toolFunction != 2 or len(foliageColl.objects) == 0 or CopiesMatchPlaceholders(placeholderColl, foliageColl)
+                    # update copies in place when they are still aligned to the current placeholders
+                    if toolFunction == 2 and incrementalPlace and copiesMatch and len(foliageColl.objects) > 0 and not foliageColl.objects[0].get("fp_instancer") :
+                        with ProfileStage("incremental update") :
+                            UpdateFoliageCopies(foliageRef, foliageColl, placeholderColl, foliageNameSuffix, linkData)
+                        continue
+                    if not copiesMatch :
+                        placeholderObjects = RestorePlaceholdersFromCopies(placeholderColl, foliageColl)
+                    RemoveObjects(foliageColl.objects)
+                else :
+                    foliageColl = data.collections.new(foliageRef.name)
+                    scene.collection.children.link(foliageColl)
+                spawnCopyRefs.append(foliageRef)
+
+            SpawnFoliageCopies(spawnCopyRefs, placeholderObjects, foliageNameSuffix, linkData)
+            with ProfileStage("placement snapshots") :
+                for foliageRef in spawnCopyRefs :
+                    StorePlacementSnapshot(data.collections.get(foliageRef.name), placeholderColl)
+
+            # reselect foliage copies that were previously cleared
+            for n in selectedCopyNames :
+                foliageObject = scene.objects.get(n)
+                if foliageObject :
+                    foliageObject.select_set(True)
+                    if foliageObject.name == activeObjectName :
+                        layer.objects.active = foliageObject
+
+        with ProfileStage("view layer update") :
+            layer.update()
+
+    # the selected objects were removed or replaced
+    InvalidateSelectionSummary()
+
+    return not referenceMissing
+
+# runs main() for the Spawn (1) or Place (2) operator. With the Profile option on, every stage is timed and
+# objects and meshes are counted; the summary is reported and printed, and optionally written as a Chrome trace
+def RunToolFunction(context, toolFunction, report=None) :
+    props = context.scene.foliage_placement_properties
+    if not props.profile :
+        return main(context, toolFunction, report)
+
+    operatorName = "Spawn" if toolFunction == 1 else "Place"
+    profiler = FPCore.StageProfiler()
+    with UseProfiler(profiler), profiler.Stage(operatorName) :
+        result = main(context, toolFunction, report)
+
+    ReportProfile(profiler, operatorName, props.profile_trace_path, report)
+
+    return result
+
+# reports the slowest stages and the object counts of a profiled run, and writes its trace file
+def ReportProfile(profiler, operatorName, tracePath="", report=None) :
+    totals = profiler.StageTotals()
+    totalSeconds = totals.pop(operatorName, (0.0, 0))[0]
+    slowestStages = sorted(totals.items(), key=lambda item : -item[1][0])[:3]
+    message = operatorName + " took %.1f ms" % (totalSeconds * 1000)
+    if slowestStages :
+        message += " (" + ", ".join(name + " %.1f ms" % (seconds * 1000) for name, (seconds, calls) in slowestStages) + ")"
+    counters = profiler.counters
+    message += ", objects +%d/-%d, meshes +%d/-%d" % (counters.get("objects created", 0), counters.get("objects removed", 0),
+                                                    counters.get("meshes created", 0), counters.get("meshes removed", 0))
+
+    print("Foliage Placement profile, " + operatorName + ":")
+    print(profiler.Summary())
+    if tracePath :
+        tracePath = bpy.path.abspath(tracePath)
+        try :
+            profiler.WriteTrace(tracePath)
+            message += ", trace written to " + tracePath
+        except OSError as error :
+            if report :
+                report({'WARNING'}, "Could not write the profile trace: " + str(error))
+    if report :
+        report({'INFO'}, message)
+
+# create operator class for unit scale button
+class FP_OT_ApplyUnrealUnitsOperator(Operator):
+    bl_label = "Unreal Units"
+    bl_idname = "foliage_placement.apply_unreal_units"
+    bl_description = "Set Metric system unit scale to .01 in meters, and increase the view clipping to 100m"
+    
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT'
+    def execute(self, context):
+        # set system unit scale, and extend view clipping distance 
+        bpy.context.scene.unit_settings.system = 'METRIC'
+        bpy.context.scene.unit_settings.scale_length = 0.01
+        bpy.context.scene.unit_settings.length_unit = 'METERS'
+        bpy.context.space_data.clip_end = 10000
+            
+        return {'FINISHED'}
+
+# create operator class for mesh creation button
+class FP_OT_AddBaseMeshOperator(Operator):
+    bl_label = "Mesh"
+    bl_idname = "foliage_placement.add_base_mesh"
+    bl_description = "Create and select a new grass base mesh oriented along the X axis"
+    
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT'
+    def execute(self, context):
+        units = context.scene.unit_settings
+        
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+            
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+        
+            return {'CANCELLED'}
+                        
+        else:
+            # create new base mesh object
+            newObj = NewBaseMesh()
+            newObj.location = (-25,-50,0)
+            context.scene.collection.objects.link(newObj)
+            bpy.ops.object.select_all(action='DESELECT')
+            newObj.select_set(True)
+            context.view_layer.objects.active = newObj
+            bpy.ops.object.editmode_toggle()
+            bpy.ops.mesh.select_all(action='SELECT') 
+            bpy.ops.uv.unwrap(method='ANGLE_BASED', margin=0.001)
+            bpy.ops.object.editmode_toggle()
+            
+            return {'FINISHED'}
+
+# create operator class for foliage spawn button
+class FP_OT_SpawnFoliageOperator(Operator):
+    bl_label = "Spawn"
+    bl_idname = "foliage_placement.spawn_foliage"
+    bl_description = "Align foliage copies to a *new* set of Empty foliage placeholders"
+    
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and GetSelectionSummary(context).hasMesh
+
+    # spawning a whole new clump of Empties and copies runs modal, in time-boxed chunks with progress; Esc rolls it back.
+    # respawning selected placeholders or copies, and the Points backend, run at once in execute.
+    # with Profile on, every chunk is timed by one profiler, which is reported when the Spawn ends
+    def invoke(self, context, event):
+        props = context.scene.foliage_placement_properties
+        foliageNameSuffix = "_FPTool"
+        selection = GetSelectionSummary(context)
+        if len(selection.placeholders) > 0 or len(selection.copies) > 0 or len(selection.mergedObjects) > 0 :
+            return self.execute(context)
+        foliageObjects = list(selection.meshObjects)
+
+        units = context.scene.unit_settings
+        if props.placeholder_backend != 'EMPTIES' or IsMergedOutput(props) or props.chunk_time == 0 or units.system != 'METRIC' or round(units.scale_length, 2) != 0.01 :
+            return self.execute(context)
+
+        self.profiler = FPCore.StageProfiler() if props.profile else None
+        self.spawnStart = time.perf_counter()
+        with UseProfiler(self.profiler) :
+            with ProfileStage("placement transforms") :
+                transforms, spacedCount = GetClumpTransforms(props, foliageObjects, self.report)
+            ReportSpacing(self.report, spacedCount, props.foliage_count)
+            self.clumpSpawn = ChunkedClumpSpawn(context.scene, transforms, foliageObjects, foliageNameSuffix, props.link_mesh_data)
+        self.chunkSeconds = props.chunk_time / 1000
+        self.chunkSize = 64
+
+        windowManager = context.window_manager
+        windowManager.progress_begin(0, len(transforms))
+        self.timer = windowManager.event_timer_add(0.01, window=context.window)
+        windowManager.modal_handler_add(self)
+
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' :
+            with UseProfiler(self.profiler), ProfileStage("cancel") :
+                self.clumpSpawn.Cancel()
+            self.EndModal(context)
+            self.report({'INFO'}, "Spawn cancelled.")
+
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER' :
+            # keep viewport navigation working while spawning
+            if event.type in {'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM'} :
+                return {'PASS_THROUGH'}
+
+            return {'RUNNING_MODAL'}
+
+        # spawn placements until the chunk time is used up, growing the step size while steps stay short
+        chunkStart = time.perf_counter()
+        with UseProfiler(self.profiler) :
+            while not self.clumpSpawn.IsDone() and time.perf_counter() - chunkStart < self.chunkSeconds :
+                stepStart = time.perf_counter()
+                with ProfileStage("spawn chunk") :
+                    self.clumpSpawn.Step(self.chunkSize)
+                if time.perf_counter() - stepStart < self.chunkSeconds / 4 :
+                    self.chunkSize *= 2
+            with ProfileStage("view layer update") :
+                context.view_layer.update()
+
+        spawnedCount, totalCount = self.clumpSpawn.Progress()
+        context.window_manager.progress_update(spawnedCount)
+        statusText = "Spawning foliage: " + str(spawnedCount) + " / " + str(totalCount) + " placements (Esc to cancel)"
+        if context.area :
+            context.area.header_text_set(statusText)
+        if context.workspace :
+            context.workspace.status_text_set(statusText)
+
+        if self.clumpSpawn.IsDone() :
+            with UseProfiler(self.profiler), ProfileStage("swap staged clump") :
+                self.clumpSpawn.Finish()
+            self.EndModal(context)
+            context.view_layer.update()
+
+            return {'FINISHED'}
+
+        return {'RUNNING_MODAL'}
+
+    def EndModal(self, context):
+        windowManager = context.window_manager
+        windowManager.event_timer_remove(self.timer)
+        windowManager.progress_end()
+        if context.area :
+            context.area.header_text_set(None)
+        if context.workspace :
+            context.workspace.status_text_set(None)
+        InvalidateSelectionSummary()
+
+        # the Spawn stage spans the whole modal run, including the time between chunks
+        if self.profiler :
+            self.profiler.AddEvent("Spawn", self.spawnStart, time.perf_counter() - self.spawnStart)
+            ReportProfile(self.profiler, "Spawn", context.scene.foliage_placement_properties.profile_trace_path, self.report)
+
+    def execute(self, context):
+        units = context.scene.unit_settings
+        
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+            
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+        
+            return {'CANCELLED'}
+
+        elif context.scene.foliage_placement_properties.placeholder_backend == 'POINTS' and bpy.app.version < (3, 2, 0):
+
+            self.report({'ERROR'}, "The Points placeholder backend requires Blender 3.2 or newer!")
+
+            return {'CANCELLED'}
+                        
+        else:
+
+            spawnSuccessful = RunToolFunction(context, 1, self.report)
+
+            if spawnSuccessful :
+
+                return {'FINISHED'}
+
+            else :
+                foliageNameSuffix = "_FPTool"
+                for c in context.selected_objects :
+                    foliageObjectName = c.name
+                    if foliageNameSuffix in c.name :
+                        foliageObject = GetFoliageCopyReference(c.name, foliageNameSuffix)
+                        if not foliageObject :
+                            namesplit = c.name.split(foliageNameSuffix)
+                            referenceName = namesplit[0]
+                            self.report({'ERROR'}, "Can't find original foliage object! Remove collection, or use another object named '" + referenceName + "'.")
+
+                return {'CANCELLED'}
+
+# create operator class for foliage placement button
+class FP_OT_ReplaceFoliageOperator(Operator):
+    bl_label = "Place"
+    bl_idname = "foliage_placement.place_foliage"
+    bl_description = "Align foliage copies to the *current* set of Empty foliage placeholders"
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and ("FoliagePlaceholders" in bpy.data.collections) and GetSelectionSummary(context).hasMesh
+    def execute(self, context):
+        units = context.scene.unit_settings
+        
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+            
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+        
+            return {'CANCELLED'}
+
+        elif context.scene.foliage_placement_properties.placeholder_backend == 'POINTS' and bpy.app.version < (3, 2, 0):
+
+            self.report({'ERROR'}, "The Points placeholder backend requires Blender 3.2 or newer!")
+
+            return {'CANCELLED'}
+                        
+        else:
+
+            spawnSuccessful = RunToolFunction(context, 2, self.report)
+
+            if spawnSuccessful :
+
+                return {'FINISHED'}
+
+            else :
+                foliageNameSuffix = "_FPTool"
+                for c in context.selected_objects :
+                    foliageObjectName = c.name
+                    if foliageNameSuffix in c.name :
+                        foliageObject = GetFoliageCopyReference(c.name, foliageNameSuffix)
+                        if not foliageObject :
+                            namesplit = c.name.split(foliageNameSuffix)
+                            referenceName = namesplit[0]
+                            self.report({'ERROR'}, "Can't find original foliage object! Remove collection, or use another object named '" + referenceName + "'.")
+
+                return {'CANCELLED'}
+
+# create operator class for surface scatter button
+class FP_OT_ScatterFoliageOperator(Operator):
+    bl_label = "Scatter"
+    bl_idname = "foliage_placement.scatter_foliage"
+    bl_description = "Scatter a *new* set of foliage placeholders over the active mesh, and align copies of the other selected meshes to them"
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and context.active_object is not None and context.active_object.type == 'MESH'
+
+    def execute(self, context):
+        units = context.scene.unit_settings
+        props = context.scene.foliage_placement_properties
+
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+
+            return {'CANCELLED'}
+
+        elif props.placeholder_backend == 'POINTS' and bpy.app.version < (3, 2, 0):
+
+            self.report({'ERROR'}, "The Points placeholder backend requires Blender 3.2 or newer!")
+
+            return {'CANCELLED'}
+
+        else:
+            foliageNameSuffix = "_FPTool"
+            surfaceObj = context.active_object
+            if len(surfaceObj.data.polygons) == 0 :
+                self.report({'ERROR'}, "The active object '" + surfaceObj.name + "' has no faces to scatter on!")
+
+                return {'CANCELLED'}
+
+            # the other selected meshes are the foliage objects
+            foliageObjects = []
+            for o in context.selected_objects :
+                if o != surfaceObj and o.type == 'MESH' and not o.get("fp_points") and not o.get("fp_merged") and o.get("fp_lod") is None and not (foliageNameSuffix in o.name) :
+                    foliageObjects.append(o)
+
+            transforms = GetSurfaceTransforms(surfaceObj, props.foliage_count, props.max_rotation, props.max_scale, props.seed, props.density_vertex_group, props.map_scale)
+            SpawnClumpFromTransforms(context.scene, transforms, foliageObjects, foliageNameSuffix)
+            context.view_layer.update()
+
+            return {'FINISHED'}
+
+# create operator class for placeholder select button
+class FP_OT_TogglePlaceholdersOperator(Operator):
+    bl_label = "Empties"
+    bl_idname = "foliage_placement.toggle_placeholders"
+    bl_description = "Show/hide Empty foliage placeholders"
+    
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and ("FoliagePlaceholders" in bpy.data.collections) and len(bpy.data.collections.get("FoliagePlaceholders").objects) > 0   
+
+    def execute(self, context):
+        units = context.scene.unit_settings
+        
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+            
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+        
+            return {'CANCELLED'}
+                        
+        else:
+            # toggle empty placeholder object visibility
+            placeholderColl = bpy.data.collections.get("FoliagePlaceholders")
+            isHidden = placeholderColl.hide_viewport
+            placeholderColl.hide_viewport = not isHidden
+            
+            return {'FINISHED'}
+
+# create operator class for placeholder select button
+class FP_OT_SelectFoliageCopiesOperator(Operator):
+    bl_label = "Select"
+    bl_idname = "foliage_placement.select_copies"
+    bl_description = "Select foliage copies associated with the current selection"
+    
+    @classmethod
+    def poll(cls, context):
+        if context.mode != 'OBJECT' or not ("FoliagePlaceholders" in bpy.data.collections) :
+            return False
+        selection = GetSelectionSummary(context)
+
+        return selection.hasMesh or len(selection.placeholders) > 0
+
+    def execute(self, context):
+        units = context.scene.unit_settings
+        
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+            
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+        
+            return {'CANCELLED'}
+                        
+        else:
+            foliageNameSuffix = "_FPTool"
+            selectedObjects = context.selected_objects
+            bpy.ops.object.select_all(action='DESELECT')
+            for c in selectedObjects :
+                foliageObjectName = c.name
+                foliageColl = bpy.data.collections.get(c.name)
+                if foliageNameSuffix in c.name :
+                    foliageObject = GetFoliageSource(c, foliageNameSuffix)
+
+                    if not foliageObject :
+                        namesplit = c.name.split(foliageNameSuffix)
+                        referenceName = namesplit[0]
+                        self.report({'ERROR'}, "Can't find original foliage object! Remove collection, or use another object named '" + referenceName + "'.")
+
+                        return {'CANCELLED'}
+
+                    foliageColl = bpy.data.collections.get(foliageObject.name)
+                elif c.name.startswith("FoliageEmpty") or c.get("fp_points") :
+                    foliageColl = bpy.data.collections.get("FoliagePlaceholders")
+                if foliageColl : 
+                    for o in foliageColl.objects :
+                        o.select_set(True)
+            if len(context.selected_objects) == 0 :
+                for n in selectedObjects :
+                    n.select_set(True)
+
+            return {'FINISHED'}
+
+# create operator class for linked copy realize button
+class FP_OT_RealizeFoliageCopiesOperator(Operator):
+    bl_label = "Realize"
+    bl_idname = "foliage_placement.realize_copies"
+    bl_description = "Give the selected linked foliage copies their own mesh data, so they can be edited or exported"
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and len(GetSelectionSummary(context).linkedCopies) > 0
+
+    def execute(self, context):
+        realizedCount = RealizeFoliageCopies(list(GetSelectionSummary(context).linkedCopies))
+        InvalidateSelectionSummary()
+        self.report({'INFO'}, "Realized " + str(realizedCount) + " foliage copies.")
+
+        return {'FINISHED'}
+
+# create operator class for LOD button
+class FP_OT_GenerateLodsOperator(Operator):
+    bl_label = "LODs"
+    bl_idname = "foliage_placement.generate_lods"
+    bl_description = "Build LOD0 to LODn of the current placements with fewer placements and decimated meshes per LOD, named with the Unreal LOD suffixes"
+
+    @classmethod
+    def poll(cls, context):
+        if context.mode != 'OBJECT' or not ("FoliagePlaceholders" in bpy.data.collections) :
+            return False
+        selection = GetSelectionSummary(context)
+
+        return len(selection.meshObjects) > 0 or len(selection.copies) > 0 or len(selection.mergedObjects) > 0
+
+    def execute(self, context):
+        units = context.scene.unit_settings
+
+        if units.system != 'METRIC' or round(units.scale_length, 2) != 0.01:
+
+            self.report({'ERROR'}, "Scene units must be Metric with a Unit Scale of 0.01!")
+
+            return {'CANCELLED'}
+
+        # the foliage objects are the selected meshes, and the sources of selected copies and merged clumps
+        foliageNameSuffix = "_FPTool"
+        selection = GetSelectionSummary(context)
+        foliageObjects = list(selection.meshObjects)
+        for o in selection.copies :
+            foliageObjects.append(GetFoliageSource(o, foliageNameSuffix))
+        for o in selection.mergedObjects :
+            foliageObjects += GetMergedSources(o)[0]
+        foliageObjects = [o for i, o in enumerate(foliageObjects) if o and o not in foliageObjects[:i]]
+
+        placeholderColl = bpy.data.collections.get("FoliagePlaceholders")
+        if len(foliageObjects) == 0 or len(ReadPlacements(placeholderColl)[0]) == 0 :
+            self.report({'ERROR'}, "Select the foliage objects of a clump to build its LODs!")
+
+            return {'CANCELLED'}
+
+        lodCounts = SpawnFoliageLods(context, foliageObjects, placeholderColl)
+        InvalidateSelectionSummary()
+        context.view_layer.update()
+        self.report({'INFO'}, "Built " + str(len(lodCounts)) + " LODs with " + ", ".join(str(count) for count in lodCounts) + " placements.")
+
+        return {'FINISHED'}
+
+# create operator class for export button
+class FP_OT_ExportPlacementsOperator(Operator):
+    bl_label = "Export"
+    bl_idname = "foliage_placement.export_placements"
+    bl_description = "Write the current placements to a file for Unreal: a DataTable CSV or JSON, or packed binary transforms for instanced static meshes"
+
+    filepath : StringProperty(
+        subtype = 'FILE_PATH'
+    )
+    export_format : EnumProperty(
+        name = "Format",
+        description = "File format of the exported placements",
+        items = [('CSV', "DataTable CSV", "One row per placement with Location, Rotation and Scale, importable as an Unreal DataTable"),
+                 ('JSON', "DataTable JSON", "The DataTable rows as JSON"),
+                 ('BINARY', "Binary", "Packed little-endian float32 translation, rotation quaternion and scale per placement, for ISM/HISM components")],
+        default = 'CSV'
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and "FoliagePlaceholders" in bpy.data.collections
+
+    def invoke(self, context, event):
+        if not self.filepath :
+            self.filepath = (os.path.splitext(os.path.basename(bpy.data.filepath))[0] or "FoliageClump") + FPCore.PLACEMENT_EXPORT_EXTENSIONS[self.export_format]
+        context.window_manager.fileselect_add(self)
+
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        transforms = ReadPlacements(bpy.data.collections.get("FoliagePlaceholders"))[1]
+        if len(transforms) == 0 :
+            self.report({'ERROR'}, "There are no placements to export!")
+
+            return {'CANCELLED'}
+
+        filepath = os.path.splitext(bpy.path.abspath(self.filepath))[0] + FPCore.PLACEMENT_EXPORT_EXTENSIONS[self.export_format]
+        clumpName = os.path.splitext(os.path.basename(filepath))[0]
+        exportCount = FPCore.ExportPlacements(filepath, self.export_format, [(clumpName, transforms)])
+        self.report({'INFO'}, "Exported " + str(exportCount) + " placements to " + filepath + ".")
+
+        return {'FINISHED'}
+
+# create property group for user options
+class FP_PT_Properties(PropertyGroup):
+
+    foliage_count : IntProperty(
+        name = "Foliage Count", 
+        description="Number of foliage object copies. (Tip: use values that are multiples of 4",
+        default = 8
+    )
+    max_distance : IntProperty(
+        name = "Position",
+        description = "Random position offset from origin",
+        default = 10
+    ) 
+    max_rotation : IntProperty(
+        name = "Rotation",
+        description = "Max pitch rotation angle",
+        default = 10
+    ) 
+    max_scale : IntProperty(
+        name = "Scale Offset",
+        description = "Random scale offset",
+        default = 50
+    )
+    link_mesh_data : BoolProperty(
+        name = "Linked Data",
+        description = "Foliage copies share the source mesh data instead of duplicating it. Use Realize before editing or exporting single copies",
+        default = False
+    )
+    seed : IntProperty(
+        name = "Seed",
+        description = "Random seed, the same seed and settings always spawn the same clump",
+        default = 0,
+        min = 0
+    )
+    placement_mode : EnumProperty(
+        name = "Layout",
+        description = "How new placements are distributed around the origin",
+        items = [('QUADRANTS', "Quadrants", "Random offsets, alternating quadrants by placeholder index"),
+                 ('POISSON', "Poisson Disk", "Random placements inside the Position radius that keep a minimum spacing"),
+                 ('MAP', "Density Map", "Placements inside the Position square follow the brightness of the density image")],
+        default = 'QUADRANTS'
+    )
+    min_spacing : FloatProperty(
+        name = "Spacing",
+        description = "Minimum distance between foliage placements in the Poisson Disk layout",
+        default = 2.0,
+        min = 0.0
+    )
+    density_image : PointerProperty(
+        name = "Density",
+        description = "Grayscale image covering the Position square around the origin, brighter pixels get more placements",
+        type = bpy.types.Image
+    )
+    density_vertex_group : StringProperty(
+        name = "Density Group",
+        description = "Vertex group, or float point attribute, of the Scatter surface whose weights set the placement density",
+        default = ""
+    )
+    map_scale : BoolProperty(
+        name = "Map Scale",
+        description = "The density image or vertex group also sets the scale offset of each placement, instead of a random one",
+        default = False
+    )
+    relax_collisions : BoolProperty(
+        name = "Relax Collisions",
+        description = "Push apart the blades of a new clump that intersect each other, by moving and tilting them. Blades are as long as the X extent and as wide as the Y extent of the largest foliage mesh",
+        default = False
+    )
+    relax_iterations : IntProperty(
+        name = "Iterations",
+        description = "Maximum number of collision relaxation passes",
+        default = 16,
+        min = 1
+    )
+    incremental_place : BoolProperty(
+        name = "Incremental Place",
+        description = "Place only updates the foliage copies whose placeholder changed, instead of spawning all copies again",
+        default = True
+    )
+    use_cache : BoolProperty(
+        name = "Clump Cache",
+        description = "Restore spawned clumps from an on-disk cache keyed by the clump settings and source mesh geometry",
+        default = False
+    )
+    cache_directory : StringProperty(
+        name = "Cache Folder",
+        description = "Folder of the clump cache, leave empty to use the system temp folder",
+        default = "",
+        subtype = 'DIR_PATH'
+    )
+    cache_size : IntProperty(
+        name = "Cache Size (MB)",
+        description = "Size limit of the clump cache, least recently used clumps are removed first",
+        default = 256,
+        min = 1
+    )
+    placeholder_backend : EnumProperty(
+        name = "Placeholders",
+        description = "How foliage placements are stored",
+        items = [('EMPTIES', "Empties", "One Empty object per placement, foliage copies are separate objects"),
+                 ('POINTS', "Points", "All placements are vertices of a single point mesh, foliage copies are instanced with Geometry Nodes (Blender 3.2+)"),
+                 ('COMPACT', "Compact", "Placements are stored as an array on the placeholder collection, without placeholder objects. Switch to Empties to edit them")],
+        default = 'EMPTIES'
+    )
+    output_mode : EnumProperty(
+        name = "Output",
+        description = "What Spawn and Place build on the Empty placeholders",
+        items = [('COPIES', "Copies", "One foliage copy object per placement and foliage object"),
+                 ('MERGED', "Merged", "A single mesh of all copies, with Pivot Painter 2 pivot positions and X vectors baked into UV and color layers")],
+        default = 'COPIES'
+    )
+    lod_count : IntProperty(
+        name = "LODs",
+        description = "Number of LODs built by the LODs button, including LOD0",
+        default = 3,
+        min = 1,
+        max = 8
+    )
+    lod_keep_ratio : FloatProperty(
+        name = "LOD Placements",
+        description = "Share of the placements of the LOD above that each LOD keeps",
+        default = 0.5,
+        min = 0.01,
+        max = 1.0
+    )
+    lod_decimate_ratio : FloatProperty(
+        name = "LOD Decimate",
+        description = "Share of the faces of the LOD above that the meshes of each LOD keep",
+        default = 0.5,
+        min = 0.01,
+        max = 1.0
+    )
+    chunk_time : IntProperty(
+        name = "Chunk Time (ms)",
+        description = "Spawn creates a new clump in chunks of about this many milliseconds, with progress and Esc to cancel. 0 spawns in one go",
+        default = 50,
+        min = 0
+    )
+    profile : BoolProperty(
+        name = "Profile",
+        description = "Time each stage of Spawn and Place, count the objects and meshes they create and remove, and report a summary",
+        default = False
+    )
+    profile_trace_path : StringProperty(
+        name = "Trace File",
+        description = "Also write each profiled run to this JSON trace file, which chrome://tracing and Perfetto can open",
+        default = "",
+        subtype = 'FILE_PATH'
+    )
+
+# create panel class for UI in object mode tool shelf
+class FP_PT_FoliagePlacementPanel(Panel):
+    bl_label = "Foliage Placement"
+    bl_idname = "FP_PT_foliage_placement_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Pivot Painter"
+    bl_context = "objectmode"
+    
+    def draw(self, context):
+        scene = context.scene
+        layout = self.layout
+        
+        col = layout.column(align = True)
+        col.operator("foliage_placement.apply_unreal_units")
+
+        split = layout.split()
+        col = split.column()
+        col.scale_y = 1
+
+        col.prop(scene.foliage_placement_properties, property="foliage_count")
+        col.prop(scene.foliage_placement_properties, property="max_distance")
+        col.prop(scene.foliage_placement_properties, property="max_rotation")
+        col.prop(scene.foliage_placement_properties, property="max_scale")
+        col.prop(scene.foliage_placement_properties, property="seed")
+        col.prop(scene.foliage_placement_properties, property="placement_mode")
+        if scene.foliage_placement_properties.placement_mode == 'POISSON' :
+            col.prop(scene.foliage_placement_properties, property="min_spacing")
+        elif scene.foliage_placement_properties.placement_mode == 'MAP' :
+            col.prop(scene.foliage_placement_properties, property="density_image")
+        if context.active_object and context.active_object.type == 'MESH' :
+            col.prop_search(scene.foliage_placement_properties, "density_vertex_group", context.active_object, "vertex_groups")
+        col.prop(scene.foliage_placement_properties, property="map_scale")
+        col.prop(scene.foliage_placement_properties, property="relax_collisions")
+        if scene.foliage_placement_properties.relax_collisions :
+            col.prop(scene.foliage_placement_properties, property="relax_iterations")
+        col.prop(scene.foliage_placement_properties, property="link_mesh_data")
+        col.prop(scene.foliage_placement_properties, property="incremental_place")
+        col.prop(scene.foliage_placement_properties, property="placeholder_backend")
+        if scene.foliage_placement_properties.placeholder_backend == 'EMPTIES' :
+            col.prop(scene.foliage_placement_properties, property="output_mode")
+        col.prop(scene.foliage_placement_properties, property="chunk_time")
+        col.prop(scene.foliage_placement_properties, property="lod_count")
+        if scene.foliage_placement_properties.lod_count > 1 :
+            col.prop(scene.foliage_placement_properties, property="lod_keep_ratio")
+            col.prop(scene.foliage_placement_properties, property="lod_decimate_ratio")
+        col.prop(scene.foliage_placement_properties, property="use_cache")
+        if scene.foliage_placement_properties.use_cache :
+            col.prop(scene.foliage_placement_properties, property="cache_directory")
+            col.prop(scene.foliage_placement_properties, property="cache_size")
+        col.prop(scene.foliage_placement_properties, property="profile")
+        if scene.foliage_placement_properties.profile :
+            col.prop(scene.foliage_placement_properties, property="profile_trace_path")
+        
+        split = layout.split()
+        col = split.column()
+        col.scale_y = 1.5
+        col.operator("foliage_placement.add_base_mesh")
+        col.operator("foliage_placement.spawn_foliage")
+        col.operator("foliage_placement.place_foliage")
+        col.operator("foliage_placement.scatter_foliage")
+        col.operator("foliage_placement.select_copies")
+        col.operator("foliage_placement.toggle_placeholders")
+        col.operator("foliage_placement.realize_copies")
+        col.operator("foliage_placement.generate_lods")
+        col.operator("foliage_placement.export_placements")
+
+# drops cached data of meshes whose geometry changed, of images that changed and of collections whose objects changed,
+# and the selection summary when the selection may have changed
+@persistent
+def FoliageDepsgraphUpdate(scene, depsgraph=None):
+    if depsgraph is None or depsgraph.id_type_updated('SCENE') :
+        InvalidateSelectionSummary()
+    if depsgraph is None :
+        InvalidateFoliageIndex()
+        surfaceAreaTables.clear()
+        vertexGroupWeights.clear()
+        meshGeometryHashes.clear()
+        densityMaps.clear()
+
+        return
+
+    for update in depsgraph.updates :
+        # objects were linked to or unlinked from a collection (added, deleted, duplicated or moved)
+        if isinstance(update.id.original, bpy.types.Collection) :
+            foliageIndex.pop(update.id.original.name, None)
+        if isinstance(update.id.original, bpy.types.Image) :
+            densityMaps.pop(update.id.original.name, None)
+        if update.is_updated_geometry :
+            updatedID = update.id.original
+            meshName = None
+            if isinstance(updatedID, bpy.types.Object) and updatedID.type == 'MESH' :
+                meshName = updatedID.data.name
+            elif isinstance(updatedID, bpy.types.Mesh) :
+                meshName = updatedID.name
+            if meshName is not None :
+                surfaceAreaTables.pop(meshName, None)
+                for weightsKey in [key for key in vertexGroupWeights if key[0] == meshName] :
+                    del vertexGroupWeights[weightsKey]
+                meshGeometryHashes.pop(meshName, None)
+
+# cached object references, mesh tables and density maps don't survive loading another file
+@persistent
+def FoliageLoadPost(dummy):
+    InvalidateFoliageIndex()
+    InvalidateSelectionSummary()
+    placementSnapshots.clear()
+    surfaceAreaTables.clear()
+    vertexGroupWeights.clear()
+    meshGeometryHashes.clear()
+    densityMaps.clear()
+
+# create register functions for adding and removing script 
+classes = ( FP_PT_Properties,
+            FP_OT_ApplyUnrealUnitsOperator,
+            FP_OT_AddBaseMeshOperator,
+            FP_OT_SpawnFoliageOperator, 
+            FP_OT_ReplaceFoliageOperator,
+            FP_OT_ScatterFoliageOperator,
+            FP_OT_TogglePlaceholdersOperator,
+            FP_OT_SelectFoliageCopiesOperator, 
+            FP_OT_RealizeFoliageCopiesOperator,
+            FP_OT_GenerateLodsOperator,
+            FP_OT_ExportPlacementsOperator,
+            FP_PT_FoliagePlacementPanel, )
+
+def register():
+    from bpy.utils import register_class
+    for cls in classes:
+        register_class(cls)
+
+    bpy.types.Scene.foliage_placement_properties = PointerProperty(type = FP_PT_Properties)
+    bpy.app.handlers.depsgraph_update_post.append(FoliageDepsgraphUpdate)
+    bpy.app.handlers.load_post.append(FoliageLoadPost)
+
+def unregister():
+    from bpy.utils import unregister_class
+    bpy.app.handlers.depsgraph_update_post.remove(FoliageDepsgraphUpdate)
+    bpy.app.handlers.load_post.remove(FoliageLoadPost)
+    for cls in reversed(classes):
+        unregister_class(cls)
+
+    del bpy.types.Scene.foliage_placement_properties
+    
+if __name__ == "__main__":
+    register()
\ No newline at end of file
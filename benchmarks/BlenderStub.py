@@ -0,0 +1,638 @@
+# A small in-memory stand-in for the parts of bpy and mathutils the Foliage Placement Tool uses,
+# so the tool's placement code can be run and timed outside of Blender.
+# It only models what the benchmarks need: ID blocks with custom properties, object and collection
+# linking, matrix_world, foreach_get on collection objects, orphan mesh tracking, and the window manager
+# calls of modal operators.
+
+import sys
+import types
+import numpy as np
+
+# mathutils
+
+class Vector:
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self._values = np.array(values, dtype=np.float64)
+
+    def __iter__(self):
+        return iter(self._values.tolist())
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return float(self._values[index])
+
+    def __array__(self, dtype=None, copy=None):
+        return self._values.astype(dtype) if dtype else self._values.copy()
+
+    def __add__(self, other):
+        return Vector(self._values + np.asarray(other, dtype=np.float64))
+
+    def __sub__(self, other):
+        return Vector(self._values - np.asarray(other, dtype=np.float64))
+
+    def __eq__(self, other):
+        return np.array_equal(self._values, np.asarray(other, dtype=np.float64))
+
+    def __ne__(self, other):
+        return not self == other
+
+    x = property(lambda self: float(self._values[0]))
+    y = property(lambda self: float(self._values[1]))
+    z = property(lambda self: float(self._values[2]))
+
+class Matrix:
+    def __init__(self, rows=None):
+        self._values = np.identity(4) if rows is None else np.array(rows, dtype=np.float64)
+
+    @staticmethod
+    def Translation(vector):
+        matrix = Matrix()
+        matrix._values[:3, 3] = np.asarray(vector, dtype=np.float64)[:3]
+        return matrix
+
+    @staticmethod
+    def Scale(factor, size):
+        return Matrix(np.identity(size) * factor if size == 3 else np.diag([factor, factor, factor, 1.0]))
+
+    def to_4x4(self):
+        matrix = Matrix()
+        size = len(self._values)
+        matrix._values[:size, :size] = self._values
+        return matrix
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix(self._values @ other._values)
+        vector = np.asarray(other, dtype=np.float64)
+        if len(self._values) == 4 and len(vector) == 3:
+            return Vector((self._values @ np.append(vector, 1.0))[:3])
+        return Vector(self._values @ vector)
+
+    def __array__(self, dtype=None, copy=None):
+        return self._values.astype(dtype) if dtype else self._values.copy()
+
+    def __iter__(self):
+        return iter([Vector(row) for row in self._values])
+
+    def __len__(self):
+        return len(self._values)
+
+class Euler:
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        self._values = np.array(angles, dtype=np.float64)
+
+    def to_matrix(self):
+        return Matrix(FPCore.EulersToMatrices(self._values.reshape(1, 3))[0])
+
+    def __iter__(self):
+        return iter(self._values.tolist())
+
+    def __getitem__(self, index):
+        return float(self._values[index])
+
+# bpy.data
+
+class StubID:
+    def __init__(self, name):
+        self._name = name
+        self._props = {}
+        self._removed = False
+        self._blocks = None
+        self.users = 0
+
+    @property
+    def name(self):
+        if self._removed:
+            raise ReferenceError("StructRNA of type " + type(self).__name__ + " has been removed")
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._blocks.Rename(self, name)
+
+    def get(self, key, default=None):
+        return self._props.get(key, default)
+
+    def __getitem__(self, key):
+        return self._props[key]
+
+    def __setitem__(self, key, value):
+        self._props[key] = value
+
+    def __delitem__(self, key):
+        del self._props[key]
+
+    def __contains__(self, key):
+        return key in self._props
+
+# mesh element arrays (vertices, loops, polygons, layer data) with foreach_get/foreach_set
+class MeshElements:
+    def __init__(self, attributeSizes, count=0):
+        self._arrays = {name : np.zeros((count, size)) for name, size in attributeSizes.items()}
+
+    def __len__(self):
+        return len(next(iter(self._arrays.values())))
+
+    def add(self, count):
+        for name, values in self._arrays.items() :
+            self._arrays[name] = np.concatenate((values, np.zeros((count, values.shape[1]))))
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = self._arrays[attribute].ravel()
+
+    def foreach_set(self, attribute, buffer):
+        self._arrays[attribute] = np.asarray(buffer, dtype=np.float64).reshape(len(self), -1)
+
+class MeshLayer:
+    def __init__(self, name, attributeSizes, count):
+        self.name = name
+        self.data = MeshElements(attributeSizes, count)
+
+# byte color attribute values, stored as sRGB bytes like in Blender: "color" reads and writes scene linear values,
+# "color_srgb" the stored ones
+class ByteColorElements(MeshElements):
+    def foreach_get(self, attribute, buffer):
+        colors = self._arrays["color"] / 255.0
+        if attribute == "color":
+            colors[:, :3] = FPCore.SrgbToLinear(colors[:, :3])
+        buffer[:] = colors.ravel()
+
+    def foreach_set(self, attribute, buffer):
+        colors = np.array(buffer, dtype=np.float64).reshape(len(self), 4)
+        if attribute == "color":
+            colors[:, :3] = FPCore.LinearToSrgb(colors[:, :3])
+        self._arrays["color"] = np.round(np.clip(colors, 0.0, 1.0) * 255.0)
+
+class MeshLayers(list):
+    def __init__(self, mesh, attributeSizes):
+        super().__init__()
+        self._mesh = mesh
+        self._attributeSizes = attributeSizes
+        self.active = None
+
+    def new(self, name="", *args):
+        layer = MeshLayer(name, self._attributeSizes, len(self._mesh.loops))
+        self.append(layer)
+        if self.active is None :
+            self.active = layer
+        return layer
+
+class ColorAttributes(MeshLayers):
+    def new(self, name, attributeType, domain):
+        layer = super().new(name)
+        layer.data = ByteColorElements(self._attributeSizes, len(self._mesh.loops))
+        return layer
+
+# float point attributes: "vector" values for FLOAT_VECTOR attributes, "value" for FLOAT ones
+class MeshAttribute:
+    def __init__(self, name, attributeType, domain, count):
+        self.name = name
+        self.data_type = attributeType
+        self.domain = domain
+        self.data = MeshElements({"vector" : 3} if attributeType == 'FLOAT_VECTOR' else {"value" : 1}, count)
+
+class MeshAttributes(dict):
+    def __init__(self, mesh):
+        super().__init__()
+        self._mesh = mesh
+
+    def new(self, name, attributeType, domain):
+        attribute = self[name] = MeshAttribute(name, attributeType, domain, len(self._mesh.vertices))
+        return attribute
+
+# meshes are a strip of triangles along X, the vertices and faces of copies are shared with their source
+class Mesh(StubID):
+    def __init__(self, name, vertexCount=0):
+        super().__init__(name)
+        self.vertices = MeshElements({"co" : 3}, vertexCount)
+        self.loops = MeshElements({"vertex_index" : 1})
+        self.polygons = MeshElements({"loop_start" : 1, "loop_total" : 1, "material_index" : 1})
+        self.uv_layers = MeshLayers(self, {"uv" : 2})
+        self.color_attributes = ColorAttributes(self, {"color" : 4})
+        self.attributes = MeshAttributes(self)
+        self.materials = []
+        if vertexCount >= 3 :
+            self.vertices._arrays["co"][:, 0] = np.arange(vertexCount) * 10.0
+            self.vertices._arrays["co"][1::2, 1] = 2.0
+            triangleCount = vertexCount - 2
+            self.loops._arrays["vertex_index"] = (np.arange(triangleCount)[:, None] + np.arange(3)).reshape(-1, 1).astype(np.float64)
+            self.polygons._arrays = {"loop_start" : np.arange(triangleCount)[:, None] * 3.0,
+                                     "loop_total" : np.full((triangleCount, 1), 3.0),
+                                     "material_index" : np.zeros((triangleCount, 1))}
+            self.uv_layers.new("UVMap")
+
+    def clear_geometry(self):
+        self.vertices = MeshElements({"co" : 3})
+        self.loops = MeshElements({"vertex_index" : 1})
+        self.polygons = MeshElements({"loop_start" : 1, "loop_total" : 1, "material_index" : 1})
+        self.attributes.clear()
+
+    def update(self, calc_edges=False):
+        pass
+
+    def copy(self):
+        meshCopy = data.meshes.new(self._name)
+        meshCopy.__dict__.update({key : value for key, value in self.__dict__.items() if key not in ("_name", "_props", "_blocks", "users")})
+        meshCopy._props = dict(self._props)
+        return meshCopy
+
+class ObjectModifiers(list):
+    def new(self, name, modifierType):
+        modifier = types.SimpleNamespace(name=name, type=modifierType, ratio=1.0)
+        self.append(modifier)
+        return modifier
+
+class Object(StubID):
+    def __init__(self, name, objectData):
+        super().__init__(name)
+        self.modifiers = ObjectModifiers()
+        self._data = None
+        self._matrix = np.identity(4)
+        self.usersCollection = []
+        self.type = 'EMPTY' if objectData is None else 'MESH'
+        self.empty_display_size = 1.0
+        self.empty_display_type = 'PLAIN_AXES'
+        self.hide_viewport = False
+        self.data = objectData
+
+    @property
+    def data(self):
+        return self._data
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    @data.setter
+    def data(self, objectData):
+        if self._data is not None:
+            self._data.users -= 1
+        if objectData is not None:
+            objectData.users += 1
+        self._data = objectData
+
+    @property
+    def matrix_world(self):
+        return Matrix(self._matrix)
+
+    @matrix_world.setter
+    def matrix_world(self, matrix):
+        self._matrix = np.array(matrix, dtype=np.float64).reshape(4, 4)
+
+    @property
+    def location(self):
+        return Vector(self._matrix[:3, 3])
+
+    @property
+    def scale(self):
+        return Vector(np.linalg.norm(self._matrix[:3, :3], axis=0))
+
+    @property
+    def rotation_euler(self):
+        return Euler(FPCore.DecomposeTransforms(self._matrix.reshape(1, 4, 4))[1][0])
+
+    def select_set(self, state):
+        self.selected = state
+
+class CollectionObjects:
+    def __init__(self, owner):
+        self._owner = owner
+        self._objects = {}
+        self._list = None
+
+    def link(self, o):
+        self._objects[id(o)] = o
+        self._list = None
+        o.usersCollection.append(self._owner)
+
+    def unlink(self, o):
+        del self._objects[id(o)]
+        self._list = None
+        o.usersCollection.remove(self._owner)
+
+    def List(self):
+        if self._list is None:
+            self._list = list(self._objects.values())
+        return self._list
+
+    def __iter__(self):
+        return iter(self.List())
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __getitem__(self, index):
+        if isinstance(index, str):
+            return next(o for o in self._objects.values() if o.name == index)
+        return self.List()[index]
+
+    def get(self, name, default=None):
+        return next((o for o in self._objects.values() if o.name == name), default)
+
+    def foreach_get(self, attribute, buffer):
+        if attribute != "matrix_world":
+            raise AttributeError("the stub only reads matrix_world, not " + attribute)
+        # matrices are flattened column-major, like Blender does
+        values = [o._matrix.T.ravel() for o in self._objects.values()]
+        buffer[:] = np.concatenate(values) if values else []
+
+class CollectionChildren(list):
+    def link(self, coll):
+        if coll in self:
+            raise RuntimeError("Collection '" + coll.name + "' already in collection")
+        self.append(coll)
+
+    def unlink(self, coll):
+        self.remove(coll)
+
+    def get(self, name, default=None):
+        return next((coll for coll in self if coll.name == name), default)
+
+class Collection(StubID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = CollectionObjects(self)
+        self.children = CollectionChildren()
+
+class DataBlocks:
+    def __init__(self, blockType):
+        self._blockType = blockType
+        self._blocks = {}
+        self._nameCounters = {}
+        self.created = 0
+        self.removed = 0
+
+    def UniqueName(self, name):
+        if name not in self._blocks:
+            return name
+        counter = self._nameCounters.get(name, 0)
+        while True:
+            counter += 1
+            uniqueName = name + "." + str(counter).zfill(3)
+            if uniqueName not in self._blocks:
+                self._nameCounters[name] = counter
+                return uniqueName
+
+    def new(self, name, *args):
+        block = self._blockType(self.UniqueName(name), *args)
+        block._blocks = self
+        self._blocks[block.name] = block
+        self.created += 1
+        return block
+
+    def Rename(self, block, name):
+        del self._blocks[block._name]
+        block._name = self.UniqueName(name)
+        self._blocks[block._name] = block
+
+    def remove(self, block, do_unlink=True):
+        del self._blocks[block.name]
+        block._removed = True
+        self.removed += 1
+
+    def get(self, name, default=None):
+        return self._blocks.get(name, default)
+
+    def __contains__(self, name):
+        return name in self._blocks
+
+    def __iter__(self):
+        return iter(list(self._blocks.values()))
+
+    def __len__(self):
+        return len(self._blocks)
+
+class ObjectBlocks(DataBlocks):
+    def remove(self, o, do_unlink=True):
+        for coll in list(o.usersCollection):
+            coll.objects.unlink(o)
+        o.data = None
+        super().remove(o, do_unlink)
+
+class CollectionBlocks(DataBlocks):
+    def remove(self, coll, do_unlink=True):
+        for parent in [context.scene.collection] + list(self._blocks.values()) :
+            if coll in parent.children :
+                parent.children.remove(coll)
+        super().remove(coll, do_unlink)
+
+# a Decimate modifier keeps its ratio of the triangles of the strip
+class MeshBlocks(DataBlocks):
+    def new_from_object(self, o):
+        triangleCount = len(o.data.polygons)
+        for modifier in o.modifiers :
+            if modifier.type == 'DECIMATE' :
+                triangleCount = max(1, int(round(triangleCount * modifier.ratio)))
+        return self.new(o.data.name, triangleCount + 2)
+
+class BlendData:
+    def __init__(self):
+        self.objects = ObjectBlocks(Object)
+        self.meshes = MeshBlocks(Mesh)
+        self.collections = CollectionBlocks(Collection)
+        self.node_groups = DataBlocks(StubID)
+
+    @property
+    def scenes(self):
+        return [context.scene]
+
+    def batch_remove(self, ids):
+        for block in ids :
+            block._blocks.remove(block)
+
+# bpy.context
+
+class UnitSettings:
+    system = 'METRIC'
+    scale_length = 0.01
+    length_unit = 'METERS'
+
+class SceneObjects:
+    def get(self, name, default=None):
+        return data.objects.get(name, default)
+
+class Scene:
+    def __init__(self):
+        self.name = "Scene"
+        self.collection = Collection("Scene Collection")
+        self.objects = SceneObjects()
+        self.unit_settings = UnitSettings()
+
+class LayerObjects:
+    active = None
+
+class ViewLayer:
+    def __init__(self):
+        self.name = "ViewLayer"
+        self.objects = LayerObjects()
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+class WindowManager:
+    def __init__(self):
+        self.modalOperators = []
+        self.progress = None
+
+    def progress_begin(self, low, high):
+        self.progress = low
+
+    def progress_update(self, value):
+        self.progress = value
+
+    def progress_end(self):
+        self.progress = None
+
+    def event_timer_add(self, timeStep, window=None):
+        return types.SimpleNamespace(time_step=timeStep)
+
+    def event_timer_remove(self, timer):
+        pass
+
+    def modal_handler_add(self, operator):
+        self.modalOperators.append(operator)
+
+# evaluated depsgraph, counts its updates
+class Depsgraph:
+    def __init__(self):
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+class Context:
+    def __init__(self):
+        self.scene = Scene()
+        self.view_layer = ViewLayer()
+        self.window_manager = WindowManager()
+        self.window = None
+        self.workspace = None
+        self.area = None
+        self.selected_objects = []
+        self.active_object = None
+        self.mode = 'OBJECT'
+        self.depsgraph = Depsgraph()
+
+    def evaluated_depsgraph_get(self):
+        return self.depsgraph
+
+# bpy.types and bpy.props
+
+# RNA property types of the bpy.props property factories
+rnaPropertyTypes = {"IntProperty" : 'INT', "FloatProperty" : 'FLOAT', "BoolProperty" : 'BOOLEAN', "EnumProperty" : 'ENUM', "StringProperty" : 'STRING', "PointerProperty" : 'POINTER', "FloatVectorProperty" : 'FLOAT'}
+
+class StubProperty:
+    def __init__(self, propertyType, **options):
+        self.propertyType = propertyType
+        self.options = options
+
+def PropertyFactory(propertyType):
+    return lambda **options: StubProperty(propertyType, **options)
+
+class StubType:
+    pass
+
+class Operator(StubType):
+    def report(self, level, message):
+        print(next(iter(level)) + ": " + message)
+
+class StubOps:
+    def __getattr__(self, name):
+        return StubOps()
+
+    def __call__(self, *args, **options):
+        return {'FINISHED'}
+
+data = None
+context = None
+FPCore = None
+
+# builds a fresh Blender session: empty data, a default scene and context
+def ResetSession():
+    global data, context
+    data = BlendData()
+    context = Context()
+    bpy.data = data
+    bpy.context = context
+
+    return context
+
+# returns a property group filled with the defaults of a PropertyGroup class's annotated properties
+def DefaultProperties(propertyGroup, **overrides):
+    annotations = {name : prop for name, prop in propertyGroup.__annotations__.items() if isinstance(prop, StubProperty)}
+    values = {name : prop.options.get("default") for name, prop in annotations.items()}
+    values.update(overrides)
+    rnaProperties = {name : types.SimpleNamespace(type=rnaPropertyTypes[prop.propertyType]) for name, prop in annotations.items()}
+
+    return types.SimpleNamespace(bl_rna=types.SimpleNamespace(properties=rnaProperties), **values)
+
+# adds a selectable mesh object to the scene, e.g. a foliage source blade
+def AddMeshObject(name, vertexCount=5):
+    o = data.objects.new(name, data.meshes.new(name, vertexCount))
+    context.scene.collection.objects.link(o)
+
+    return o
+
+# image with float RGBA pixels, e.g. a density map
+class Image(StubID):
+    def __init__(self, name, width, height, pixels=None):
+        super().__init__(name)
+        self.size = (width, height)
+        self.channels = 4
+        self.pixels = FloatBuffer(np.ones(width * height * 4, dtype=np.float32) if pixels is None else pixels)
+
+class FloatBuffer:
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32).reshape(-1)
+
+    def __len__(self):
+        return len(self.values)
+
+    def foreach_get(self, buffer):
+        buffer[:] = self.values
+
+bpy = types.ModuleType("bpy")
+bpy.types = types.ModuleType("bpy.types")
+for typeName in ("Panel", "PropertyGroup", "Menu", "UIList", "AddonPreferences") :
+    setattr(bpy.types, typeName, type(typeName, (StubType,), {}))
+bpy.types.Operator = Operator
+bpy.types.Scene = Scene
+bpy.types.Object = Object
+bpy.types.Mesh = Mesh
+bpy.types.Collection = Collection
+bpy.types.Image = Image
+bpy.types.ByteColorAttributeValue = types.SimpleNamespace(bl_rna=types.SimpleNamespace(properties={"color" : None, "color_srgb" : None}))
+bpy.props = types.ModuleType("bpy.props")
+for propertyType in ("IntProperty", "FloatProperty", "BoolProperty", "EnumProperty", "StringProperty", "PointerProperty", "FloatVectorProperty") :
+    setattr(bpy.props, propertyType, PropertyFactory(propertyType))
+bpy.app = types.ModuleType("bpy.app")
+bpy.app.version = (4, 1, 0)
+bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+bpy.app.handlers.persistent = lambda function: function
+bpy.app.handlers.depsgraph_update_post = []
+bpy.app.handlers.load_post = []
+bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+bpy.ops = StubOps()
+
+mathutils = types.ModuleType("mathutils")
+mathutils.Vector = Vector
+mathutils.Matrix = Matrix
+mathutils.Euler = Euler
+
+# installs the stub modules, so that importing the tool picks them up instead of Blender's
+def Install():
+    global FPCore
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.types"] = bpy.types
+    sys.modules["bpy.props"] = bpy.props
+    sys.modules["bpy.app"] = bpy.app
+    sys.modules["bpy.app.handlers"] = bpy.app.handlers
+    sys.modules["mathutils"] = mathutils
+    from FoliagePlacementTool_280 import FoliagePlacementCore
+    FPCore = FoliagePlacementCore
+    ResetSession()
+
+    return bpy
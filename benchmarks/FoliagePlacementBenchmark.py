@@ -0,0 +1,366 @@
+# Benchmarks of the Foliage Placement Tool, run with plain Python (no Blender needed):
+#   python benchmarks/FoliagePlacementBenchmark.py [--counts 8,100,1000,10000,100000] [--sources 2] [--json results.json]
+# Core stages time the bpy-free FoliagePlacementCore functions. Tool stages run the tool's main() on the
+# in-memory Blender stub, so they measure the tool's own Python overhead, not Blender's object creation cost.
+# Every stage reports its time, placements per second, and the peak memory allocated by Python while it ran.
+# Every run also times a fixed calibration workload. With --baseline, every stage is compared with a stored results
+# file (a --json output) relative to the calibration time of both runs, so a baseline from another machine still
+# applies, and the run exits with status 1 when a stage got slower than the tolerance allows:
+#   python benchmarks/FoliagePlacementBenchmark.py --counts 100,1000 --no-memory --baseline benchmarks/FoliagePlacementBaseline.json
+
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+benchmarkDir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarkDir))
+sys.path.insert(0, benchmarkDir)
+
+import BlenderStub
+BlenderStub.Install()
+import FoliagePlacementTool_280 as FPTool
+from FoliagePlacementTool_280 import FoliagePlacementCore as FPCore
+
+defaultCounts = [8, 100, 1000, 10000, 100000]
+benchmarkSeed = 1234
+
+# times one block of a stage, and optionally records the peak Python memory it allocated
+class StageTimer:
+    def __init__(self, traceMemory):
+        self.traceMemory = traceMemory
+        self.seconds = 0.0
+        self.peakBytes = 0
+
+    def __enter__(self):
+        if self.traceMemory :
+            tracemalloc.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.seconds = time.perf_counter() - self.start
+        if self.traceMemory :
+            self.peakBytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+# minimum spacing that lets Poisson-disk sampling fit most of the placements inside the Position radius
+def BenchmarkSpacing(count, maxDistance):
+    return 0.5 * maxDistance / np.sqrt(max(count, 1))
+
+# rows edited by the placement stages: 1 in every 10 placements.
+# the first row is left alone, as Place treats a moved first placeholder as placeholders that no longer match their copies
+def MovedRows(count):
+    return np.arange(min(5, count - 1), count, 10)
+
+# fixed NumPy and pure Python workload, timed in every run to compare stage times across machines
+def CalibrationWorkload():
+    values = np.random.default_rng(benchmarkSeed).random(200000)
+    np.unique(np.floor(np.sort(values) * 1000))
+    table = {}
+    for i in range(100000) :
+        table[i % 997] = table.get(i % 997, 0) + i
+
+# times the calibration workload, the fastest of a few runs
+def CalibrationSeconds(repeat=5):
+    seconds = []
+    for run in range(repeat) :
+        with StageTimer(False) as timer :
+            CalibrationWorkload()
+        seconds.append(timer.seconds)
+
+    return min(seconds)
+
+# core stages
+
+def StageRandomTransforms(count, sources, timer):
+    with timer :
+        FPCore.GetRandomTransforms(count, 10, 10, 50, seed=benchmarkSeed)
+
+def StagePoissonTransforms(count, sources, timer):
+    rng = FPCore.SeededGenerator(benchmarkSeed, 1)
+    with timer :
+        FPCore.GetPoissonTransforms(count, 10, 10, 50, BenchmarkSpacing(count, 10), rng)
+
+def StageCopyTransforms(count, sources, timer):
+    transforms = FPCore.GetRandomTransforms(count, 10, 10, 50, seed=benchmarkSeed)
+    with timer :
+        for source in range(sources) :
+            FPCore.CopyTransforms(transforms)
+
+def StagePlanCopyUpdates(count, sources, timer):
+    slots = np.arange(count)
+    transforms = FPCore.GetRandomTransforms(count, 10, 10, 50, seed=benchmarkSeed)
+    snapshotTransforms = transforms.copy()
+    snapshotTransforms[MovedRows(count), 0, 3] += 1.0
+    with timer :
+        for source in range(sources) :
+            FPCore.PlanCopyUpdates(slots, transforms, slots, slots, snapshotTransforms)
+
+def StageMergeMeshCopies(count, sources, timer):
+    transforms = FPCore.CopyTransforms(FPCore.GetRandomTransforms(count, 10, 10, 50, seed=benchmarkSeed))
+    sourceMesh = BlenderStub.Mesh("Blade", 5)
+    vertices, loopTotals, loopVertices, uvs, materialIndices = FPTool.ReadMeshBuffers(sourceMesh)
+    with timer :
+        for source in range(sources) :
+            FPCore.MergeMeshCopies(vertices, loopTotals, loopVertices, transforms, (uvs, materialIndices))
+            FPCore.PivotPainterLayers(*FPCore.PivotPainterElements(transforms, np.full(count, 40.0)), np.full(count, len(loopVertices)))
+
+def StageRelaxCollisions(count, sources, timer):
+    transforms = FPCore.GetRandomTransforms(count, 45, 10 * np.sqrt(count), 50, seed=benchmarkSeed)
+    with timer :
+        FPCore.RelaxBladeCollisions(transforms, 50, 4, 16)
+
+# a crowded clump, 10k blades within 300 units: most blades collide before relaxation
+def StageRelaxCollisionsDense(count, sources, timer):
+    transforms = FPCore.GetRandomTransforms(count, 45, 3 * np.sqrt(count), 50, seed=benchmarkSeed)
+    with timer :
+        FPCore.RelaxBladeCollisions(transforms, 50, 4, 16)
+
+# placements from a 1024x1024 density map whose CDF is already built, as on every Spawn after the first
+def StageDensityMapTransforms(count, sources, timer):
+    densityMap = FPCore.DensityMap(np.random.default_rng(benchmarkSeed).uniform(0.0, 1.0, 1024 * 1024), 1024, 1024)
+    rng = FPCore.SeededGenerator(benchmarkSeed, 3)
+    with timer :
+        FPCore.DensityMapTransforms(count, 10, 10, 50, densityMap, rng, mapScale=True)
+
+# binary placement export, streamed in chunks of 4096 rows
+def StageExportPlacements(count, sources, timer):
+    transforms = FPCore.GetRandomTransforms(count, 10, 10, 50, seed=benchmarkSeed)
+    with tempfile.TemporaryDirectory() as exportDir :
+        with timer :
+            FPCore.ExportPlacements(os.path.join(exportDir, "Clump.bin"), 'BINARY', [("Clump", transforms)], chunkSize=4096)
+
+def StageMatchSlots(count, sources, timer):
+    slots = np.random.default_rng(benchmarkSeed).permutation(count)
+    with timer :
+        FPCore.MatchSlots(MovedRows(count), slots)
+
+# tool stages, on the Blender stub
+
+# starts a fresh stub session with the foliage source meshes selected
+def NewToolSession(count, sources, **overrides):
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    props = dict(foliage_count=count, seed=benchmarkSeed, use_cache=False)
+    props.update(overrides)
+    context.scene.foliage_placement_properties = BlenderStub.DefaultProperties(FPTool.FP_PT_Properties, **props)
+    context.selected_objects = [BlenderStub.AddMeshObject("Blade" + str(source)) for source in range(sources)]
+    context.active_object = context.selected_objects[0]
+
+    return context
+
+# moves 1 in every 10 placeholders, like a user editing the clump before Place
+def MovePlaceholders(context):
+    placeholders = BlenderStub.data.collections.get("FoliagePlaceholders").objects
+    for row in MovedRows(len(placeholders)) :
+        placeholder = placeholders[int(row)]
+        transform = np.array(placeholder.matrix_world)
+        transform[0, 3] += 1.0
+        placeholder.matrix_world = transform
+
+def StageSpawn(count, sources, timer):
+    context = NewToolSession(count, sources)
+    with timer :
+        FPTool.main(context, 1)
+
+def StageSpawnLinked(count, sources, timer):
+    context = NewToolSession(count, sources, link_mesh_data=True)
+    with timer :
+        FPTool.main(context, 1)
+
+# runs the modal Spawn operator to the end, feeding it timer events
+def StageSpawnChunked(count, sources, timer):
+    context = NewToolSession(count, sources)
+    operator = FPTool.FP_OT_SpawnFoliageOperator()
+    timerEvent = types.SimpleNamespace(type='TIMER')
+    with timer :
+        result = operator.invoke(context, timerEvent)
+        while result == {'RUNNING_MODAL'} :
+            result = operator.modal(context, timerEvent)
+
+def StageSpawnMerged(count, sources, timer):
+    context = NewToolSession(count, sources, output_mode='MERGED')
+    with timer :
+        FPTool.main(context, 1)
+
+def StageRespawnSelected(count, sources, timer):
+    context = NewToolSession(count, sources)
+    FPTool.main(context, 1)
+    placeholders = BlenderStub.data.collections.get("FoliagePlaceholders").objects
+    context.selected_objects = [placeholders[int(row)] for row in MovedRows(count)]
+    with timer :
+        FPTool.main(context, 1)
+
+# respawns 1 in every 10 copies of the first source, selected in the viewport instead of their placeholders
+def StageRespawnSelectedCopies(count, sources, timer):
+    context = NewToolSession(count, sources)
+    FPTool.main(context, 1)
+    copies = BlenderStub.data.collections.get("Blade0").objects
+    context.selected_objects = [copies[int(row)] for row in MovedRows(count)]
+    context.active_object = context.selected_objects[0]
+    with timer :
+        FPTool.main(context, 1)
+
+def StagePlaceIncremental(count, sources, timer):
+    context = NewToolSession(count, sources)
+    FPTool.main(context, 1)
+    MovePlaceholders(context)
+    with timer :
+        FPTool.main(context, 2)
+
+def StagePlaceFull(count, sources, timer):
+    context = NewToolSession(count, sources, incremental_place=False)
+    FPTool.main(context, 1)
+    MovePlaceholders(context)
+    with timer :
+        FPTool.main(context, 2)
+
+def StagePlaceCompact(count, sources, timer):
+    context = NewToolSession(count, sources, placeholder_backend='COMPACT')
+    FPTool.main(context, 1)
+    with timer :
+        FPTool.main(context, 2)
+
+# LOD0 to LOD2 of a spawned clump, as linked copies of one decimated mesh per source and LOD
+def StageBuildLods(count, sources, timer):
+    context = NewToolSession(count, sources, lod_count=3)
+    FPTool.main(context, 1)
+    with timer :
+        FPTool.SpawnFoliageLods(context, context.selected_objects, BlenderStub.data.collections.get("FoliagePlaceholders"))
+
+# 100 panel redraws with all copies of the first source selected, polling the Spawn, Place and Select operators
+def StagePollSelected(count, sources, timer):
+    context = NewToolSession(count, sources)
+    FPTool.main(context, 1)
+    context.selected_objects = list(BlenderStub.data.collections.get("Blade0").objects)
+    operators = [FPTool.FP_OT_SpawnFoliageOperator, FPTool.FP_OT_ReplaceFoliageOperator, FPTool.FP_OT_SelectFoliageCopiesOperator]
+    with timer :
+        for redraw in range(100) :
+            for operator in operators :
+                operator.poll(context)
+
+stages = [("core: random transforms", StageRandomTransforms),
+          ("core: poisson transforms", StagePoissonTransforms),
+          ("core: copy transforms", StageCopyTransforms),
+          ("core: plan copy updates", StagePlanCopyUpdates),
+          ("core: match slots", StageMatchSlots),
+          ("core: relax collisions", StageRelaxCollisions),
+          ("core: relax collisions dense", StageRelaxCollisionsDense),
+          ("core: density map transforms", StageDensityMapTransforms),
+          ("core: merge mesh copies", StageMergeMeshCopies),
+          ("core: export placements", StageExportPlacements),
+          ("tool: spawn", StageSpawn),
+          ("tool: spawn linked", StageSpawnLinked),
+          ("tool: spawn chunked", StageSpawnChunked),
+          ("tool: spawn merged", StageSpawnMerged),
+          ("tool: respawn selected", StageRespawnSelected),
+          ("tool: respawn selected copies", StageRespawnSelectedCopies),
+          ("tool: place incremental", StagePlaceIncremental),
+          ("tool: place full", StagePlaceFull),
+          ("tool: place compact", StagePlaceCompact),
+          ("tool: build LODs", StageBuildLods),
+          ("tool: poll selected", StagePollSelected)]
+
+# runs a stage once for its time and, optionally, once more under tracemalloc for its peak memory
+def RunStage(stage, count, sources, repeat, traceMemory):
+    seconds = []
+    for run in range(repeat) :
+        timer = StageTimer(False)
+        stage(count, sources, timer)
+        seconds.append(timer.seconds)
+
+    peakBytes = None
+    if traceMemory :
+        timer = StageTimer(True)
+        stage(count, sources, timer)
+        peakBytes = timer.peakBytes
+
+    return {"seconds" : min(seconds), "peak_bytes" : peakBytes}
+
+def ParseArguments(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks the Foliage Placement Tool outside of Blender.")
+    parser.add_argument("--counts", default=",".join(str(c) for c in defaultCounts), help="comma separated placement counts")
+    parser.add_argument("--sources", type=int, default=2, help="number of foliage source meshes copied per placement")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the fastest one is reported")
+    parser.add_argument("--stages", default="", help="only run the stages whose name contains this text")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of every stage")
+    parser.add_argument("--json", default="", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", default="", help="compare the results with this results file, and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed slowdown against the baseline, as a fraction of its time")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="slowdowns of up to this many milliseconds never count as regressions")
+
+    return parser.parse_args(argv)
+
+# compares results with the results of a baseline run. Baseline times are scaled by the ratio of the two runs'
+# calibration times first. Returns (stage, count, seconds, scaled baseline seconds) for every stage and count that
+# is slower than the scaled baseline by more than the tolerance and the slack
+def FindRegressions(results, baselineResults, tolerance, slackSeconds):
+    baselineByKey = {(result["stage"], result["count"], result["sources"]) : result for result in baselineResults}
+    regressions = []
+    for result in results :
+        baseline = baselineByKey.get((result["stage"], result["count"], result["sources"]))
+        if baseline is None :
+            continue
+        previous = baseline["seconds"] * result["calibration_seconds"] / baseline["calibration_seconds"]
+        if result["seconds"] > previous * (1.0 + tolerance) and result["seconds"] - previous > slackSeconds :
+            regressions.append((result["stage"], result["count"], result["seconds"], previous))
+
+    return regressions
+
+def main(argv=None):
+    args = ParseArguments(argv)
+    counts = [int(c) for c in args.counts.split(",") if c]
+
+    baselineResults = None
+    if args.baseline :
+        with open(args.baseline) as f :
+            baselineResults = json.load(f)
+        if any("calibration_seconds" not in result for result in baselineResults) :
+            print("baseline " + args.baseline + " has no calibration times, write it again with --json")
+            return 2
+
+    calibrationSeconds = CalibrationSeconds()
+    print("calibration: %.2f ms" % (calibrationSeconds * 1000))
+    results = []
+    print("%-30s %8s %11s %14s %12s" % ("stage", "count", "time (ms)", "placements/s", "peak (MB)"))
+    for name, stage in stages :
+        if args.stages not in name :
+            continue
+        for count in counts :
+            result = RunStage(stage, count, args.sources, args.repeat, not args.no_memory)
+            result.update(stage=name, count=count, sources=args.sources, calibration_seconds=calibrationSeconds)
+            result["placements_per_second"] = count / result["seconds"] if result["seconds"] > 0 else float("inf")
+            results.append(result)
+            peak = "-" if result["peak_bytes"] is None else "%.2f" % (result["peak_bytes"] / (1024 * 1024))
+            print("%-30s %8d %11.2f %14.0f %12s" % (name, count, result["seconds"] * 1000, result["placements_per_second"], peak))
+            sys.stdout.flush()
+
+    if args.json :
+        with open(args.json, "w") as f :
+            json.dump(results, f, indent=2)
+
+    if baselineResults is not None :
+        regressions = FindRegressions(results, baselineResults, args.tolerance, args.slack_ms / 1000)
+        # time the slower stages once more before reporting them, a busy machine can slow down a single run
+        stageFunctions = dict(stages)
+        for result in results :
+            if any(result["stage"] == name and result["count"] == count for name, count, seconds, previous in regressions) :
+                rerun = RunStage(stageFunctions[result["stage"]], result["count"], args.sources, args.repeat, False)
+                result["seconds"] = min(result["seconds"], rerun["seconds"])
+        regressions = FindRegressions(results, baselineResults, args.tolerance, args.slack_ms / 1000)
+        for name, count, seconds, previous in regressions :
+            print("REGRESSION %s (%d): %.2f ms, baseline %.2f ms on this machine" % (name, count, seconds * 1000, previous * 1000))
+        if regressions :
+            return 1
+        print("no regressions against " + args.baseline)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
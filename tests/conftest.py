@@ -0,0 +1,14 @@
+# Test setup: the tests import the add-on package from the repository root. Its __init__ imports bpy, so the
+# in-memory Blender stub of the benchmarks is installed before any test module imports the add-on.
+
+import os
+import sys
+
+testsDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(testsDir)
+for path in (repoDir, os.path.join(repoDir, "benchmarks")) :
+    if path not in sys.path :
+        sys.path.insert(0, path)
+
+import BlenderStub
+BlenderStub.Install()
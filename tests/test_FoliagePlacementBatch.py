@@ -0,0 +1,37 @@
+# Tests of the batch script's manifest reading, on the in-memory Blender stub of the benchmarks.
+
+import pytest
+
+import BlenderStub
+import FoliagePlacementBatch as FPBatch
+import FoliagePlacementTool_280 as FPTool
+
+def testCsvManifestSetsTypedToolProperties(tmp_path):
+    manifestPath = tmp_path / "manifest.csv"
+    manifestPath.write_text("name,foliage_count,seed,min_spacing,lod_keep_ratio,use_cache,placement_mode,source_objects\n"
+                            "Meadow,120,7,2.5,0.25,false,POISSON,BladeA; BladeB\n"
+                            "Lawn,,3,,,true,,\n")
+    specs = FPBatch.ReadManifest(str(manifestPath))
+    assert specs[0]["source_objects"] == ["BladeA", "BladeB"]
+    assert "foliage_count" not in specs[1]
+
+    props = BlenderStub.DefaultProperties(FPTool.FP_PT_Properties)
+    FPBatch.SetToolProperties(props, specs[0])
+    assert (props.foliage_count, props.seed) == (120, 7)
+    assert isinstance(props.foliage_count, int)
+    assert (props.min_spacing, props.lod_keep_ratio) == (2.5, 0.25)
+    assert props.use_cache is False
+    assert props.placement_mode == 'POISSON'
+
+    FPBatch.SetToolProperties(props, specs[1])
+    assert (props.foliage_count, props.seed, props.use_cache) == (120, 3, True)
+
+def testPropertyValue():
+    assert FPBatch.PropertyValue('INT', 5) == 5
+    assert FPBatch.PropertyValue('BOOLEAN', " Yes") is True
+    assert FPBatch.PropertyValue('BOOLEAN', "0") is False
+    assert FPBatch.PropertyValue('STRING', "12") == "12"
+    with pytest.raises(ValueError):
+        FPBatch.PropertyValue('BOOLEAN', "maybe")
+    with pytest.raises(ValueError):
+        FPBatch.PropertyValue('INT', "many")
@@ -0,0 +1,273 @@
+# Tests of the bpy-free FoliagePlacementCore functions.
+
+import os
+import csv
+import json
+import time
+import struct
+import pytest
+import numpy as np
+
+from FoliagePlacementTool_280 import FoliagePlacementCore as FPCore
+
+# clump cache
+
+def testClumpCacheRoundTrip(tmp_path):
+    clumpCache = FPCore.ClumpCache(str(tmp_path), 1024 * 1024)
+    transforms = FPCore.GetRandomTransforms(16, 10, 10, 50, seed=1)
+    clumpCache.Store("key", {"transforms" : transforms, "spaced_count" : np.array(16)})
+
+    entry = clumpCache.Load("key")
+    assert np.array_equal(entry["transforms"], transforms)
+    assert int(entry["spaced_count"]) == 16
+    assert clumpCache.Load("missing") is None
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+def testClumpCacheCorruptEntryIsAMiss(tmp_path):
+    clumpCache = FPCore.ClumpCache(str(tmp_path), 1024 * 1024)
+    clumpCache.Store("truncated", {"transforms" : FPCore.GetRandomTransforms(64, 10, 10, 50, seed=1)})
+    entryPath = clumpCache.EntryPath("truncated")
+    with open(entryPath, "rb") as entryFile :
+        entryBytes = entryFile.read()
+    with open(entryPath, "wb") as entryFile :
+        entryFile.write(entryBytes[:len(entryBytes) // 2])
+    with open(clumpCache.EntryPath("garbage"), "wb") as entryFile :
+        entryFile.write(b"not an npz file")
+    open(clumpCache.EntryPath("empty"), "wb").close()
+
+    for key in ("truncated", "garbage", "empty") :
+        assert clumpCache.Load(key) is None
+        assert not os.path.exists(clumpCache.EntryPath(key))
+
+def testClumpCacheEvictsOrphanedTemporaryFiles(tmp_path):
+    clumpCache = FPCore.ClumpCache(str(tmp_path), 1024 * 1024)
+    orphanPath = os.path.join(str(tmp_path), "key.interrupted.tmp")
+    freshPath = os.path.join(str(tmp_path), "key.writing.tmp")
+    for path in (orphanPath, freshPath) :
+        open(path, "wb").close()
+    orphanTime = time.time() - 2 * FPCore.ClumpCache.ORPHAN_SECONDS
+    os.utime(orphanPath, (orphanTime, orphanTime))
+
+    clumpCache.Evict()
+    assert not os.path.exists(orphanPath)
+    assert os.path.exists(freshPath)
+
+# slot matching and copy planning
+
+def testMatchSlots():
+    rows = FPCore.MatchSlots([7, 3, 9, 3], [3, 5, 7])
+    assert rows.tolist() == [2, 0, -1, 0]
+    assert FPCore.MatchSlots([1, 2], []).tolist() == [-1, -1]
+
+def testPlanCopyUpdates():
+    transforms = FPCore.GetRandomTransforms(4, 10, 10, 50, seed=1)
+    snapshotTransforms = transforms.copy()
+    transforms[1, 0, 3] += 1.0
+    # slot 3 is new, slot 9 lost its placeholder
+    updateRows, createRows, removeSlots = FPCore.PlanCopyUpdates([0, 1, 2, 3], transforms, [0, 1, 2, 9], [0, 1, 2, 9], snapshotTransforms)
+    assert updateRows.tolist() == [1]
+    assert createRows.tolist() == [3]
+    assert removeSlots.tolist() == [9]
+
+# copy transforms
+
+def testCopyTransformsRoundTrip():
+    transforms = FPCore.GetRandomTransforms(32, 30, 100, 50, seed=2)
+    copyTransforms = FPCore.CopyTransforms(transforms)
+    # copies point the X axis of the foliage mesh up the placeholder's Z axis
+    assert np.allclose(copyTransforms[:, :3, 0], transforms[:, :3, 2], atol=1e-5)
+    assert np.allclose(FPCore.PlaceholderTransforms(copyTransforms), transforms, atol=1e-4)
+
+def testRandomTransformsAreSeeded():
+    first = FPCore.GetRandomTransforms(16, 30, 100, 50, seed=3)
+    assert np.array_equal(first, FPCore.GetRandomTransforms(16, 30, 100, 50, seed=3))
+    assert not np.array_equal(first, FPCore.GetRandomTransforms(16, 30, 100, 50, seed=4))
+    # the slots of a subset draw the same transforms as in the whole batch
+    assert np.array_equal(first[[2, 5]], FPCore.GetRandomTransforms(2, 30, 100, 50, indices=[2, 5], seed=3))
+
+# Pivot Painter colors
+
+def testSrgbRoundTrip():
+    values = np.linspace(0.0, 1.0, 256)
+    assert np.allclose(FPCore.LinearToSrgb(FPCore.SrgbToLinear(values)), values, atol=1e-9)
+    # 8 bit values survive Blender's linear to sRGB conversion of the "color" accessor
+    assert np.array_equal(np.round(FPCore.LinearToSrgb(FPCore.SrgbToLinear(values)) * 255.0), np.round(values * 255.0))
+
+# surface sampling
+
+def testZeroWeightAreaTableSamplesUniformly():
+    # a strip of 8 unit squares along X
+    vertices = np.array([(x, y, 0.0) for x in range(9) for y in (0.0, 1.0)])
+    triangles = np.array([(2 * i, 2 * i + 2, 2 * i + 1) for i in range(8)] + [(2 * i + 1, 2 * i + 2, 2 * i + 3) for i in range(8)])
+    uniformTable = FPCore.BuildAreaTable(vertices, triangles)[0]
+    zeroTable = FPCore.BuildAreaTable(vertices, triangles, np.zeros(len(triangles)))[0]
+    assert np.allclose(zeroTable, uniformTable)
+
+    positions = FPCore.SampleSurfacePoints(vertices, triangles, zeroTable, 4000, np.random.default_rng(7))[0]
+    counts = np.bincount(positions[:, 0].astype(np.int64), minlength=8)
+    assert counts.min() > 350
+
+# collision relaxation
+
+# colliding pairs of blades, checked pair by pair
+def CountBladeCollisions(transforms, bladeLength, bladeWidth):
+    transforms = np.asarray(transforms, dtype=np.float64)
+    bases = transforms[:, :3, 3]
+    directions = transforms[:, :3, 2] * bladeLength
+    pairsI, pairsJ = np.triu_indices(len(transforms), 1)
+    s, t = FPCore.SegmentClosestParameters(bases[pairsI], directions[pairsI], bases[pairsJ], directions[pairsJ])
+    separations = (bases[pairsI] + directions[pairsI] * s[:, None]) - (bases[pairsJ] + directions[pairsJ] * t[:, None])
+
+    return int(np.count_nonzero(np.einsum('ij,ij->i', separations, separations) < bladeWidth * bladeWidth))
+
+def testBoxOverlapPairs():
+    rng = np.random.default_rng(11)
+    boxMins = rng.uniform(0.0, 100.0, (300, 2))
+    boxMaxs = boxMins + rng.exponential(6.0, (300, 2))
+    queryMask = rng.random(300) < 0.3
+    pairsI, pairsJ = np.triu_indices(300, 1)
+    overlapping = np.all(np.maximum(boxMins[pairsI], boxMins[pairsJ]) <= np.minimum(boxMaxs[pairsI], boxMaxs[pairsJ]), axis=1)
+    expected = set(zip(pairsI[overlapping].tolist(), pairsJ[overlapping].tolist()))
+
+    foundI, foundJ = FPCore.BoxOverlapPairs(boxMins, boxMaxs)
+    found = [tuple(sorted(pair)) for pair in zip(foundI.tolist(), foundJ.tolist())]
+    assert len(found) == len(set(found)) and set(found) == expected
+    foundI, foundJ = FPCore.BoxOverlapPairs(boxMins, boxMaxs, queryMask)
+    found = [tuple(sorted(pair)) for pair in zip(foundI.tolist(), foundJ.tolist())]
+    assert queryMask[foundI].all()
+    assert len(found) == len(set(found)) and set(found) == {pair for pair in expected if queryMask[list(pair)].any()}
+
+# a dense clump, about as crowded as 10k blades within 300 units
+def testRelaxBladeCollisionsDecrease():
+    transforms = FPCore.GetRandomTransforms(1500, 45, 115, 50, seed=3)
+    collisions = CountBladeCollisions(transforms, 50, 4)
+    relaxed, remaining = FPCore.RelaxBladeCollisions(transforms, 50, 4, 16)
+    assert collisions > 500
+    assert remaining < collisions / 10
+    assert abs(CountBladeCollisions(relaxed, 50, 4) - remaining) <= 2
+    # blades keep their length and stay on the ground
+    assert np.allclose(np.linalg.norm(relaxed[:, :3, :3], axis=1), np.linalg.norm(transforms[:, :3, :3], axis=1), atol=1e-4)
+    assert np.allclose(relaxed[:, 2, 3], 0.0)
+
+# Poisson-disk placement
+
+def MinPairDistance(points):
+    pairsI, pairsJ = np.triu_indices(len(points), 1)
+
+    return np.linalg.norm(points[pairsI] - points[pairsJ], axis=1).min()
+
+def testPoissonDiskPointsKeepSpacing():
+    points = FPCore.PoissonDiskPoints(400, 100.0, 6.0, np.random.default_rng(8))
+    assert points.shape == (400, 2)
+    assert MinPairDistance(points) >= 6.0
+    assert np.linalg.norm(points, axis=1).max() <= 100.0
+
+    # new points keep the spacing to the existing ones as well
+    extra = FPCore.PoissonDiskPoints(50, 100.0, 6.0, np.random.default_rng(9), existingPoints=points)
+    assert len(extra) == 50
+    assert MinPairDistance(np.concatenate((points, extra))) >= 6.0
+
+def testPoissonTransformsWhenSpacingIsInfeasible():
+    # a disc of radius 20 holds far fewer than 200 points 5 apart
+    points = FPCore.PoissonDiskPoints(200, 20.0, 5.0, np.random.default_rng(10))
+    assert 0 < len(points) < 200
+    assert MinPairDistance(points) >= 5.0
+
+    transforms, spacedCount = FPCore.GetPoissonTransforms(200, 30, 20, 50, 5.0, np.random.default_rng(10))
+    assert len(transforms) == 200
+    assert 0 < spacedCount < 200
+    assert MinPairDistance(transforms[:spacedCount, :2, 3]) >= 5.0
+
+# compact placement store
+
+def testPackPlacementsRoundTrip():
+    transforms = FPCore.GetRandomTransforms(64, 30, 100, 50, seed=12)
+    packed = FPCore.PackPlacements(transforms)
+    assert packed.dtype == np.float32 and packed.shape == (64 * FPCore.PLACEMENT_STRIDE,)
+    assert np.allclose(FPCore.UnpackPlacements(packed), transforms, atol=1e-4)
+    assert FPCore.UnpackPlacements(FPCore.PackPlacements(np.zeros((0, 4, 4)))).shape == (0, 4, 4)
+
+    # a zero scale unpacks as a zero scale, not as NaNs
+    transforms[0, :3, :3] = 0.0
+    unpacked = FPCore.UnpackPlacements(FPCore.PackPlacements(transforms))
+    assert np.all(np.isfinite(unpacked))
+    assert np.allclose(unpacked[0, :3, :3], 0.0)
+
+# LOD thinning
+
+def testLodRowsNest():
+    slots = np.arange(1000, 1300)
+    lodRows = FPCore.LodRows(7, slots, 4, 0.5)
+    assert [len(rows) for rows in lodRows] == [300, 150, 75, 38]
+    assert np.array_equal(lodRows[0], np.arange(300))
+    for rows, lowerRows in zip(lodRows, lodRows[1:]) :
+        assert set(slots[lowerRows]) <= set(slots[rows])
+
+    # the kept placements follow their slots, not their order, and change with the seed
+    shuffled = np.random.default_rng(13).permutation(slots)
+    for rows, shuffledRows in zip(lodRows, FPCore.LodRows(7, shuffled, 4, 0.5)) :
+        assert set(slots[rows]) == set(shuffled[shuffledRows])
+    assert set(slots[FPCore.LodRows(8, slots, 4, 0.5)[2]]) != set(slots[lodRows[2]])
+    # every LOD keeps at least one placement
+    assert [len(rows) for rows in FPCore.LodRows(7, slots[:3], 3, 0.1)] == [3, 1, 1]
+
+# placement export
+
+def ExportClumps():
+    return [("Grass", FPCore.GetRandomTransforms(7, 30, 100, 50, seed=14)), ("Fern", FPCore.GetRandomTransforms(3, 30, 100, 50, seed=15))]
+
+def testExportPlacementsCsv(tmp_path):
+    path = str(tmp_path / "clumps.csv")
+    assert FPCore.ExportPlacements(path, 'CSV', ExportClumps(), chunkSize=3) == 10
+    with open(path, newline="", encoding="utf-8") as file :
+        rows = list(csv.reader(file))
+    assert rows[0] == ["---", "Clump", "Location", "Rotation", "Scale"]
+    # row names carry on across chunks, and start over for every clump
+    assert [row[0] for row in rows[1:]] == ["Grass_" + str(i) for i in range(7)] + ["Fern_" + str(i) for i in range(3)]
+    locations, quaternions, rotators, scales = FPCore.UnrealInstanceTransforms(FPCore.CopyTransforms(ExportClumps()[0][1]))
+    assert rows[4][1:] == ["Grass", "(X=%.4f,Y=%.4f,Z=%.4f)" % tuple(locations[3]), "(Pitch=%.4f,Yaw=%.4f,Roll=%.4f)" % tuple(rotators[3]), "(X=%.4f,Y=%.4f,Z=%.4f)" % tuple(scales[3])]
+
+def testExportPlacementsJson(tmp_path):
+    path = str(tmp_path / "clumps.json")
+    FPCore.ExportPlacements(path, 'JSON', ExportClumps(), chunkSize=3)
+    with open(path, encoding="utf-8") as file :
+        rows = json.load(file)
+    assert [row["Name"] for row in rows] == ["Grass_" + str(i) for i in range(7)] + ["Fern_" + str(i) for i in range(3)]
+    locations, quaternions, rotators, scales = FPCore.UnrealInstanceTransforms(FPCore.CopyTransforms(ExportClumps()[1][1]))
+    assert rows[8]["Clump"] == "Fern"
+    assert np.allclose([rows[8]["Location"][axis] for axis in "XYZ"], locations[1])
+    assert np.allclose([rows[8]["Rotation"][angle] for angle in ("Pitch", "Yaw", "Roll")], rotators[1])
+
+    emptyPath = str(tmp_path / "empty.json")
+    assert FPCore.ExportPlacements(emptyPath, 'JSON', []) == 0
+    with open(emptyPath, encoding="utf-8") as file :
+        assert json.load(file) == []
+
+def testExportPlacementsBinary(tmp_path):
+    path = str(tmp_path / "clumps.bin")
+    FPCore.ExportPlacements(path, 'BINARY', ExportClumps(), chunkSize=3)
+    with open(path, "rb") as file :
+        content = file.read()
+    # header with the final instance count, then 10 float32 per instance
+    assert content[:4] == b"FPIN"
+    assert struct.unpack("<III", content[4:16]) == (1, 10, 40)
+    instances = np.frombuffer(content[16:], dtype=FPCore.PlacementExportWriter.BINARY_INSTANCE)
+    assert len(instances) == 10
+    locations, quaternions, rotators, scales = FPCore.UnrealInstanceTransforms(FPCore.CopyTransforms(np.concatenate([transforms for name, transforms in ExportClumps()])))
+    assert np.allclose(instances["translation"], locations, atol=1e-4)
+    assert np.allclose(instances["rotation"], quaternions, atol=1e-6)
+    assert np.allclose(instances["scale"], scales, atol=1e-6)
+
+# the chunk size only changes how the rows are written, not the file
+def testExportPlacementsChunkBoundaries(tmp_path):
+    for fileFormat, extension in FPCore.PLACEMENT_EXPORT_EXTENSIONS.items() :
+        contents = []
+        for chunkSize in (1, 3, 65536) :
+            path = str(tmp_path / ("clumps_" + str(chunkSize) + extension))
+            FPCore.ExportPlacements(path, fileFormat, ExportClumps(), chunkSize=chunkSize)
+            with open(path, "rb") as file :
+                contents.append(file.read())
+        assert contents[0] == contents[1] == contents[2]
+
+    with pytest.raises(ValueError) :
+        FPCore.PlacementExportWriter(str(tmp_path / "clumps.txt"), 'TEXT')
@@ -0,0 +1,269 @@
+# Tests of the add-on on the in-memory Blender stub of the benchmarks.
+
+import math
+import numpy as np
+
+import BlenderStub
+import FoliagePlacementTool_280 as FPTool
+from FoliagePlacementTool_280 import FoliagePlacementCore as FPCore
+
+# the rotation copies add to their placeholder in the original tool: -90 degrees around Y
+def RotationY(degrees):
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+
+    return np.array([[c, 0.0, s, 0.0], [0.0, 1.0, 0.0, 0.0], [-s, 0.0, c, 0.0], [0.0, 0.0, 0.0, 1.0]])
+
+# a session with placeholders at random transforms and one foliage source with its copy collection
+def NewPlaceholderSession(count):
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    source = BlenderStub.AddMeshObject("Blade")
+    foliageColl = BlenderStub.data.collections.new("Blade")
+    context.scene.collection.children.link(foliageColl)
+    placeholderColl = BlenderStub.data.collections.new("FoliagePlaceholders")
+    context.scene.collection.children.link(placeholderColl)
+    placeholders = FPTool.SpawnPlaceholdersFromTransforms(FPCore.GetRandomTransforms(count, 30, 100, 50, seed=5), placeholderColl)
+
+    return source, foliageColl, placeholderColl, placeholders
+
+def testSpawnFoliageCopiesMatrixWorld():
+    source, foliageColl, placeholderColl, placeholders = NewPlaceholderSession(24)
+    FPTool.SpawnFoliageCopies([source], placeholders, "_FPTool")
+
+    copies = {o["fp_slot"] : o for o in foliageColl.objects}
+    assert len(copies) == len(placeholders)
+    for placeholder in placeholders :
+        expected = np.array(placeholder.matrix_world) @ RotationY(-90)
+        assert np.allclose(np.array(copies[placeholder["fp_slot"]].matrix_world), expected, atol=1e-4)
+
+def testSpawnPlaceholdersToObjectsMatrixWorld():
+    source, foliageColl, placeholderColl, placeholders = NewPlaceholderSession(24)
+    FPTool.SpawnFoliageCopies([source], placeholders, "_FPTool")
+    originals = {p["fp_slot"] : np.array(p.matrix_world) for p in placeholders}
+
+    restored = FPTool.RestorePlaceholdersFromCopies(placeholderColl, foliageColl)
+    assert len(restored) == len(originals)
+    for placeholder in restored :
+        assert np.allclose(np.array(placeholder.matrix_world), originals[placeholder["fp_slot"]], atol=1e-4)
+
+# the X vector colors are stored as bytes of the raw 0-1 values, through both accessors of byte color attributes
+def testCornerColorsRoundTrip(monkeypatch):
+    BlenderStub.ResetSession()
+    colors = np.random.default_rng(6).random((12, 4))
+    expected = np.round(colors * 255.0)
+    for hasSrgbAccess in (True, False) :
+        if not hasSrgbAccess :
+            monkeypatch.delattr(BlenderStub.bpy.types, "ByteColorAttributeValue")
+        mesh = BlenderStub.data.meshes.new("Merged", 6)
+        FPTool.AddCornerColors(mesh, "XVector", colors)
+        stored = np.empty(len(mesh.loops) * 4)
+        mesh.color_attributes[0].data.foreach_get("color_srgb", stored)
+        assert np.array_equal(np.round(stored.reshape(-1, 4) * 255.0), expected)
+
+# vertex group weights, read from the groups of every vertex, or from a float point attribute of the same name
+def testVertexGroupWeights():
+    from types import SimpleNamespace
+    FPTool.FoliageLoadPost(None)
+    groups = [[(0, 0.5)], [(1, 0.25), (0, 1.0)], [], [(1, 0.75)]]
+    vertices = [SimpleNamespace(index=i, groups=[SimpleNamespace(group=g, weight=w) for g, w in vertexGroups]) for i, vertexGroups in enumerate(groups)]
+    meshObj = SimpleNamespace(data=SimpleNamespace(name="GroupSurface", vertices=vertices), vertex_groups={"Density" : SimpleNamespace(index=1)})
+    assert FPTool.GetVertexGroupWeights(meshObj, "Density").tolist() == [0.0, 0.25, 0.0, 0.75]
+
+    values = np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)
+    weightAttribute = SimpleNamespace(domain='POINT', data_type='FLOAT', data=SimpleNamespace(foreach_get=lambda name, buffer : buffer.__setitem__(slice(None), values)))
+    meshObj = SimpleNamespace(data=SimpleNamespace(name="AttributeSurface", vertices=vertices, attributes={"Density" : weightAttribute}), vertex_groups={})
+    assert np.array_equal(FPTool.GetVertexGroupWeights(meshObj, "Density"), values)
+
+# LOD meshes are all baked from the evaluated sources, with one depsgraph update per decimated LOD
+def testLodMeshesEvaluateOncePerLod():
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    sources = [BlenderStub.AddMeshObject("Blade" + str(i), 12) for i in range(3)]
+    assert FPTool.GetLodMeshes(context, sources, 0, 0.5) == [o.data for o in sources]
+    assert context.depsgraph.updates == 0
+
+    lodMeshes = FPTool.GetLodMeshes(context, sources, 2, 0.5)
+    assert context.depsgraph.updates == 1
+    assert [len(m.polygons) for m in lodMeshes] == [2, 2, 2]
+    assert all(len(o.modifiers) == 0 for o in sources)
+
+    # with a modifier on a source, LOD0 is baked as well instead of using the raw mesh
+    sources[0].modifiers.new("Bend", 'SIMPLE_DEFORM')
+    lodMeshes = FPTool.GetLodMeshes(context, sources, 0, 0.5)
+    assert context.depsgraph.updates == 2
+    assert all(m is not o.data for m, o in zip(lodMeshes, sources))
+
+# runs the modal Spawn operator to the end, feeding it timer events
+def RunModalSpawn(context):
+    operator = FPTool.FP_OT_SpawnFoliageOperator()
+    timerEvent = type("Event", (), {"type" : 'TIMER'})()
+    result = operator.invoke(context, timerEvent)
+    while result == {'RUNNING_MODAL'} :
+        result = operator.modal(context, timerEvent)
+
+    return result
+
+# a respawn swaps the staged clump into the place of the old one: every collection is linked once, where it was
+def testModalSpawnTwiceKeepsHierarchy():
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    context.scene.foliage_placement_properties = BlenderStub.DefaultProperties(FPTool.FP_PT_Properties, foliage_count=40, seed=1, use_cache=False)
+    context.selected_objects = [BlenderStub.AddMeshObject("Blade0")]
+    context.active_object = context.selected_objects[0]
+    sceneChildren = context.scene.collection.children
+
+    assert RunModalSpawn(context) == {'FINISHED'}
+    assert RunModalSpawn(context) == {'FINISHED'}
+    assert sorted(c.name for c in sceneChildren) == ["Blade0", "FoliagePlaceholders"]
+    assert len(BlenderStub.data.collections.get("Blade0").objects) == 40
+
+    # a copy collection the user moved into their own collection stays there
+    userColl = BlenderStub.data.collections.new("Foliage")
+    sceneChildren.link(userColl)
+    bladeColl = BlenderStub.data.collections.get("Blade0")
+    userColl.children.link(bladeColl)
+    sceneChildren.unlink(bladeColl)
+
+    assert RunModalSpawn(context) == {'FINISHED'}
+    assert sorted(c.name for c in sceneChildren) == ["Foliage", "FoliagePlaceholders"]
+    assert [c.name for c in userColl.children] == ["Blade0"]
+    assert len(userColl.children[0].objects) == 40
+
+# Points backend: placements go through the vertices and point attributes of one mesh and come back unchanged
+def testPlacementPointsRoundTrip():
+    BlenderStub.ResetSession()
+    placeholderColl = BlenderStub.data.collections.new("FoliagePlaceholders")
+    transforms = FPCore.GetRandomTransforms(40, 30, 100, 50, seed=6)
+    pointsObj = FPTool.WritePlacementPoints(transforms, placeholderColl)
+    pointsMesh = pointsObj.data
+    assert FPTool.GetPlacementPoints(placeholderColl) is pointsObj
+    assert sorted(pointsMesh.attributes.keys()) == ["instance_rotation", "rotation", "scale"]
+    assert np.allclose(FPTool.ReadPlacementPoints(pointsObj), transforms, atol=1e-4)
+
+    # the instance rotation of a point is the rotation of the copy spawned at its placeholder
+    positions, eulers, scales = FPCore.DecomposeTransforms(transforms)
+    instanceEulers = FPTool.GetPointAttribute(pointsMesh, "instance_rotation", 3, 0.0)
+    assert np.allclose(FPCore.ComposeEulerTransforms(positions, instanceEulers, scales), FPCore.CopyTransforms(transforms), atol=1e-4)
+
+    # placements follow the points object, unless read in its local space
+    offset = np.identity(4)
+    offset[:3, 3] = (5.0, -3.0, 2.0)
+    pointsObj.matrix_world = offset
+    assert np.allclose(FPTool.ReadPlacementPoints(pointsObj), offset @ transforms, atol=1e-4)
+    assert np.allclose(FPTool.ReadPlacementPoints(pointsObj, useWorldSpace=False), transforms, atol=1e-4)
+
+    # rewriting reuses the object, and points added in edit mode (zero scale, no rotation) stay visible
+    assert FPTool.WritePlacementPoints(transforms[:10], placeholderColl, pointsObj) is pointsObj
+    pointsMesh.attributes["scale"].data.foreach_set("value", np.zeros(10))
+    del pointsMesh.attributes["rotation"]
+    upright = FPTool.ReadPlacementPoints(pointsObj, useWorldSpace=False)
+    assert len(upright) == 10
+    assert np.allclose(upright[:, :3, :3], np.identity(3))
+    assert np.allclose(upright[:, :3, 3], positions[:10], atol=1e-4)
+
+# Spawn warns when Poisson-disk placement can't fit every placement at the minimum spacing
+def testSpawnReportsInfeasibleSpacing():
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    context.selected_objects = [BlenderStub.AddMeshObject("Blade0")]
+    context.active_object = context.selected_objects[0]
+    for minSpacing, expectWarning in ((1.0, False), (40.0, True)) :
+        context.scene.foliage_placement_properties = BlenderStub.DefaultProperties(FPTool.FP_PT_Properties, foliage_count=60, max_distance=100, seed=1, use_cache=False, placement_mode='POISSON', min_spacing=minSpacing)
+        reports = []
+        FPTool.main(context, 1, report=lambda level, message : reports.append((level, message)))
+        assert len(BlenderStub.data.collections.get("FoliagePlaceholders").objects) == 60
+        assert any(level == {'WARNING'} and "minimum spacing" in message for level, message in reports) == expectWarning
+
+# removing copies removes the tool meshes they leave without users, never the user's meshes or meshes still in use
+def testRemoveObjectsRemovesOnlyOrphanedToolMeshes(monkeypatch):
+    for hasBatchRemove in (True, False) :
+        BlenderStub.ResetSession()
+        if not hasBatchRemove :
+            monkeypatch.delattr(BlenderStub.BlendData, "batch_remove")
+        userMesh = BlenderStub.data.meshes.new("Blade", 5)
+        sharedMesh, ownMesh = FPTool.TagToolMeshes([BlenderStub.data.meshes.new("Shared", 5), BlenderStub.data.meshes.new("Own", 5)])
+        linkedCopy = BlenderStub.data.objects.new("Blade_FPTool", userMesh)
+        sharedCopies = [BlenderStub.data.objects.new("Shared_FPTool" + str(i), sharedMesh) for i in range(2)]
+        ownCopy = BlenderStub.data.objects.new("Own_FPTool", ownMesh)
+        placeholder = BlenderStub.data.objects.new("FoliagePlaceholder", None)
+
+        FPTool.RemoveObjects([linkedCopy, sharedCopies[0], ownCopy, placeholder])
+        assert sorted(o.name for o in BlenderStub.data.objects._blocks.values()) == ["Shared_FPTool1"]
+        assert sorted(BlenderStub.data.meshes._blocks) == ["Blade", "Shared"]
+
+        FPTool.RemoveObjects([sharedCopies[1]])
+        assert sorted(BlenderStub.data.meshes._blocks) == ["Blade"]
+
+# the Compact backend keeps the placements in properties of the placeholder collection, which survive a reload
+# (array properties come back as lists) and expand into placeholders when switching back to Empties
+def testCompactStoreAfterReload():
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    context.scene.foliage_placement_properties = BlenderStub.DefaultProperties(FPTool.FP_PT_Properties, foliage_count=32, seed=1, use_cache=False, placeholder_backend='COMPACT')
+    context.selected_objects = [BlenderStub.AddMeshObject("Blade0")]
+    context.active_object = context.selected_objects[0]
+    FPTool.main(context, 1)
+    placeholderColl = BlenderStub.data.collections.get("FoliagePlaceholders")
+    assert len(placeholderColl.objects) == 0 and FPTool.HasPlacementStore(placeholderColl)
+    slots, transforms, variants = FPTool.ReadPlacements(placeholderColl)
+    assert len(transforms) == 32
+
+    for key in ("fp_placements", "fp_slots", "fp_variants") :
+        placeholderColl[key] = placeholderColl[key].tolist()
+    FPTool.FoliageLoadPost(None)
+    reloadedSlots, reloadedTransforms, reloadedVariants = FPTool.ReadPlacementStore(placeholderColl)
+    assert np.array_equal(reloadedSlots, slots) and np.array_equal(reloadedVariants, variants)
+    assert np.allclose(reloadedTransforms, transforms, atol=1e-6)
+
+    context.scene.foliage_placement_properties.placeholder_backend = 'EMPTIES'
+    FPTool.main(context, 2)
+    assert not FPTool.HasPlacementStore(placeholderColl)
+    placeholders = {o["fp_slot"] : np.array(o.matrix_world) for o in placeholderColl.objects}
+    assert sorted(placeholders) == sorted(slots.tolist())
+    for slot, transform in zip(slots, transforms) :
+        assert np.allclose(placeholders[slot], transform, atol=1e-4)
+
+# depsgraph passed to the handler, with the ID types that were updated
+def HandlerDepsgraph(*updatedTypes):
+    return type("Depsgraph", (), {"updates" : [], "id_type_updated" : lambda self, idType : idType in updatedTypes})()
+
+# the selection summary the poll functions share is only rebuilt when the handler saw a scene update
+# (selection changes), or when objects were added or removed
+def testSelectionSummaryInvalidation():
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    blades = [BlenderStub.AddMeshObject("Blade" + str(i)) for i in range(2)]
+    context.selected_objects = blades[:1]
+    summary = FPTool.GetSelectionSummary(context)
+    assert summary.meshObjects == blades[:1]
+    assert FPTool.GetSelectionSummary(context) is summary
+
+    # the handler is what tells the cache that the selection changed
+    context.selected_objects = blades
+    FPTool.FoliageDepsgraphUpdate(context.scene, HandlerDepsgraph('MESH', 'OBJECT'))
+    assert FPTool.GetSelectionSummary(context) is summary
+    FPTool.FoliageDepsgraphUpdate(context.scene, HandlerDepsgraph('SCENE'))
+    summary = FPTool.GetSelectionSummary(context)
+    assert summary.meshObjects == blades
+
+    # a new object changes the key, and a handler call without a depsgraph drops the summary
+    context.selected_objects = [BlenderStub.AddMeshObject("Blade2")]
+    assert FPTool.GetSelectionSummary(context).meshObjects == context.selected_objects
+    context.selected_objects = blades[1:]
+    FPTool.FoliageDepsgraphUpdate(context.scene, None)
+    assert FPTool.GetSelectionSummary(context).meshObjects == blades[1:]
+
+# LOD copies are spawned for the nested placement subsets, each LOD in its own collection
+def testSpawnFoliageLodsNest():
+    context = BlenderStub.ResetSession()
+    FPTool.FoliageLoadPost(None)
+    context.scene.foliage_placement_properties = BlenderStub.DefaultProperties(FPTool.FP_PT_Properties, foliage_count=40, seed=1, use_cache=False, lod_count=3, lod_keep_ratio=0.5)
+    context.selected_objects = [BlenderStub.AddMeshObject("Blade0", 12)]
+    context.active_object = context.selected_objects[0]
+    FPTool.main(context, 1)
+
+    lodCounts = FPTool.SpawnFoliageLods(context, context.selected_objects, BlenderStub.data.collections.get("FoliagePlaceholders"))
+    assert lodCounts == [40, 20, 10]
+    lodSlots = [{o["fp_slot"] for o in BlenderStub.data.collections.get("FoliageClump_LOD" + str(lod)).objects} for lod in range(3)]
+    assert [len(slots) for slots in lodSlots] == lodCounts
+    assert lodSlots[2] <= lodSlots[1] <= lodSlots[0]